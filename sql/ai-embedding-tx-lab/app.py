@@ -13,7 +13,10 @@
         * 누락 컬럼(title, created_at) 자동 보강(ALTER TABLE ... IF NOT EXISTS)
         * ivfflat(vector_cosine_ops) 인덱스 및 ANALYZE
     - SentenceTransformer(paraphrase-MiniLM-L6-v2, 384d)로 임베딩 생성
+      (MODEL_NAME 뒤에 @onnx / @onnx-int8 을 붙이면 ONNX Runtime CPU 백엔드, sql/common/encoder.py)
     - 트랜잭션(with conn:)으로 INSERT, 예외 시 자동 ROLLBACK
+    - 임베딩 모델 버전(sql/common/embedding_versions.py): 등록된 모든 버전 컬럼에 함께 기록
+      → MODEL_NAME 교체 시 백필/전환(cutover) 중에도 어느 버전 컬럼도 비지 않음
 
 주요 기능:
     1) GET  /health
@@ -26,6 +29,7 @@
 실행 순서:
     1) (사전) Docker로 Postgres(pgvector) 기동, .env(DB_PORT 등) 확인
     2) uvicorn app:app --reload
+       (다중 워커: python ../common/prefork.py app:app --workers 4 → 모델을 부모에서 한 번 로드 후 fork, 가중치 공유)
     3) 브라우저에서 http://127.0.0.1:8000/docs 로 스펙 확인/테스트
 
 결과 확인(원라이너 예시):
@@ -42,6 +46,7 @@
 """
 
 import os
+import sys
 from typing import Optional
 from datetime import datetime
 
@@ -52,7 +57,15 @@ from dotenv import load_dotenv, find_dotenv
 
 import psycopg2
 from psycopg2.pool import SimpleConnectionPool
-from sentence_transformers import SentenceTransformer
+
+# 공용 요청 로그(sql/common): 요청별 JSON 한 줄 + 단계별 소요 시간(encode/pool/sql/serialize)
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "common"))
+from request_log import install_request_logging, stage, timed_query
+from metrics import install_metrics, observe_encode, register_pool
+from profiler import install_profiling
+from compact_vectors import STORAGE, index_ddl
+from encoder import get_encoder  # MODEL_NAME="...@onnx-int8" 또는 ENCODER_BACKEND 로 백엔드 선택
+import embedding_versions
 
 # ---------- env ----------
 _ = load_dotenv(find_dotenv(), override=False)
@@ -67,15 +80,26 @@ EMB_DIM = 384  # paraphrase-MiniLM-L6-v2 = 384
 def to_pgvector_literal(vec):
     return "[" + ",".join(f"{float(x):.8f}" for x in vec) + "]"
 
+def _connect():
+    """embedding_versions 목록 조회용 짧은 연결(EMBED_VERSION_TTL초마다 한 번, 풀과 별도)"""
+    return psycopg2.connect(host=DB_HOST, port=DB_PORT, dbname=DB_NAME, user=DB_USER, password=DB_PASSWORD)
+
+def live_versions():
+    """쓰기 대상 임베딩 버전(active 먼저). 레지스트리가 없으면 MODEL_NAME / embedding 하나"""
+    return embedding_versions.live("app.designs", _connect, MODEL_NAME, EMB_DIM)
+
 # ---------- app ----------
 app = FastAPI(title="Design Register API (no title)")
+install_request_logging(app)
+install_metrics(app)  # GET /metrics (요청/단계 지연, 풀 사용량, 인코더 배치 크기)
+install_profiling(app, "designs-api")  # PROFILE_REQUESTS / PROFILE_HEADER 가 켜져 있을 때만
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"], allow_credentials=True, allow_methods=["*"], allow_headers=["*"],
 )
 
 POOL: Optional[SimpleConnectionPool] = None
-MODEL: Optional[SentenceTransformer] = None
+MODEL = None  # encoder.get_encoder: SentenceTransformer 또는 OnnxEncoder
 
 # DDL: title 컬럼 없이 스키마 보장
 DDL = f"""
@@ -88,15 +112,40 @@ CREATE TABLE IF NOT EXISTS app.designs (
   embedding    VECTOR({EMB_DIM}) NOT NULL,
   created_at   TIMESTAMPTZ NOT NULL DEFAULT now()
 );
+"""
+
+# (선택) 과거에 title을 만들었다면 지우고 싶을 때만 주석 해제
+# DDL += "ALTER TABLE app.designs DROP COLUMN IF EXISTS title;"
 
-CREATE INDEX IF NOT EXISTS designs_embedding_ivfflat
-  ON app.designs USING ivfflat (embedding vector_cosine_ops) WITH (lists=100);
+# embedding(버전 1) 컬럼 인덱스. 모델 버전 전환 후 embedding_versions.py drop 으로 컬럼을 지웠으면 건너뜀
+# (선택) VECTOR_STORAGE=float16|binary: 후보 스캔용 압축 식 인덱스(HNSW, 검색 시 float32 embedding으로 rerank)
+BASE_INDEX_DDL = [
+    "CREATE INDEX IF NOT EXISTS designs_embedding_ivfflat "
+    "ON app.designs USING ivfflat (embedding vector_cosine_ops) WITH (lists=100)",
+] + index_ddl("app.designs", STORAGE, EMB_DIM)
+DDL += f"""
+DO $$
+BEGIN
+  IF EXISTS (SELECT 1 FROM pg_attribute
+             WHERE attrelid = 'app.designs'::regclass AND attname = 'embedding' AND NOT attisdropped) THEN
+    {"; ".join(BASE_INDEX_DDL)};
+  END IF;
+END $$;
 
 ANALYZE app.designs;
 """
 
-# (선택) 과거에 title을 만들었다면 지우고 싶을 때만 주석 해제
-# DDL += "ALTER TABLE app.designs DROP COLUMN IF EXISTS title;"
+def preload():
+    """prefork 런처(sql/common/prefork.py)가 fork 전에 부모에서 호출: 모델 로드 + 워밍업 encode(워커끼리 가중치 공유)"""
+    global MODEL
+    if MODEL is None:
+        MODEL = get_encoder(MODEL_NAME)
+    MODEL.encode(["warmup"])
+    try:
+        for v in live_versions():  # 백필/전환 중인 다른 버전 모델도 미리 올림
+            get_encoder(v["model"]).encode(["warmup"])
+    except psycopg2.Error:
+        pass  # DB가 아직 없으면 기본 모델만
 
 @app.on_event("startup")
 def on_startup():
@@ -107,7 +156,9 @@ def on_startup():
         user=DB_USER, password=DB_PASSWORD,
         options="-c client_encoding=UTF8 -c lc_messages=C"
     )
-    MODEL = SentenceTransformer(MODEL_NAME)
+    register_pool("designs", POOL)
+    if MODEL is None:  # prefork 런처로 띄우면 부모에서 이미 로드됨(preload)
+        MODEL = get_encoder(MODEL_NAME)
 
     conn = POOL.getconn()
     try:
@@ -116,6 +167,8 @@ def on_startup():
                 cur.execute(DDL)
     finally:
         POOL.putconn(conn)
+    for v in live_versions():
+        get_encoder(v["model"])  # 첫 요청에서 모델을 읽지 않도록(이미 있으면 캐시)
 
 @app.on_event("shutdown")
 def on_shutdown():
@@ -133,7 +186,9 @@ class DesignOut(BaseModel):
 
 @app.get("/health")
 def health():
-    return {"status": "ok", "db": DB_NAME, "model": MODEL_NAME}
+    versions = live_versions()
+    return {"status": "ok", "db": DB_NAME, "model": versions[0]["model"],
+            "embedding_versions": [{k: v[k] for k in ("version", "model", "column", "dim", "state")} for v in versions]}
 
 @app.post("/register_design", response_model=DesignOut)
 def register_design(payload: DesignIn):
@@ -141,25 +196,33 @@ def register_design(payload: DesignIn):
     if not desc:
         raise HTTPException(status_code=400, detail="description is empty")
 
-    vec = MODEL.encode([desc])[0]
-    if len(vec) != EMB_DIM:
-        raise HTTPException(status_code=500, detail=f"embedding dim mismatch: {len(vec)} != {EMB_DIM}")
-    vec_lit = to_pgvector_literal(vec)
-
-    conn = POOL.getconn()
+    # 등록된 모든 임베딩 버전으로 인코딩(보통 1개, 모델 교체 중에만 2개 이상)
+    versions = live_versions()
+    with stage("encode"):
+        vecs = [get_encoder(v["model"]).encode([desc])[0] for v in versions]
+    for v, vec in zip(versions, vecs):
+        observe_encode(1)
+        if len(vec) != v["dim"]:
+            raise HTTPException(status_code=500,
+                                detail=f"embedding dim mismatch ({v['model']}): {len(vec)} != {v['dim']}")
+    columns = ", ".join(v["column"] for v in versions)
+    values = ", ".join(["%s::vector"] * len(versions))
+
+    with stage("pool"):
+        conn = POOL.getconn()
     try:
         with conn:
             with conn.cursor() as cur:
-                cur.execute(
-                    """
-                    INSERT INTO app.designs (description, embedding)
-                    VALUES (%s, %s::vector)
+                new_id, created_at = timed_query(
+                    cur,
+                    f"""
+                    INSERT INTO app.designs (description, {columns})
+                    VALUES (%s, {values})
                     RETURNING id, created_at;
                     """,
-                    (desc, vec_lit)
-                )
-                new_id, created_at = cur.fetchone()
-        return DesignOut(id=new_id, created_at=created_at)
+                    (desc, *[to_pgvector_literal(vec) for vec in vecs])
+                )[0]
+        return DesignOut(id=new_id, created_at=created_at, dim=versions[0]["dim"])
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"DB error: {e}")
     finally:
@@ -2,7 +2,11 @@
 import os, sys, csv, traceback, math
 import psycopg2
 from dotenv import load_dotenv, find_dotenv
-from sentence_transformers import SentenceTransformer
+
+# sql/common: PROFILE=1 샘플링 프로파일(profiler.py), 인코더 백엔드 선택(encoder.py)
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "common"))
+from profiler import profiled
+from encoder import get_encoder
 
 def safe_load_dotenv():
     try:
@@ -28,44 +32,46 @@ def valid(v): return len(v)==384 and all(not (math.isinf(float(x)) or math.isnan
 
 csv_path = os.path.join("data", "sample_designs_500.csv")  # description 컬럼 가정
 
-model = SentenceTransformer("sentence-transformers/paraphrase-MiniLM-L6-v2")
+# MODEL_NAME="sentence-transformers/paraphrase-MiniLM-L6-v2@onnx-int8" 이면 ONNX int8 백엔드
+model = get_encoder(os.getenv("MODEL_NAME", "sentence-transformers/paraphrase-MiniLM-L6-v2"))
 
 conn = None
 ok = fail = 0
-try:
-    conn = psycopg2.connect(options="-c client_encoding=UTF8 -c lc_messages=C", **DB)
-    conn.set_client_encoding("UTF8")
-    cur = conn.cursor()
+with profiled("batch_embed"):
+    try:
+        conn = psycopg2.connect(options="-c client_encoding=UTF8 -c lc_messages=C", **DB)
+        conn.set_client_encoding("UTF8")
+        cur = conn.cursor()
 
-    cur.execute("BEGIN;")
-    with open(csv_path, newline="", encoding="utf-8") as f:
-        reader = csv.DictReader(f)
-        for i, row in enumerate(reader, start=1):
-            desc = (row.get("description") or "").strip()
-            if not desc:
-                print(f"[{i}] 빈 description → skip"); continue
+        cur.execute("BEGIN;")
+        with open(csv_path, newline="", encoding="utf-8") as f:
+            reader = csv.DictReader(f)
+            for i, row in enumerate(reader, start=1):
+                desc = (row.get("description") or "").strip()
+                if not desc:
+                    print(f"[{i}] 빈 description → skip"); continue
 
-            sp = f"sp_{i}"
-            cur.execute(f"SAVEPOINT {sp};")
-            try:
-                emb = model.encode([desc])[0]
-                if not valid(emb): raise ValueError("invalid embedding")
-                cur.execute("""
-                  INSERT INTO app.designs (description, embedding)
-                  VALUES (%s, %s);
-                """, (desc, to_pgvector_literal(emb)))
-                ok += 1
-            except Exception as e:
-                cur.execute(f"ROLLBACK TO SAVEPOINT {sp};")
-                fail += 1
-                print(f"[{i}] 실패 → ROLLBACK TO {sp} | {e}")
+                sp = f"sp_{i}"
+                cur.execute(f"SAVEPOINT {sp};")
+                try:
+                    emb = model.encode([desc])[0]
+                    if not valid(emb): raise ValueError("invalid embedding")
+                    cur.execute("""
+                      INSERT INTO app.designs (description, embedding)
+                      VALUES (%s, %s);
+                    """, (desc, to_pgvector_literal(emb)))
+                    ok += 1
+                except Exception as e:
+                    cur.execute(f"ROLLBACK TO SAVEPOINT {sp};")
+                    fail += 1
+                    print(f"[{i}] 실패 → ROLLBACK TO {sp} | {e}")
 
-    conn.commit()
-    print(f"COMMIT ✅  ok={ok}, fail={fail}")
+        conn.commit()
+        print(f"COMMIT ✅  ok={ok}, fail={fail}")
 
-except Exception as e:
-    if conn:
-        conn.rollback(); print("ROLLBACK 🔁 (배치 전체 취소)")
-    print("오류:", repr(e)); traceback.print_exc()
-finally:
-    if conn: conn.close()
\ No newline at end of file
+    except Exception as e:
+        if conn:
+            conn.rollback(); print("ROLLBACK 🔁 (배치 전체 취소)")
+        print("오류:", repr(e)); traceback.print_exc()
+    finally:
+        if conn: conn.close()
\ No newline at end of file
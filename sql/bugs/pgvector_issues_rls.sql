@@ -17,4 +17,16 @@ CREATE POLICY policy_issues_by_owner
 DROP POLICY IF EXISTS policy_issues_insert ON issues;
 CREATE POLICY policy_issues_insert
   ON issues FOR INSERT
-  WITH CHECK ( owner_id = current_setting('app.user_id', true)::int );
\ No newline at end of file
+  WITH CHECK ( owner_id = current_setting('app.user_id', true)::int );
+
+-- 소유자별 벡터 검색 경로(sql/common/tenant_search.py)
+--  RLS 정책은 비상수 조건이라 전역 HNSW 결과를 사후 필터 → 작은 소유자는 Top-k가 비거나 모자람
+--  작은 소유자: idx_issues_owner 로 그 소유자 행만 전수 정렬 / 큰 소유자: 부분 HNSW 인덱스(WHERE owner_id = N)
+--  부분 인덱스와 통계 테이블(vector_owner_stats)은 BYPASSRLS 역할로 주기 실행:
+--    python sql/common/tenant_search.py refresh --table issues
+
+-- 임베딩 모델 버전(sql/common/embedding_versions.py)
+--  버전마다 컬럼(embedding, embedding_v2, ...)과 레지스트리 테이블 embedding_versions(RLS 없음)
+--  앱 역할은 레지스트리 SELECT 권한만 있으면 됨(active 버전을 읽어 검색 컬럼/모델 결정):
+--    GRANT SELECT ON embedding_versions TO <앱 역할>;
+--  start/backfill/cutover/drop 은 BYPASSRLS 역할로 실행
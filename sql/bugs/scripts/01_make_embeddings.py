@@ -1,9 +1,16 @@
 # -*- coding: utf-8 -*-
-import os, pandas as pd, numpy as np
-from sentence_transformers import SentenceTransformer
+import os, sys, pandas as pd, numpy as np
+from issue_artifacts import EMB_PATH, PAYLOAD_PATH, MANIFEST_PATH, write_manifest, save_compact
+
+# sql/common: PROFILE=1 샘플링 프로파일(profiler.py), 인코더 백엔드 선택(encoder.py)
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "common"))
+from profiler import profiled
+from encoder import get_encoder, label
 
 CSV_PATH = "github_issues_large.csv"   # 필요 시 sample로 변경
-MODEL = os.getenv("MODEL_NAME", "sentence-transformers/all-MiniLM-L6-v2")
+MODEL = os.getenv("MODEL_NAME", "sentence-transformers/all-MiniLM-L6-v2")  # "...@onnx-int8" → ONNX int8 백엔드
+# (선택) 압축 사본도 저장: 쉼표 구분 float16,int8,binary (sql/common/compact_vectors.py)
+EMB_COMPACT = [m for m in os.getenv("EMB_COMPACT", "").split(",") if m]
 
 def build_text(row):
     title = str(row.get("title", "")).strip()
@@ -16,12 +23,16 @@ def build_text(row):
 def main():
     df = pd.read_csv(CSV_PATH).fillna("")
     texts = [build_text(r) for r in df.to_dict("records")]
-    model = SentenceTransformer(MODEL)
+    model = get_encoder(MODEL)
     embs = model.encode(texts, batch_size=64, convert_to_numpy=True,
                         normalize_embeddings=True, show_progress_bar=True)
-    np.save("embeddings.npy", embs)
-    df.to_parquet("issues_payload.parquet", index=False)
-    print("Saved: embeddings.npy, issues_payload.parquet")
+    np.save(EMB_PATH, embs)
+    save_compact(embs, EMB_COMPACT)
+    df.to_parquet(PAYLOAD_PATH, index=False)
+    # 분석 스크립트가 CSV 없이 정합성을 확인할 수 있도록 행 수/issue_id 해시 기록
+    write_manifest(df, embs, label(MODEL), MANIFEST_PATH, compact=EMB_COMPACT)
+    print(f"Saved: {EMB_PATH}, {PAYLOAD_PATH}, {MANIFEST_PATH}")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    with profiled("make_embeddings"):
+        main()
\ No newline at end of file
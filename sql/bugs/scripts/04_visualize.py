@@ -1,22 +1,21 @@
 # -*- coding: utf-8 -*-
-# 임베딩을 2D(PCA)로 축소해 산점도로 시각화, 선택: KMeans로 클러스터 라벨링
-import os, numpy as np, pandas as pd
-from sklearn.decomposition import PCA
-from sklearn.cluster import KMeans
+# 임베딩을 2D(PCA)로 축소해 산점도로 시각화 + 클러스터 라벨
+# - PCA 기저/중심점은 issue_clusters.npz(issue_clusters.py)를 그대로 사용 → DB의 cluster_id 와 같은 라벨
+#   (모델이 없을 때만 학습해서 저장, 매번 KMeans를 새로 돌리지 않음)
 import matplotlib.pyplot as plt
+from issue_artifacts import load_aligned
+import issue_clusters
 
-# 1) 파일에서 읽기(빠름)
-embs = np.load("embeddings.npy")  #  shape: (N, 384)
-df   = pd.read_csv(os.getenv("ISSUES_CSV", "github_issues_large.csv")).fillna("")
+# 1) 파일에서 읽기(빠름): .npy는 memmap, CSV는 읽지 않고 manifest로 행 수/순서만 확인
+embs, _ = load_aligned()  #  shape: (N, 384)
 
-# 2) PCA 2D
-pca = PCA(n_components=2)
-reduced = pca.fit_transform(embs)
+# 2) 저장된 PCA 기저로 투영(주성분 순서 → 앞의 두 축이 PCA 2D)
+model = issue_clusters.load_or_fit(embs)
+reduced = issue_clusters.project(model, embs)[:, :2]
 
-# 3) (선택) KMeans로 5개 클러스터
-n_clusters = int(os.getenv("N_CLUSTERS", "5"))
-km = KMeans(n_clusters=n_clusters, n_init="auto", random_state=42)
-labels = km.fit_predict(reduced)
+# 3) 저장된 중심점으로 라벨(가장 가까운 중심점)
+labels, _ = issue_clusters.assign(model, embs)
+n_clusters = len(model["centroids"])
 
 # 4) 산점도 (한 그래프, 색상 지정하지 않음)
 plt.figure(figsize=(6,5))
@@ -0,0 +1,99 @@
+# -*- coding: utf-8 -*-
+# embeddings.npy / issues_payload.parquet 공통 로더
+# - 01_make_embeddings.py 가 저장 시 manifest(행 수, 차원, issue_id 해시)를 함께 기록
+# - 분석 스크립트는 원본 CSV를 다시 파싱하지 않고, .npy는 memmap, parquet는 필요한 컬럼만 읽음
+# - (선택) 압축 사본: embeddings.float16.npy / embeddings.int8.npy(+ .scale.npy) / embeddings.binary.npy
+import os, sys, json, hashlib
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "common"))
+
+EMB_PATH      = os.getenv("EMB_PATH", "embeddings.npy")
+PAYLOAD_PATH  = os.getenv("PAYLOAD_PATH", "issues_payload.parquet")
+MANIFEST_PATH = os.getenv("MANIFEST_PATH", "embeddings_manifest.json")
+ID_COL = "issue_id"
+
+# PostgreSQL issues 테이블에는 원본 CSV issue_id를 source_issue_id로 함께 저장(issues.id는 DB가 발급)
+# → 파일 기준 결과(issue_id)를 issues 행에 다시 붙일 때 사용(05_find_duplicates.py)
+SOURCE_ID_DDL = [
+    "ALTER TABLE issues ADD COLUMN IF NOT EXISTS source_issue_id bigint",
+    "CREATE INDEX IF NOT EXISTS idx_issues_source_id ON issues(source_issue_id)",
+]
+
+def ids_digest(ids):
+    """issue_id 순서를 그대로 해시 → 행 순서까지 같아야 일치"""
+    arr = np.ascontiguousarray(np.asarray(ids, dtype=np.int64))
+    return hashlib.sha256(arr.tobytes()).hexdigest()
+
+def write_manifest(df, embs, model, path=MANIFEST_PATH, compact=()):
+    manifest = {
+        "rows": int(embs.shape[0]),
+        "dim": int(embs.shape[1]),
+        "dtype": str(embs.dtype),
+        "model": model,
+        "id_column": ID_COL if ID_COL in df.columns else None,
+        "ids_sha256": ids_digest(df[ID_COL]) if ID_COL in df.columns else None,
+        "compact": list(compact),
+    }
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    return manifest
+
+def read_manifest(path=MANIFEST_PATH):
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"{path} 없음 → 01_make_embeddings.py 를 다시 실행하세요")
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+def load_embeddings(path=EMB_PATH, mmap=True):
+    """(N, dim) 임베딩. 기본은 읽기 전용 memmap(필요한 페이지만 디스크에서 읽음)"""
+    return np.load(path, mmap_mode="r" if mmap else None)
+
+def compact_path(mode, path=EMB_PATH):
+    root, ext = os.path.splitext(path)
+    return f"{root}.{mode}{ext}"
+
+def save_compact(embs, modes, path=EMB_PATH):
+    """float32 임베딩의 압축 사본 저장(int8은 차원별 스케일을 <이름>.int8.scale.npy 로 함께)"""
+    from compact_vectors import quantize
+    for mode in modes:
+        codes, scale = quantize(embs, mode)
+        np.save(compact_path(mode, path), codes)
+        if scale is not None:
+            np.save(compact_path(f"{mode}.scale", path), scale)
+
+def load_compact(mode, path=EMB_PATH, mmap=True):
+    """(codes, scale) — scale은 int8만. 없으면 FileNotFoundError(01_make_embeddings.py 의 EMB_COMPACT)"""
+    codes = np.load(compact_path(mode, path), mmap_mode="r" if mmap else None)
+    scale = np.load(compact_path(f"{mode}.scale", path)) if mode == "int8" else None
+    return codes, scale
+
+def load_payload(columns, path=PAYLOAD_PATH):
+    """parquet에서 요청한 컬럼만 읽음(컬럼형 포맷이라 나머지 컬럼은 디스크에서 읽지 않음)"""
+    import pyarrow.parquet as pq
+    return pq.read_table(path, columns=list(columns)).to_pandas()
+
+def load_aligned(columns=(), emb_path=EMB_PATH, payload_path=PAYLOAD_PATH,
+                 manifest_path=MANIFEST_PATH):
+    """
+    manifest 기준으로 embeddings / payload 정합성을 검사한 뒤 (embs, df)를 반환.
+    - 행 수: .npy 헤더(memmap)와 parquet 메타데이터만으로 확인 → 본문 파싱 없음
+    - 행 순서: issue_id 컬럼 하나만 읽어 해시 비교
+    """
+    import pyarrow.parquet as pq
+    manifest = read_manifest(manifest_path)
+    embs = load_embeddings(emb_path)
+    if embs.shape != (manifest["rows"], manifest["dim"]):
+        raise ValueError(f"embeddings shape {embs.shape} != manifest "
+                         f"({manifest['rows']}, {manifest['dim']})")
+
+    n_payload = pq.ParquetFile(payload_path).metadata.num_rows
+    if n_payload != manifest["rows"]:
+        raise ValueError(f"payload rows {n_payload} != manifest rows {manifest['rows']}")
+
+    id_col = manifest.get("id_column")
+    cols = list(dict.fromkeys(list(columns) + ([id_col] if id_col else [])))
+    df = load_payload(cols, payload_path) if cols else None
+    if id_col and ids_digest(df[id_col]) != manifest["ids_sha256"]:
+        raise ValueError("issue_id 순서가 manifest와 다름 → embeddings와 payload 재생성 필요")
+    return embs, df
@@ -0,0 +1,101 @@
+# -*- coding: utf-8 -*-
+"""
+bench_encoder.py
+- encoder.py 백엔드(torch fp32 / onnx / onnx-int8) 비교(CPU)
+  parity : fp32 torch 임베딩 대비 행별 코사인(mean / p1 / min) + 말뭉치 내 Top-K 이웃 일치율
+           p1 코사인이 --min-cosine 미만이면 종료 코드 1(CI 등에서 회귀 확인용)
+  speed  : 질의 1건 지연(p50/p99 ms)과 배치 처리량(texts/s)
+- 텍스트: 이슈 CSV(title + description, 01_make_embeddings.py와 같은 방식)를 반복해 --n 건으로 채움
+Usage:
+  python bench_encoder.py parity --model sentence-transformers/all-MiniLM-L6-v2 --backends onnx,onnx-int8
+  python bench_encoder.py speed --backends torch,onnx,onnx-int8 --batch-size 64 --threads 4
+"""
+import argparse, os, sys, time
+import numpy as np
+import pandas as pd
+
+import encoder
+
+DEFAULT_CSV = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "bugs", "github_issues_large.csv")
+
+def load_texts(path: str, n: int) -> list[str]:
+    df = pd.read_csv(path).fillna("")
+    base = [f"{r.get('title', '')}. {r.get('description', '')}".strip(". ") for r in df.to_dict("records")]
+    # 길이가 제각각인 변형을 섞어 패딩/정렬 효과도 반영
+    texts = [base[i % len(base)] * (1 + (i // len(base)) % 3) for i in range(n)]
+    return texts
+
+def set_threads(threads: int):
+    if threads:
+        os.environ["ENCODER_THREADS"] = str(threads)
+        try:
+            import torch
+            torch.set_num_threads(threads)
+        except ImportError:
+            pass
+
+def parity(args, texts):
+    ref = encoder.get_encoder(args.model, "torch").encode(texts, batch_size=64, normalize_embeddings=True)
+    ref_nn = _neighbors(ref, args.k)
+    print(f"model={args.model} texts={len(texts)} reference=torch fp32")
+    print(f"{'backend':<10} {'cos_mean':>9} {'cos_p1':>8} {'cos_min':>8} {f'top{args.k}_overlap':>13}")
+    ok = True
+    for backend in args.backends:
+        embs = encoder.get_encoder(args.model, backend).encode(texts, batch_size=64, normalize_embeddings=True)
+        cos = np.einsum("ij,ij->i", ref, embs)
+        nn = _neighbors(embs, args.k)
+        overlap = np.mean([len(set(a) & set(b)) / args.k for a, b in zip(ref_nn, nn)])
+        p1 = float(np.percentile(cos, 1))
+        ok &= p1 >= args.min_cosine
+        print(f"{backend:<10} {cos.mean():9.5f} {p1:8.5f} {cos.min():8.5f} {overlap:13.3f}")
+    return 0 if ok else 1
+
+def _neighbors(embs: np.ndarray, k: int) -> np.ndarray:
+    sims = embs @ embs.T
+    np.fill_diagonal(sims, -np.inf)
+    return np.argpartition(-sims, k, axis=1)[:, :k]
+
+def speed(args, texts):
+    print(f"model={args.model} texts={len(texts)} batch={args.batch_size} threads={args.threads or 'default'}")
+    print(f"{'backend':<10} {'load_s':>7} {'q_p50_ms':>9} {'q_p99_ms':>9} {'batch_texts/s':>14}")
+    for backend in args.backends:
+        t0 = time.perf_counter()
+        enc = encoder.get_encoder(args.model, backend)
+        enc.encode(texts[:8], batch_size=8)  # 워밍업(세션/스레드풀 생성)
+        load = time.perf_counter() - t0
+
+        lat = []
+        for q in texts[:args.queries]:
+            t = time.perf_counter()
+            enc.encode([q], normalize_embeddings=True)
+            lat.append((time.perf_counter() - t) * 1000)
+        lat.sort()
+
+        t = time.perf_counter()
+        enc.encode(texts, batch_size=args.batch_size, normalize_embeddings=True)
+        tput = len(texts) / (time.perf_counter() - t)
+        print(f"{backend:<10} {load:7.2f} {lat[len(lat) // 2]:9.2f} {lat[min(len(lat) - 1, int(len(lat) * 0.99))]:9.2f} "
+              f"{tput:14.1f}")
+    return 0
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("mode", choices=["parity", "speed"])
+    ap.add_argument("--model", default=os.getenv("MODEL_NAME", "sentence-transformers/all-MiniLM-L6-v2").partition("@")[0])
+    ap.add_argument("--backends", default=None, help="쉼표 구분(기본: parity=onnx,onnx-int8 / speed=torch,onnx,onnx-int8)")
+    ap.add_argument("--csv", default=DEFAULT_CSV)
+    ap.add_argument("--n", type=int, default=1000)
+    ap.add_argument("--k", type=int, default=10)
+    ap.add_argument("--min-cosine", type=float, default=0.98)
+    ap.add_argument("--queries", type=int, default=200)
+    ap.add_argument("--batch-size", type=int, default=64)
+    ap.add_argument("--threads", type=int, default=0)
+    args = ap.parse_args()
+    args.backends = (args.backends or ("onnx,onnx-int8" if args.mode == "parity" else "torch,onnx,onnx-int8")).split(",")
+
+    set_threads(args.threads)
+    texts = load_texts(args.csv, args.n)
+    return parity(args, texts) if args.mode == "parity" else speed(args, texts)
+
+if __name__ == "__main__":
+    sys.exit(main())
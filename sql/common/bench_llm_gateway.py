@@ -0,0 +1,58 @@
+# -*- coding: utf-8 -*-
+"""
+bench_llm_gateway.py
+- 모의 LLM 서버를 띄워 (A) 호출마다 새 클라이언트 + 순차 호출 vs (B) LLMGateway 동시 호출 비교
+- 프롬프트 일부를 반복시켜 캐시/중복 제거 효과도 함께 확인
+Usage:
+  python bench_llm_gateway.py --n 200 --unique 50 --latency-ms 100 --workers 16
+"""
+import argparse, os, tempfile, time
+from concurrent.futures import ThreadPoolExecutor
+from openai import OpenAI
+
+from mock_llm_server import start_in_thread
+from llm_gateway import LLMGateway
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--n", type=int, default=200)
+    ap.add_argument("--unique", type=int, default=50)
+    ap.add_argument("--latency-ms", type=int, default=100)
+    ap.add_argument("--fail-rate", type=float, default=0.05)
+    ap.add_argument("--workers", type=int, default=16)
+    ap.add_argument("--max-in-flight", type=int, default=8)
+    ap.add_argument("--rate", type=float, default=100.0)
+    args = ap.parse_args()
+
+    srv, base_url = start_in_thread(latency_ms=args.latency_ms, fail_rate=args.fail_rate)
+    prompts = [f"triage prompt #{i % args.unique}" for i in range(args.n)]
+
+    # (A) 기존 방식: 요청마다 새 클라이언트, 재시도/캐시 없음
+    t0 = time.perf_counter(); failed = 0
+    for p in prompts:
+        try:
+            OpenAI(api_key="mock", base_url=base_url, max_retries=0).chat.completions.create(
+                model="mock", messages=[{"role": "user", "content": p}], temperature=0.2)
+        except Exception:
+            failed += 1
+    naive = time.perf_counter() - t0
+    naive_reqs = srv.requests
+
+    # (B) 게이트웨이: 공유 클라이언트 + 동시성 상한 + 재시도 + 캐시
+    with tempfile.TemporaryDirectory() as d:
+        gw = LLMGateway(api_key="mock", base_url=base_url, max_in_flight=args.max_in_flight,
+                        rate_per_sec=args.rate, burst=args.max_in_flight,
+                        cache_path=os.path.join(d, "cache.sqlite3"))
+        t0 = time.perf_counter()
+        with ThreadPoolExecutor(args.workers) as ex:
+            list(ex.map(lambda p: gw.complete(p, model="mock"), prompts))
+        gated = time.perf_counter() - t0
+
+    print(f"prompts={args.n} unique={args.unique} latency={args.latency_ms}ms fail_rate={args.fail_rate}")
+    print(f"naive   : {naive:7.2f}s  {args.n / naive:7.1f} req/s  upstream={naive_reqs}  failed={failed}")
+    print(f"gateway : {gated:7.2f}s  {args.n / gated:7.1f} req/s  upstream={srv.requests - naive_reqs}  "
+          f"stats={gw.stats}")
+    srv.shutdown()
+
+if __name__ == "__main__":
+    main()
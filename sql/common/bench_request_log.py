@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+"""
+bench_request_log.py
+- request_log 미들웨어 오버헤드 측정(ASGI 앱을 직접 호출, HTTP 클라이언트/네트워크 없음)
+  같은 엔드포인트를 미들웨어 없음 / 샘플 0(느린 요청만) / 1% / 100% 로 번갈아 여러 라운드 호출해
+  라운드별 요청 1건당 평균 중 최솟값과 차이를 출력(로그는 임시 파일로만 기록)
+Usage:
+  python bench_request_log.py --requests 3000 --rounds 5
+"""
+import argparse, asyncio, os, tempfile, time
+from fastapi import FastAPI
+
+os.environ.setdefault("REQUEST_LOG_FILE", os.path.join(tempfile.mkdtemp(prefix="bench_request_log_"), "requests.log"))
+import logging
+import request_log
+
+def build_app(mode):
+    app = FastAPI()
+    if mode is not None:
+        app.router.route_class = request_log.TimedRoute
+        app.add_middleware(request_log.RequestLogMiddleware, logger=logging.getLogger(request_log.LOGGER_NAME),
+                           sample=mode, slow_ms=1000)
+
+    @app.get("/items")
+    async def items(k: int = 5):
+        with request_log.stage("encode"):
+            pass
+        return [{"id": i, "score": 1 - i / 10} for i in range(k)]
+
+    return app
+
+SCOPE = {"type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET", "scheme": "http",
+         "path": "/items", "raw_path": b"/items", "root_path": "", "query_string": b"k=5",
+         "headers": [(b"host", b"bench")], "client": ("127.0.0.1", 1), "server": ("bench", 80)}
+
+async def receive():
+    return {"type": "http.request", "body": b"", "more_body": False}
+
+async def send(message):
+    pass
+
+async def run(app, n):
+    for _ in range(200):  # warm-up
+        await app(dict(SCOPE), receive, send)
+    t0 = time.perf_counter()
+    for _ in range(n):
+        await app(dict(SCOPE), receive, send)
+    return (time.perf_counter() - t0) / n * 1e6
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--requests", type=int, default=3000)
+    ap.add_argument("--rounds", type=int, default=5)
+    args = ap.parse_args()
+
+    # 콘솔 출력 없이 파일로만 기록(측정에 터미널 출력 비용이 섞이지 않도록)
+    request_log.setup_logging(logger_name=request_log.LOGGER_NAME, fmt="%(message)s",
+                              log_file=os.environ["REQUEST_LOG_FILE"], console=False)
+    modes = [("no middleware", None), ("sample=0", 0.0), ("sample=0.01", 0.01), ("sample=1", 1.0)]
+    apps = [build_app(mode) for _, mode in modes]
+    best = [float("inf")] * len(modes)
+    for _ in range(args.rounds):
+        for i, app in enumerate(apps):
+            best[i] = min(best[i], asyncio.run(run(app, args.requests)))
+    for (label, _), us in zip(modes, best):
+        print(f"{label:<14}: {us:7.1f} µs/request  ({us - best[0]:+6.1f} µs)")
+    print(f"log file: {os.environ['REQUEST_LOG_FILE']}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+# -*- coding: utf-8 -*-
+"""
+bench_search_batch.py
+- 실행 중인 이슈 API(sql/bugs/api)에서 질의 N개 처리량 비교
+  * single   : GET /search 를 순서대로 1건씩(중복 탐지 봇의 현재 방식)
+  * parallel : GET /search 를 --concurrency 개 스레드로 동시에
+  * batch    : POST /search/batch 에 --batch-sizes 개씩 묶어서
+- 질의당 처리량(q/s), 요청 1건 지연(p50/p95 ms), single 결과와 Top-k id 일치율(배치가 같은 결과를 주는지)
+- 질의: 이슈 CSV 제목 + 설명 앞부분(01_make_embeddings.py와 같은 데이터), 부족하면 반복
+Usage:
+  uvicorn app:app --port 8000                    # sql/bugs/api 에서 먼저 기동
+  python bench_search_batch.py --url http://127.0.0.1:8000 --n 500 --k 10 --batch-sizes 16,64,256 --concurrency 8
+"""
+import argparse, os, time
+from concurrent.futures import ThreadPoolExecutor
+
+import httpx
+import numpy as np
+import pandas as pd
+
+DEFAULT_CSV = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "bugs", "github_issues_large.csv")
+
+def load_queries(path: str, n: int) -> list[str]:
+    df = pd.read_csv(path).fillna("")
+    base = [f"{r['title']} {str(r['description'])[:80]}".strip() for r in df.to_dict("records")]
+    # 같은 문장이 반복되면 캐시 효과가 섞이므로 번호를 붙여 구분
+    return [base[i % len(base)] + (f" #{i // len(base)}" if i >= len(base) else "") for i in range(n)]
+
+def pct(values, p):
+    return float(np.percentile(values, p)) if values else float("nan")
+
+def run_single(client, url, queries, k, params, headers, concurrency=1):
+    lat = []
+
+    def one(q):
+        t = time.perf_counter()
+        r = client.get(f"{url}/search", params={"q": q, "k": k, **params}, headers=headers)
+        r.raise_for_status()
+        lat.append((time.perf_counter() - t) * 1000)
+        return [item["id"] for item in r.json()]
+
+    t0 = time.perf_counter()
+    if concurrency > 1:
+        with ThreadPoolExecutor(concurrency) as pool:
+            ids = list(pool.map(one, queries))
+    else:
+        ids = [one(q) for q in queries]
+    return ids, time.perf_counter() - t0, lat
+
+def run_batch(client, url, queries, k, body_extra, headers, size):
+    ids, lat = [], []
+    t0 = time.perf_counter()
+    for s in range(0, len(queries), size):
+        t = time.perf_counter()
+        r = client.post(f"{url}/search/batch", json={"queries": queries[s:s + size], "k": k, **body_extra},
+                        headers=headers)
+        r.raise_for_status()
+        lat.append((time.perf_counter() - t) * 1000)
+        ids += [[item["id"] for item in items] for items in r.json()["results"]]
+    return ids, time.perf_counter() - t0, lat
+
+def agreement(a, b):
+    return float(np.mean([len(set(x) & set(y)) / max(1, len(x)) for x, y in zip(a, b)]))
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--url", default="http://127.0.0.1:8000")
+    ap.add_argument("--csv", default=DEFAULT_CSV)
+    ap.add_argument("--n", type=int, default=500)
+    ap.add_argument("--k", type=int, default=10)
+    ap.add_argument("--batch-sizes", default="16,64,256")
+    ap.add_argument("--concurrency", type=int, default=8)
+    ap.add_argument("--tags", default="", help="쉼표 구분 태그 필터(양쪽 같은 조건)")
+    ap.add_argument("--user-id", type=int, default=1)
+    args = ap.parse_args()
+
+    queries = load_queries(args.csv, args.n)
+    headers = {"X-User-Id": str(args.user_id)}
+    tags = [t for t in args.tags.split(",") if t]
+    with httpx.Client(timeout=120, limits=httpx.Limits(max_connections=max(args.concurrency, 1))) as client:
+        client.get(f"{args.url}/search", params={"q": "warmup", "k": args.k}, headers=headers).raise_for_status()
+        print(f"n={len(queries)} k={args.k} tags={tags or '-'} url={args.url}")
+        print(f"{'mode':<14} {'total_s':>8} {'q/s':>8} {'req_p50_ms':>11} {'req_p95_ms':>11} {'speedup':>8} {'same_ids':>9}")
+
+        ref, total, lat = run_single(client, args.url, queries, args.k, {"tags": tags} if tags else {}, headers)
+        base = len(queries) / total
+        print(f"{'single':<14} {total:8.2f} {base:8.1f} {pct(lat, 50):11.2f} {pct(lat, 95):11.2f} {1:8.2f} {1:9.3f}")
+
+        if args.concurrency > 1:
+            ids, total, lat = run_single(client, args.url, queries, args.k, {"tags": tags} if tags else {}, headers,
+                                         args.concurrency)
+            print(f"{f'parallel x{args.concurrency}':<14} {total:8.2f} {len(queries) / total:8.1f} {pct(lat, 50):11.2f} "
+                  f"{pct(lat, 95):11.2f} {len(queries) / total / base:8.2f} {agreement(ref, ids):9.3f}")
+
+        for size in (int(b) for b in args.batch_sizes.split(",")):
+            ids, total, lat = run_batch(client, args.url, queries, args.k, {"tags": tags} if tags else {}, headers, size)
+            print(f"{f'batch {size}':<14} {total:8.2f} {len(queries) / total:8.1f} {pct(lat, 50):11.2f} "
+                  f"{pct(lat, 95):11.2f} {len(queries) / total / base:8.2f} {agreement(ref, ids):9.3f}")
+    print("(same_ids: single 결과와 Top-k id 일치율 — HNSW 근사 검색이면 1.0보다 약간 낮을 수 있음)")
+
+if __name__ == "__main__":
+    main()
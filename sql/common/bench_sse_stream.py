@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+"""
+bench_sse_stream.py
+- 모의 스트리밍 LLM(mock_llm_server.py) + 가짜 검색 지연으로 SSE 엔드포인트를 측정
+  1) TTFB(첫 바이트=검색 결과) / 첫 토큰 / 전체 완료 시간 vs 비스트리밍 응답 시간
+  2) 클라이언트가 중간에 끊으면 상류 호출이 취소되고 슬롯이 반환되는지 확인
+Usage:
+  python bench_sse_stream.py --retrieval-ms 30 --latency-ms 300 --token-ms 30
+"""
+import argparse, socket, threading, time
+import httpx, uvicorn
+from fastapi import FastAPI, Request
+
+from mock_llm_server import start_in_thread
+from llm_gateway import LLMGateway
+from sse import sse_response, stream_events
+
+def build_app(gw, retrieval_ms):
+    app = FastAPI()
+
+    def fake_retrieve(q):
+        time.sleep(retrieval_ms / 1000)
+        return [{"id": i, "title": f"issue {i}", "score": 1 - i / 10} for i in range(5)]
+
+    @app.get("/rag")
+    def rag(q: str):
+        items = fake_retrieve(q)
+        return {"answer": gw.complete(q, model="mock"), "items": items}
+
+    @app.get("/rag/stream")
+    async def rag_stream(request: Request, q: str):
+        items = fake_retrieve(q)
+        return sse_response(stream_events(request, [("items", items)], gw.stream(q, model="mock")))
+
+    return app
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--retrieval-ms", type=int, default=30)
+    ap.add_argument("--latency-ms", type=int, default=300)
+    ap.add_argument("--token-ms", type=int, default=30)
+    args = ap.parse_args()
+
+    srv, base_url = start_in_thread(latency_ms=args.latency_ms, token_ms=args.token_ms)
+    gw = LLMGateway(api_key="mock", base_url=base_url, rate_per_sec=0, cache_path=None)
+    port = free_port()
+    server = uvicorn.Server(uvicorn.Config(build_app(gw, args.retrieval_ms), port=port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.01)
+    url = f"http://127.0.0.1:{port}"
+
+    with httpx.Client(timeout=30) as c:
+        t0 = time.perf_counter()
+        c.get(f"{url}/rag", params={"q": "blocking"}).raise_for_status()
+        blocking = time.perf_counter() - t0
+
+        t0 = time.perf_counter(); ttfb = first_token = None; n_tokens = 0
+        with c.stream("GET", f"{url}/rag/stream", params={"q": "streaming"}) as r:
+            for line in r.iter_lines():
+                now = time.perf_counter() - t0
+                if ttfb is None:
+                    ttfb = now
+                if line == "event: token":
+                    n_tokens += 1
+                    first_token = first_token or now
+        total = time.perf_counter() - t0
+
+        print(f"blocking /rag      : {blocking * 1000:7.1f} ms")
+        print(f"/rag/stream TTFB   : {ttfb * 1000:7.1f} ms  (retrieval {args.retrieval_ms} ms)")
+        print(f"/rag/stream 1st tok: {first_token * 1000:7.1f} ms")
+        print(f"/rag/stream total  : {total * 1000:7.1f} ms  tokens={n_tokens}")
+
+        # 연결 끊김 → 상류 취소 확인
+        with c.stream("GET", f"{url}/rag/stream", params={"q": "disconnect"}) as r:
+            for line in r.iter_lines():
+                if line == "event: token":
+                    break
+        deadline = time.time() + 5
+        while (srv.cancelled == 0 or gw.stats["in_flight"]) and time.time() < deadline:
+            time.sleep(0.05)
+        print(f"disconnect         : upstream cancelled={srv.cancelled} "
+              f"gateway in_flight={gw.stats['in_flight']} cancelled={gw.stats['cancelled']}")
+
+    server.should_exit = True
+    srv.shutdown()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+# -*- coding: utf-8 -*-
+"""
+compact_vectors.py
+- 압축 벡터로 후보를 고르고 float32 원본으로 정확히 재정렬(rerank)하는 검색(선택 기능)
+  * float32 : 기존 그대로(VECTOR 인덱스 / .npy float32)
+  * float16 : halfvec 식 인덱스(pgvector ≥ 0.7) / .npy float16          — 벡터당 2바이트 × dim
+  * int8    : .npy 전용(차원별 스케일 대칭 양자화, pgvector에는 int8 타입 없음) — 1바이트 × dim
+  * binary  : binary_quantize() bit 식 인덱스(해밍 거리) / packbits .npy   — 1비트 × dim
+- PostgreSQL: 테이블의 VECTOR 컬럼은 그대로 두고 압축 표현은 "식 인덱스"로만 저장
+  → 후보 스캔은 작은 인덱스만 읽고, 힙(float32)은 후보 수만큼만 읽어 rerank
+- 사용(SQL):
+    src = source_sql("issues", "id, title", mode)        # float32면 "issues", 아니면 후보 서브쿼리
+    sql = f"SELECT id, title, 1 - (embedding <=> %(q)s::vector) AS score FROM {src} " \\
+          "ORDER BY embedding <=> %(q)s::vector LIMIT %(k)s"
+    for s in session_settings(mode, k): cur.execute(s)
+    cur.execute(sql, {"q": qlit, "k": k, "cand": candidates(k)})
+- 사용(numpy): codes = quantize(embs, "int8"); ids = search(embs, codes, q, k, "int8")
+환경 변수:
+  VECTOR_STORAGE(float32)   검색/적재가 사용할 모드(float32 | float16 | binary)
+  RERANK_FACTOR(10)         후보 수 = max(k × RERANK_FACTOR, RERANK_MIN)
+  RERANK_MIN(40)
+  EMB_DIM(384)
+"""
+import os
+import numpy as np
+
+MODES = ("float32", "float16", "int8", "binary")
+DB_MODES = ("float32", "float16", "binary")
+STORAGE = os.getenv("VECTOR_STORAGE", "float32")
+RERANK_FACTOR = int(os.getenv("RERANK_FACTOR", "10"))
+RERANK_MIN = int(os.getenv("RERANK_MIN", "40"))
+EMB_DIM = int(os.getenv("EMB_DIM", "384"))
+
+def candidates(k: int) -> int:
+    return max(k * RERANK_FACTOR, RERANK_MIN)
+
+def _check_db_mode(mode: str):
+    if mode not in DB_MODES:
+        raise ValueError(f"VECTOR_STORAGE={mode!r}: PostgreSQL에서는 {', '.join(DB_MODES)} 만 지원 "
+                         f"(int8은 .npy 산출물 전용)")
+
+# ---------------- PostgreSQL(pgvector) ----------------
+def candidate_order(mode: str, dim: int = EMB_DIM, column: str = "embedding", param: str = "%(q)s") -> str:
+    """후보 스캔용 ORDER BY 식(식 인덱스와 같은 식이어야 인덱스를 탐)"""
+    _check_db_mode(mode)
+    if mode == "float16":
+        return f"{column}::halfvec({dim}) <=> {param}::halfvec({dim})"
+    if mode == "binary":
+        return f"binary_quantize({column})::bit({dim}) <~> binary_quantize({param}::vector({dim}))"
+    return f"{column} <=> {param}::vector"
+
+def index_method(mode: str, dim: int = EMB_DIM, column: str = "embedding") -> tuple[str, str, str]:
+    """(인덱스 식, 연산자 클래스, 이름 접미사) — candidate_order()와 같은 식"""
+    _check_db_mode(mode)
+    if mode == "float16":
+        return f"({column}::halfvec({dim}))", "halfvec_cosine_ops", "half_hnsw"
+    if mode == "binary":
+        return f"(binary_quantize({column})::bit({dim}))", "bit_hamming_ops", "bit_hnsw"
+    return column, "vector_cosine_ops", "hnsw"
+
+def index_ddl(table: str, mode: str, dim: int = EMB_DIM, column: str = "embedding") -> list[str]:
+    """압축 모드용 HNSW 식 인덱스(float32 모드는 기존 인덱스 사용 → 빈 목록)"""
+    if mode == "float32":
+        return []
+    expr, opclass, suffix = index_method(mode, dim, column)
+    name = table.replace(".", "_").replace('"', "")
+    return [f"CREATE INDEX IF NOT EXISTS {name}_{column}_{suffix} ON {table} USING hnsw ({expr} {opclass})"]
+
+def source_sql(table: str, columns: str, mode: str = STORAGE, dim: int = EMB_DIM, column: str = "embedding",
+               where: str = "", param: str = "%(q)s") -> str:
+    """
+    FROM 절에 넣을 대상. float32면 테이블 그대로, 압축 모드면 압축 인덱스로 %(cand)s개 후보를 고르는 서브쿼리
+    (바깥 쿼리가 float32 {column} <=> %(q)s 로 rerank). 테이블의 RLS 정책은 서브쿼리에도 그대로 적용됨.
+    where: 부분 인덱스와 같은 조건(예: "owner_id = 7") — 후보 스캔과 같은 단계에 있어야 부분 인덱스를 탐
+    param: 질의 벡터 식(LATERAL 배치 검색이면 "q.v")
+    """
+    cond = f" WHERE {where}" if where else ""
+    if mode == "float32":
+        return f"(SELECT {columns}, {column} FROM {table}{cond}) AS c" if where else table
+    return (f"(SELECT {columns}, {column} FROM {table}{cond} "
+            f"ORDER BY {candidate_order(mode, dim, column, param)} LIMIT %(cand)s) AS c")
+
+def session_settings(mode: str = STORAGE, k: int = 10) -> list[str]:
+    """HNSW 후보 수가 ef_search(기본 40)에 잘리지 않도록 트랜잭션 단위로 올림"""
+    if mode == "float32":
+        return []
+    return [f"SET LOCAL hnsw.ef_search = {max(candidates(k), 40)}"]
+
+# ---------------- numpy(.npy 산출물 / 오프라인 분석) ----------------
+_POPCOUNT = np.array([bin(i).count("1") for i in range(256)], dtype=np.uint8)
+
+def quantize(embs: np.ndarray, mode: str):
+    """(codes, scale). int8만 scale(차원별)이 있고 나머지는 None"""
+    embs = np.asarray(embs, dtype=np.float32)
+    if mode == "float32":
+        return embs, None
+    if mode == "float16":
+        return embs.astype(np.float16), None
+    if mode == "int8":
+        scale = np.abs(embs).max(axis=0) / 127.0
+        scale[scale == 0] = 1.0
+        return np.clip(np.rint(embs / scale), -127, 127).astype(np.int8), scale.astype(np.float32)
+    if mode == "binary":
+        return np.packbits(embs > 0, axis=1), None
+    raise ValueError(f"unknown mode {mode!r} (choose from {', '.join(MODES)})")
+
+def approx_scores(codes: np.ndarray, q: np.ndarray, mode: str, scale=None, chunk: int = 65536) -> np.ndarray:
+    """
+    압축 표현으로 계산한 점수(클수록 유사). q가 (dim,)이면 (n,), (nq, dim)이면 (nq, n).
+    큰 배열은 chunk 행씩 float32로 바꿔 계산(질의 여러 개를 한 번에 → 변환 1회).
+    """
+    q = np.asarray(q, dtype=np.float32)
+    single = q.ndim == 1
+    Q = q[None] if single else q
+    out = np.empty((len(Q), len(codes)), dtype=np.float32)
+    if mode == "binary":
+        qbits = np.packbits(Q > 0, axis=1)
+        step = max(1, (1 << 22) // (len(Q) * codes.shape[1]))  # XOR 중간 배열 ~4MB
+        for s in range(0, len(codes), step):
+            x = np.bitwise_xor(codes[s:s + step][None], qbits[:, None])
+            out[:, s:s + step] = -_POPCOUNT[x].sum(axis=2, dtype=np.int32)
+    else:
+        QQ = Q * scale if mode == "int8" else Q
+        for s in range(0, len(codes), chunk):
+            out[:, s:s + chunk] = QQ @ codes[s:s + chunk].astype(np.float32).T
+    return out[0] if single else out
+
+def rerank(embs: np.ndarray, scores: np.ndarray, q: np.ndarray, k: int, n_candidates: int | None = None) -> np.ndarray:
+    """압축 점수 상위 후보만 float32(embs, memmap 가능 — 후보 행만 읽음)로 다시 계산한 Top-k 행 번호"""
+    n = min(len(scores), n_candidates or candidates(k))
+    cand = np.argpartition(-scores, n - 1)[:n] if n < len(scores) else np.arange(len(scores))
+    cand.sort()  # 디스크 순서로 읽기(memmap)
+    exact = np.asarray(embs[cand], dtype=np.float32) @ np.asarray(q, dtype=np.float32)
+    return cand[np.argsort(-exact, kind="stable")[:k]]
+
+def search(embs: np.ndarray, codes: np.ndarray, q: np.ndarray, k: int, mode: str, scale=None,
+           n_candidates: int | None = None) -> np.ndarray:
+    """압축 점수로 후보를 고른 뒤 float32로 rerank한 Top-k 행 번호"""
+    return rerank(embs, approx_scores(codes, q, mode, scale), q, k, n_candidates)
+
+def bytes_per_vector(mode: str, dim: int = EMB_DIM) -> float:
+    return {"float32": 4 * dim, "float16": 2 * dim, "int8": dim, "binary": (dim + 7) // 8}[mode]
@@ -0,0 +1,203 @@
+# -*- coding: utf-8 -*-
+"""
+encoder.py
+- 임베딩 인코더 백엔드 선택(01_make_embeddings / batch_embed / 03_search_cli / API 공용)
+  * torch      : SentenceTransformer 그대로(fp32, 기본값)
+  * onnx       : ONNX Runtime(CPU, 그래프 최적화) fp32
+  * onnx-int8  : ONNX Runtime + 동적 int8 양자화(가중치 int8, 활성값은 실행 중 양자화)
+- 선택: MODEL_NAME 뒤에 "@백엔드"(예: sentence-transformers/all-MiniLM-L6-v2@onnx-int8) 또는 ENCODER_BACKEND
+- ONNX 산출물은 처음 한 번만 export 해서 ENCODER_CACHE(기본 ~/.cache/skala-encoders)/<모델>/ 에 저장
+  (model.onnx, model.int8.onnx, 토크나이저, meta.json — 풀링/정규화/max_seq_length를 원본 모델에서 가져옴)
+- 반환 객체는 SentenceTransformer.encode 와 같은 방식으로 호출:
+    enc = get_encoder(MODEL)
+    embs = enc.encode(texts, batch_size=64, normalize_embeddings=True)
+- 패리티(fp32 대비 코사인 일치)와 CPU 처리량/지연 측정: bench_encoder.py
+필요 패키지: torch 백엔드는 sentence-transformers, onnx 백엔드는 추가로 onnx, onnxruntime
+  (export는 sentence-transformers + torch가 있는 곳에서 한 번만, 이후 실행은 onnxruntime + transformers 토크나이저만 사용)
+환경 변수:
+  ENCODER_BACKEND(torch), ENCODER_CACHE, ENCODER_THREADS(0 = onnxruntime 기본값)
+"""
+import json, os, shutil, sys, tempfile, threading, time
+
+import numpy as np
+
+BACKENDS = ("torch", "onnx", "onnx-int8")
+DEFAULT_BACKEND = os.getenv("ENCODER_BACKEND", "torch")
+CACHE_DIR = os.getenv("ENCODER_CACHE", os.path.join(os.path.expanduser("~"), ".cache", "skala-encoders"))
+OPSET = 14
+
+_encoders: dict = {}
+_lock = threading.Lock()
+
+def resolve(name: str, backend: str | None = None) -> tuple[str, str]:
+    """"모델@백엔드" 형식을 (모델, 백엔드)로. 백엔드 인자가 있으면 그것이 우선"""
+    model, _, suffix = name.partition("@")
+    backend = backend or suffix or DEFAULT_BACKEND
+    if backend not in BACKENDS:
+        raise ValueError(f"unknown encoder backend {backend!r} (choose from {', '.join(BACKENDS)})")
+    return model, backend
+
+def label(name: str, backend: str | None = None) -> str:
+    """manifest 등에 기록할 이름(torch면 모델 이름 그대로 → 기존 산출물과 호환)"""
+    model, backend = resolve(name, backend)
+    return model if backend == "torch" else f"{model}@{backend}"
+
+def get_encoder(name: str, backend: str | None = None):
+    """프로세스당 (모델, 백엔드)별 인코더 1개"""
+    key = resolve(name, backend)
+    enc = _encoders.get(key)
+    if enc is None:
+        with _lock:
+            enc = _encoders.get(key)
+            if enc is None:
+                model, backend = key
+                if backend == "torch":
+                    from sentence_transformers import SentenceTransformer
+                    enc = SentenceTransformer(model)
+                else:
+                    enc = OnnxEncoder(model, quantized=backend == "onnx-int8")
+                _encoders[key] = enc
+    return enc
+
+# ---------------- ONNX export(1회) ----------------
+def artifact_dir(model: str) -> str:
+    return os.path.join(CACHE_DIR, model.replace("/", "__"))
+
+def export_onnx(model: str, out_dir: str | None = None) -> str:
+    """
+    SentenceTransformer의 트랜스포머 본체를 ONNX로 export + 동적 int8 양자화 사본 생성.
+    임시 디렉터리에 만든 뒤 rename 하므로 동시에 여러 프로세스가 export해도 반쯤 쓰인 산출물을 읽지 않음.
+    """
+    import torch
+    from sentence_transformers import SentenceTransformer
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+
+    out_dir = out_dir or artifact_dir(model)
+    st = SentenceTransformer(model, device="cpu")
+    transformer = st[0]
+    pooling = next((m for m in st if type(m).__name__ == "Pooling"), None)
+    mode = pooling.get_pooling_mode_str() if pooling is not None else "mean"
+    if mode not in ("mean", "cls"):
+        raise ValueError(f"{model}: pooling mode {mode!r} is not supported by the onnx backend")
+
+    tok = transformer.tokenizer
+    sample = tok(["export sample"], return_tensors="pt")
+    input_names = [k for k in ("input_ids", "attention_mask", "token_type_ids") if k in sample]
+
+    class _Body(torch.nn.Module):
+        # 출력은 last_hidden_state 하나(풀링은 numpy에서)
+        def __init__(self, hf):
+            super().__init__()
+            self.hf = hf
+
+        def forward(self, *inputs):
+            return self.hf(**dict(zip(input_names, inputs)), return_dict=False)[0]
+
+    os.makedirs(os.path.dirname(out_dir) or ".", exist_ok=True)
+    tmp = tempfile.mkdtemp(prefix=".export-", dir=os.path.dirname(out_dir) or ".")
+    try:
+        fp32 = os.path.join(tmp, "model.onnx")
+        with torch.no_grad():
+            torch.onnx.export(
+                _Body(transformer.auto_model.eval()), tuple(sample[k] for k in input_names), fp32,
+                input_names=input_names, output_names=["last_hidden_state"],
+                dynamic_axes={n: {0: "batch", 1: "seq"} for n in input_names + ["last_hidden_state"]},
+                opset_version=OPSET, do_constant_folding=True,
+            )
+        quantize_dynamic(fp32, os.path.join(tmp, "model.int8.onnx"), weight_type=QuantType.QInt8)
+        tok.save_pretrained(tmp)
+        meta = {
+            "model": model, "pooling": mode,
+            "normalize": any(type(m).__name__ == "Normalize" for m in st),
+            "max_seq_length": st.max_seq_length, "dim": st.get_sentence_embedding_dimension(),
+            "input_names": input_names, "opset": OPSET, "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        }
+        with open(os.path.join(tmp, "meta.json"), "w", encoding="utf-8") as f:
+            json.dump(meta, f, ensure_ascii=False, indent=2)
+        try:
+            os.replace(tmp, out_dir)
+        except OSError:
+            if not os.path.exists(os.path.join(out_dir, "meta.json")):  # 다른 프로세스가 먼저 끝낸 경우가 아니면 오류
+                raise
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+    return out_dir
+
+# ---------------- ONNX Runtime 인코더 ----------------
+class OnnxEncoder:
+    """
+    SentenceTransformer.encode 호환(주요 인자만). 배치는 길이순 정렬로 패딩을 줄이고 원래 순서로 되돌림.
+    세션은 프로세스별로 생성(onnxruntime 스레드풀은 fork 후 쓸 수 없음 → prefork 워커에서 다시 만듦).
+    """
+
+    def __init__(self, model: str, quantized: bool = True, cache_dir: str | None = None):
+        self.model = model
+        self.dir = cache_dir or artifact_dir(model)
+        if not os.path.exists(os.path.join(self.dir, "meta.json")):
+            print(f"[encoder] exporting {model} to ONNX → {self.dir}", file=sys.stderr)
+            export_onnx(model, self.dir)
+        with open(os.path.join(self.dir, "meta.json"), encoding="utf-8") as f:
+            self.meta = json.load(f)
+        self.path = os.path.join(self.dir, "model.int8.onnx" if quantized else "model.onnx")
+        self.max_seq_length = self.meta["max_seq_length"]
+        self._pid = None
+        self._sess = None
+        self._tok = None
+        self._init_lock = threading.Lock()
+
+    def get_sentence_embedding_dimension(self) -> int:
+        return self.meta["dim"]
+
+    def _session(self):
+        if self._pid == os.getpid():
+            return self._sess, self._tok
+        with self._init_lock:
+            if self._pid != os.getpid():
+                self._open()
+        return self._sess, self._tok
+
+    def _open(self):
+        # InferenceSession.run 은 스레드 안전 → 프로세스당 세션 하나를 요청 스레드들이 공유
+        import onnxruntime as ort
+        from transformers import AutoTokenizer
+        opts = ort.SessionOptions()
+        opts.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        threads = int(os.getenv("ENCODER_THREADS", "0"))
+        if threads:
+            opts.intra_op_num_threads = threads
+        self._sess = ort.InferenceSession(self.path, opts, providers=["CPUExecutionProvider"])
+        self._tok = AutoTokenizer.from_pretrained(self.dir)
+        self._pid = os.getpid()
+
+    def _encode_batch(self, texts: list) -> np.ndarray:
+        sess, tok = self._session()
+        enc = tok(texts, padding=True, truncation=True, max_length=self.max_seq_length, return_tensors="np")
+        feeds = {k: enc[k].astype(np.int64) for k in self.meta["input_names"]}
+        hidden = sess.run(None, feeds)[0]  # (B, T, H)
+        if self.meta["pooling"] == "cls":
+            return hidden[:, 0]
+        mask = feeds["attention_mask"][..., None].astype(hidden.dtype)
+        return (hidden * mask).sum(1) / np.clip(mask.sum(1), 1e-9, None)
+
+    def encode(self, sentences, batch_size: int = 32, show_progress_bar: bool = False,
+               convert_to_numpy: bool = True, normalize_embeddings: bool = False, **_):
+        single = isinstance(sentences, str)
+        texts = [sentences] if single else list(sentences)
+        out = np.empty((len(texts), self.meta["dim"]), dtype=np.float32)
+        order = np.argsort([-len(t) for t in texts], kind="stable")
+        for start in range(0, len(texts), batch_size):
+            idx = order[start:start + batch_size]
+            out[idx] = self._encode_batch([texts[i] for i in idx])
+            if show_progress_bar:
+                print(f"\r[encoder] {min(start + batch_size, len(texts))}/{len(texts)}", end="", file=sys.stderr)
+        if show_progress_bar and texts:
+            print(file=sys.stderr)
+        if normalize_embeddings or self.meta["normalize"]:
+            out /= np.clip(np.linalg.norm(out, axis=1, keepdims=True), 1e-12, None)
+        return out[0] if single else out
+
+if __name__ == "__main__":
+    # 산출물 미리 만들기: python encoder.py sentence-transformers/all-MiniLM-L6-v2
+    for name in sys.argv[1:] or [os.getenv("MODEL_NAME", "sentence-transformers/all-MiniLM-L6-v2")]:
+        model, _ = resolve(name, "onnx")
+        print(export_onnx(model))
@@ -0,0 +1,171 @@
+# -*- coding: utf-8 -*-
+"""
+filtered_search.py
+- 태그(text[] + GIN 인덱스) 조건이 붙은 벡터 검색: 조건의 선택도에 따라 사전/사후 필터를 고름
+  * prefilter  : 조건에 맞는 행이 적을 때(≤ TAG_PREFILTER_MAX) — GIN으로 맞는 행만 읽어 float32 전수 정렬(항상 정확)
+  * postfilter : 맞는 행이 많을 때 — ANN(HNSW) 후보 %(cand)s개를 뽑고 조건으로 거른 뒤 정렬
+                 k건이 안 차면 후보 수를 TAG_WIDEN_FACTOR배씩 늘려 다시(최대 TAG_MAX_CANDIDATES = hnsw.ef_search 상한)
+                 그래도 모자라면 prefilter로 마무리 → 흔한 태그는 빠르고, 결과는 항상 k건(맞는 행이 k건 이상이면)
+  * 선택도는 소유자 행 안에서 LIMIT TAG_PREFILTER_MAX+1 로 센 값(GIN 비트맵, RLS 적용)
+- 소유자 경로(tenant_search.plan)와 함께 동작: exact 경로 소유자는 항상 prefilter, partial 경로 소유자만 위 선택을 함
+- 사용:
+    rows, strategy = search(cur, "issues", "id, title", "id, title, 1 - (embedding <=> %(q)s::vector) AS score",
+                            owner_id, k, {"q": qlit}, tags=["auth"], execute=timed_query)
+    results, strategy = search_many(cur, "issues", "id, title", "id, title, 1 - (embedding <=> q.v) AS score",
+                                    owner_id, k, [qlit1, qlit2, ...], tags=["auth"])   # 질의 여러 개를 쿼리 1회로
+환경 변수:
+  TAG_PREFILTER_MAX(2000)    맞는 행이 이 이하면 prefilter
+  TAG_WIDEN_FACTOR(4)        postfilter 후보 확대 배수
+  TAG_MAX_CANDIDATES(1000)   postfilter 후보 상한(pgvector hnsw.ef_search 최대값)
+"""
+import os
+
+import compact_vectors as cv
+import tenant_search
+
+PREFILTER_MAX = int(os.getenv("TAG_PREFILTER_MAX", "2000"))
+WIDEN_FACTOR = int(os.getenv("TAG_WIDEN_FACTOR", "4"))
+MAX_CANDIDATES = int(os.getenv("TAG_MAX_CANDIDATES", "1000"))
+MATCH_OPS = {"all": "@>", "any": "&&"}
+
+def parse_tags(value) -> list[str]:
+    """"backend, UI" / ["auth", "ui,search"] → 소문자, 공백 제거, 중복 제거(순서 유지)"""
+    if value is None:
+        return []
+    items = [value] if isinstance(value, str) else list(value)
+    out = []
+    for item in items:
+        for t in str(item).split(","):
+            t = t.strip().lower()
+            if t and t not in out:
+                out.append(t)
+    return out
+
+def tags_ddl(table: str, tag_column: str = "tags") -> list[str]:
+    name = table.replace(".", "_").replace('"', "")
+    return [f"ALTER TABLE {table} ADD COLUMN IF NOT EXISTS {tag_column} text[] NOT NULL DEFAULT '{{}}'",
+            f"CREATE INDEX IF NOT EXISTS {name}_{tag_column}_gin ON {table} USING gin ({tag_column})"]
+
+def _fetch(cur, sql, params):
+    cur.execute(sql, params)
+    return cur.fetchall()
+
+def count_matches(cur, table: str, where: str, params: dict, limit: int = PREFILTER_MAX) -> int:
+    """조건에 맞는 행 수(limit+1에서 멈춤 → 흔한 태그도 비용이 일정)"""
+    cur.execute(f"SELECT count(*) FROM (SELECT 1 FROM {table} WHERE {where} LIMIT {int(limit) + 1}) AS m", params)
+    return cur.fetchone()[0]
+
+def plan(cur, table: str, columns: str, owner: int, k: int, tags=None, match: str = "all",
+         mode: str = cv.STORAGE, dim: int = cv.EMB_DIM, tag_column: str = "tags", owner_column: str = "owner_id",
+         column: str = "embedding", param: str = "%(q)s") -> tuple[str, str, list[str], str | None]:
+    """
+    (경로, FROM 대상, SET LOCAL 목록, prefilter FROM 대상). 태그가 없으면 tenant_search.plan 그대로.
+    postfilter면 FROM 대상에 %(cand)s가 있고 ef_search는 실행하는 쪽이 후보 수에 맞춰 설정.
+    param: 질의 벡터 식(단건 "%(q)s", LATERAL 배치 "q.v")
+    """
+    if match not in MATCH_OPS:
+        raise ValueError(f"match must be one of {', '.join(MATCH_OPS)}")
+    tags = parse_tags(tags)
+    strategy, src, settings = tenant_search.plan(cur, table, columns, owner, k, mode, dim, owner_column, column, param)
+    if not tags:
+        return strategy, src, settings, None
+
+    cond = f"{tag_column} {MATCH_OPS[match]} %(tags)s::text[]"
+    where = f"{owner_column} = {int(owner)} AND {cond}"
+    # OFFSET 0: GIN(+ owner btree)로 맞는 행만 읽고, 바깥 ORDER BY가 HNSW로 내려가지 않게 막음
+    prefilter = f"(SELECT {columns}, {column} FROM {table} WHERE {where} OFFSET 0) AS c"
+    if strategy == "exact" or count_matches(cur, table, where, {"tags": tags}) <= PREFILTER_MAX:
+        return "prefilter", prefilter, [], prefilter
+
+    # 소유자 부분 인덱스(WHERE owner_id = N)로 후보를 뽑고 태그로 거름
+    inner_cols = columns if tag_column in [c.strip() for c in columns.split(",")] else f"{columns}, {tag_column}"
+    src = (f"(SELECT * FROM (SELECT {inner_cols}, {column} FROM {table} WHERE {owner_column} = {int(owner)} "
+           f"ORDER BY {cv.candidate_order(mode, dim, column, param)} LIMIT %(cand)s) AS c0 WHERE {cond}) AS c")
+    return "postfilter", src, [], prefilter
+
+def _execute(cur, strategy: str, src: str, settings: list[str], prefilter: str | None, run, n: int, k: int, cand: int):
+    """
+    run(src, 질의 번호 목록, 후보 수) → 질의별 rows. postfilter는 k건이 안 찬 질의만 후보를 늘려 다시 실행하고
+    TAG_MAX_CANDIDATES에서도 모자라면 그 질의들만 prefilter로 마무리. 반환: (질의별 rows, 경로)
+    """
+    if strategy != "postfilter":
+        for s in settings:
+            cur.execute(s)
+        return run(src, list(range(n)), cand), strategy
+    results = [None] * n
+    pending = list(range(n))
+    cand = min(cand, MAX_CANDIDATES)
+    while True:
+        cur.execute(f"SET LOCAL hnsw.ef_search = {max(cand, 40)}")
+        short = []
+        for i, rows in zip(pending, run(src, pending, cand)):
+            if len(rows) >= k:
+                results[i] = rows
+            else:
+                short.append(i)
+        pending = short
+        if not pending:
+            return results, strategy
+        if cand >= MAX_CANDIDATES:
+            for i, rows in zip(pending, run(prefilter, pending, cand)):
+                results[i] = rows
+            return results, "postfilter_exact"
+        cand = min(cand * WIDEN_FACTOR, MAX_CANDIDATES)
+
+def search(cur, table: str, columns: str, select: str, owner: int, k: int, params: dict, tags=None,
+           match: str = "all", mode: str = cv.STORAGE, dim: int = cv.EMB_DIM, execute=None,
+           tag_column: str = "tags", owner_column: str = "owner_id", column: str = "embedding"):
+    """
+    (rows, 경로). select는 바깥 SELECT 목록(FROM 대상은 columns + column을 가진 서브쿼리).
+    params에는 q를 넣고 k / cand / tags는 여기서 채움. execute(cur, sql, params) → rows (기본 execute + fetchall).
+    RLS용 SET LOCAL app.user_id 는 호출한 쪽에서 먼저 실행.
+    """
+    execute = execute or _fetch
+    tags = parse_tags(tags)
+    params = dict(params, k=k, tags=tags)
+    strategy, src, settings, prefilter = plan(cur, table, columns, owner, k, tags, match, mode, dim,
+                                              tag_column, owner_column, column)
+
+    def run(src, idx, cand):
+        sql = f"SELECT {select} FROM {src} ORDER BY {column} <=> %(q)s::vector LIMIT %(k)s"
+        return [execute(cur, sql, dict(params, cand=cand))]
+
+    results, strategy = _execute(cur, strategy, src, settings, prefilter, run, 1, k, cv.candidates(k))
+    return results[0], strategy
+
+def search_many(cur, table: str, columns: str, select: str, owner: int, k: int, vectors: list[str], tags=None,
+                match: str = "all", mode: str = cv.STORAGE, dim: int = cv.EMB_DIM, execute=None,
+                tag_column: str = "tags", owner_column: str = "owner_id", column: str = "embedding"):
+    """
+    여러 질의 벡터(pgvector 텍스트 '[...]')를 쿼리 한 번(unnest + LATERAL)으로 검색 → (질의별 rows 입력 순서, 경로).
+    select에서 질의 벡터는 q.v 로 참조(예: "id, title, 1 - (embedding <=> q.v) AS score").
+    경로 선택(소유자/태그 선택도)은 질의와 무관하므로 배치당 한 번.
+    """
+    execute = execute or _fetch
+    tags = parse_tags(tags)
+    params = {"k": k, "tags": tags}
+    strategy, src, settings, prefilter = plan(cur, table, columns, owner, k, tags, match, mode, dim,
+                                              tag_column, owner_column, column, param="q.v")
+
+    def run(src, idx, cand):
+        # 질의 안의 정렬은 거리(_dist)로 다시 맞춤(바깥 ORDER BY q.ord 만으로는 LATERAL 결과 순서가 보장되지 않음)
+        sql = f"""
+        WITH q AS (
+            SELECT ord, lit::vector AS v FROM unnest(%(qs)s::text[]) WITH ORDINALITY AS t(lit, ord)
+        )
+        SELECT q.ord, n.*
+        FROM q
+        CROSS JOIN LATERAL (
+            SELECT {select}, {column} <=> q.v AS _dist
+            FROM {src}
+            ORDER BY {column} <=> q.v
+            LIMIT %(k)s
+        ) AS n
+        ORDER BY q.ord, n._dist
+        """
+        out = [[] for _ in idx]
+        for r in execute(cur, sql, dict(params, qs=[vectors[i] for i in idx], cand=cand)):
+            out[r[0] - 1].append(r[1:-1])
+        return out
+
+    return _execute(cur, strategy, src, settings, prefilter, run, len(vectors), k, cv.candidates(k))
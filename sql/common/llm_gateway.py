@@ -0,0 +1,301 @@
+# -*- coding: utf-8 -*-
+"""
+llm_gateway.py
+- /rag(sql/bugs/api) 와 /recommend_llm(sql/pandas) 이 함께 쓰는 LLM 호출 게이트웨이
+  * 프로세스당 OpenAI 클라이언트 1개(HTTP keep-alive 커넥션 풀 재사용)
+  * 동시 호출 상한(in-flight cap) + 토큰 버킷 속도 제한
+  * 지수 백오프 재시도 + 호출별 deadline
+  * (model, temperature, prompt 해시) 키의 영구 응답 캐시(sqlite) + 동일 요청 중복 대기 제거
+  * stream(): 토큰 단위 스트리밍(LLMStream.close()로 상류 호출 즉시 취소)
+환경변수:
+  OPENAI_API_KEY, OPENAI_BASE_URL(모의 서버: mock_llm_server.py), OPENAI_MODEL
+  LLM_MAX_IN_FLIGHT(8), LLM_RATE_PER_SEC(5), LLM_BURST(10), LLM_MAX_RETRIES(3),
+  LLM_TIMEOUT(30초), LLM_CACHE_PATH(llm_cache.sqlite3, 빈 값이면 캐시 끔)
+"""
+import os, time, random, sqlite3, hashlib, threading
+from concurrent.futures import Future
+
+try:
+    from openai import OpenAI
+except Exception:
+    OpenAI = None  # handled at runtime
+
+DEFAULT_MODEL = os.getenv("OPENAI_MODEL", "gpt-4o-mini")
+RETRYABLE_STATUS = {408, 409, 429, 500, 502, 503, 504}
+
+class LLMDeadlineExceeded(TimeoutError):
+    pass
+
+class TokenBucket:
+    """초당 rate개씩 채워지고 최대 burst개까지 쌓이는 토큰 버킷"""
+    def __init__(self, rate: float, burst: int):
+        self.rate = float(rate)
+        self.capacity = float(max(burst, 1))
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self, deadline: float | None = None):
+        if self.rate <= 0:
+            return
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            if deadline is not None and time.monotonic() + wait > deadline:
+                raise LLMDeadlineExceeded("rate limit wait exceeds deadline")
+            time.sleep(wait)
+
+class ResponseCache:
+    """sqlite 기반 영구 캐시. 키 = sha256(model, temperature, prompt)"""
+    def __init__(self, path: str):
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.lock = threading.Lock()
+        with self.lock, self.conn:
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.execute("""CREATE TABLE IF NOT EXISTS llm_cache (
+                key TEXT PRIMARY KEY, model TEXT, temperature REAL,
+                response TEXT NOT NULL, created_at REAL NOT NULL)""")
+
+    @staticmethod
+    def make_key(model: str, temperature: float, prompt: str) -> str:
+        h = hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+        return f"{model}|{temperature:.3f}|{h}"
+
+    def get(self, key: str) -> str | None:
+        with self.lock:
+            row = self.conn.execute("SELECT response FROM llm_cache WHERE key=?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def put(self, key: str, model: str, temperature: float, response: str):
+        with self.lock, self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO llm_cache VALUES (?,?,?,?,?)",
+                (key, model, temperature, response, time.time()),
+            )
+
+class LLMGateway:
+    def __init__(self, api_key=None, base_url=None, max_in_flight=8, rate_per_sec=5.0,
+                 burst=10, max_retries=3, timeout=30.0, cache_path="llm_cache.sqlite3"):
+        self.api_key = api_key
+        self.base_url = base_url
+        self.max_retries = max_retries
+        self.timeout = timeout
+        self.slots = threading.BoundedSemaphore(max_in_flight)
+        self.bucket = TokenBucket(rate_per_sec, burst)
+        self.cache = ResponseCache(cache_path) if cache_path else None
+        self._client = None
+        self._client_lock = threading.Lock()
+        self._pending: dict[str, Future] = {}
+        self._pending_lock = threading.Lock()
+        self.stats = {"calls": 0, "cache_hits": 0, "coalesced": 0, "retries": 0,
+                      "errors": 0, "in_flight": 0, "cancelled": 0}
+        self._stats_lock = threading.Lock()
+
+    def _bump(self, name: str, n: int = 1):
+        with self._stats_lock:
+            self.stats[name] += n
+
+    @property
+    def available(self) -> bool:
+        return OpenAI is not None and bool(self.api_key)
+
+    @property
+    def client(self):
+        # 클라이언트는 한 번만 생성 → 내부 httpx 커넥션 풀을 모든 요청이 공유
+        if self._client is None:
+            with self._client_lock:
+                if self._client is None:
+                    kwargs = {"api_key": self.api_key, "max_retries": 0, "timeout": self.timeout}
+                    if self.base_url:
+                        kwargs["base_url"] = self.base_url
+                    self._client = OpenAI(**kwargs)
+        return self._client
+
+    def complete(self, prompt: str, model: str | None = None, temperature: float = 0.2,
+                 timeout: float | None = None, use_cache: bool = True) -> str:
+        """
+        prompt 한 개에 대한 완성 텍스트 반환.
+        - 캐시 적중 시 API를 부르지 않음
+        - 같은 키가 이미 호출 중이면 새로 호출하지 않고 그 결과를 기다림
+        - timeout: 대기/재시도를 모두 포함한 호출 전체 deadline(초)
+        """
+        model = model or DEFAULT_MODEL
+        deadline = time.monotonic() + (timeout or self.timeout)
+        key = ResponseCache.make_key(model, temperature, prompt)
+
+        if use_cache and self.cache:
+            hit = self.cache.get(key)
+            if hit is not None:
+                self._bump("cache_hits")
+                return hit
+
+        with self._pending_lock:
+            fut = self._pending.get(key)
+            owner = fut is None
+            if owner:
+                fut = self._pending[key] = Future()
+        if not owner:
+            self._bump("coalesced")
+            return fut.result(timeout=max(deadline - time.monotonic(), 0))
+
+        try:
+            text = self._call(prompt, model, temperature, deadline)
+            if use_cache and self.cache:
+                self.cache.put(key, model, temperature, text)
+            fut.set_result(text)
+            return text
+        except BaseException as e:
+            fut.set_exception(e)
+            raise
+        finally:
+            with self._pending_lock:
+                self._pending.pop(key, None)
+
+    def _call(self, prompt, model, temperature, deadline) -> str:
+        attempt = 0
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise LLMDeadlineExceeded("LLM call deadline exceeded")
+            self.bucket.acquire(deadline)
+            if not self.slots.acquire(timeout=max(deadline - time.monotonic(), 0)):
+                raise LLMDeadlineExceeded("no free LLM slot before deadline")
+            self._bump("in_flight")
+            try:
+                self._bump("calls")
+                resp = self.client.chat.completions.create(
+                    model=model,
+                    messages=[{"role": "user", "content": prompt}],
+                    temperature=temperature,
+                    timeout=max(deadline - time.monotonic(), 0.001),
+                )
+                return resp.choices[0].message.content.strip()
+            except Exception as e:
+                attempt += 1
+                if attempt > self.max_retries or not _is_retryable(e):
+                    self._bump("errors")
+                    raise
+                self._bump("retries")
+            finally:
+                self._bump("in_flight", -1)
+                self.slots.release()
+            # 지수 백오프 + full jitter, deadline을 넘기지 않도록 제한
+            backoff = random.uniform(0, min(8.0, 0.25 * 2 ** attempt))
+            if time.monotonic() + backoff >= deadline:
+                raise LLMDeadlineExceeded("LLM call deadline exceeded while retrying")
+            time.sleep(backoff)
+
+    def stream(self, prompt: str, model: str | None = None, temperature: float = 0.2,
+               timeout: float | None = None, use_cache: bool = True) -> "LLMStream":
+        """토큰(delta) 단위로 순회 가능한 LLMStream 반환. 끝까지 받으면 캐시에 저장"""
+        model = model or DEFAULT_MODEL
+        deadline = time.monotonic() + (timeout or self.timeout)
+        return LLMStream(self, prompt, model, temperature, deadline, use_cache)
+
+class LLMStream:
+    """
+    gateway.stream() 결과. 다른 스레드에서 close()를 불러도 안전:
+    상류 HTTP 응답을 닫아 블로킹 중인 읽기를 깨우고 슬롯을 반납한다(클라이언트 연결 끊김 대응).
+    """
+    def __init__(self, gateway, prompt, model, temperature, deadline, use_cache):
+        self.gateway = gateway
+        self.prompt = prompt
+        self.model = model
+        self.temperature = temperature
+        self.deadline = deadline
+        self.use_cache = use_cache
+        self.cancelled = False
+        self._upstream = None
+
+    def close(self):
+        if self.cancelled:
+            return
+        self.cancelled = True
+        upstream = self._upstream
+        if upstream is not None:
+            try:
+                upstream.close()
+            except Exception:
+                pass
+
+    def __iter__(self):
+        gw = self.gateway
+        key = ResponseCache.make_key(self.model, self.temperature, self.prompt)
+        if self.use_cache and gw.cache:
+            hit = gw.cache.get(key)
+            if hit is not None:
+                gw._bump("cache_hits")
+                yield hit
+                return
+
+        gw.bucket.acquire(self.deadline)
+        if not gw.slots.acquire(timeout=max(self.deadline - time.monotonic(), 0)):
+            raise LLMDeadlineExceeded("no free LLM slot before deadline")
+        gw._bump("in_flight")
+        parts = []
+        try:
+            gw._bump("calls")
+            self._upstream = gw.client.chat.completions.create(
+                model=self.model,
+                messages=[{"role": "user", "content": self.prompt}],
+                temperature=self.temperature,
+                stream=True,
+                timeout=max(self.deadline - time.monotonic(), 0.001),
+            )
+            for chunk in self._upstream:
+                if self.cancelled:
+                    break
+                delta = chunk.choices[0].delta.content if chunk.choices else None
+                if delta:
+                    parts.append(delta)
+                    yield delta
+            if not self.cancelled and self.use_cache and gw.cache:
+                gw.cache.put(key, self.model, self.temperature, "".join(parts).strip())
+        except Exception:
+            # close()로 끊은 경우 읽기 쪽 예외는 정상 종료로 취급
+            if not self.cancelled:
+                gw._bump("errors")
+                raise
+        finally:
+            if self.cancelled:
+                gw._bump("cancelled")
+            if self._upstream is not None:
+                try:
+                    self._upstream.close()
+                except Exception:
+                    pass
+            gw._bump("in_flight", -1)
+            gw.slots.release()
+
+def _is_retryable(e: Exception) -> bool:
+    status = getattr(e, "status_code", None)
+    if status is not None:
+        return status in RETRYABLE_STATUS
+    return type(e).__name__ in {"APIConnectionError", "APITimeoutError", "TimeoutError"}
+
+_GATEWAY: LLMGateway | None = None
+_GATEWAY_LOCK = threading.Lock()
+
+def get_gateway() -> LLMGateway:
+    """프로세스 전역 게이트웨이(환경변수로 설정)"""
+    global _GATEWAY
+    if _GATEWAY is None:
+        with _GATEWAY_LOCK:
+            if _GATEWAY is None:
+                _GATEWAY = LLMGateway(
+                    api_key=os.getenv("OPENAI_API_KEY"),
+                    base_url=os.getenv("OPENAI_BASE_URL") or None,
+                    max_in_flight=int(os.getenv("LLM_MAX_IN_FLIGHT", "8")),
+                    rate_per_sec=float(os.getenv("LLM_RATE_PER_SEC", "5")),
+                    burst=int(os.getenv("LLM_BURST", "10")),
+                    max_retries=int(os.getenv("LLM_MAX_RETRIES", "3")),
+                    timeout=float(os.getenv("LLM_TIMEOUT", "30")),
+                    cache_path=os.getenv("LLM_CACHE_PATH", "llm_cache.sqlite3"),
+                )
+    return _GATEWAY
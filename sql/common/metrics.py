@@ -0,0 +1,278 @@
+# -*- coding: utf-8 -*-
+"""
+metrics.py
+- 모든 FastAPI 앱 공용 /metrics (Prometheus 텍스트 형식 0.0.4, 외부 라이브러리 없음)
+  * http_requests_total{method,route,status}           요청 수
+  * http_request_duration_seconds{route}               요청 지연 히스토그램
+  * http_request_stage_seconds{route,stage}            단계별 지연(encode/pool/sql/llm/serialize, request_log 값 재사용)
+  * encoder_batch_size                                 model.encode 한 번에 넣은 문장 수
+  * db_pool_connections{pool,state=in_use|idle|max}    커넥션 풀 사용량(register_pool)
+  * llm_* / llm_cache_hit_ratio                        공용 LLM 게이트웨이 통계(호출/캐시 적중/in-flight)
+  * embedding_version_* / embedding_backfill_*         임베딩 버전별 검색 수, 백필 진행/속도/검색 probe p95
+                                                       (embedding_versions.py, 요청 지연과 나란히 보면 백필 영향 확인)
+- 수집 비용: 값은 스레드별 샤드(dict)에 락 없이 누적하고 /metrics 조회 때만 합산
+  (락은 스레드가 처음 기록할 때 샤드를 등록하는 1회뿐)
+- Prometheus 서버 없이 확인: render() 문자열 또는 TestClient로 GET /metrics
+사용:
+    app = FastAPI(...)
+    install_request_logging(app)
+    install_metrics(app)           # /metrics 추가 + 요청 관찰자 등록
+"""
+import bisect, os, sys, threading
+
+from fastapi.responses import PlainTextResponse
+
+import request_log
+
+# 초 단위 기본 버킷(임베딩 수 ms ~ LLM 수십 초)
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+BATCH_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256, 512)
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+class _Shards:
+    """스레드별 dict. 쓰기는 소유 스레드만, 읽기(합산)는 copy()로 스냅샷"""
+    def __init__(self):
+        self._local = threading.local()
+        self._all: list[dict] = []
+        self._lock = threading.Lock()
+
+    def mine(self) -> dict:
+        d = getattr(self._local, "d", None)
+        if d is None:
+            d = self._local.d = {}
+            with self._lock:
+                self._all.append(d)
+        return d
+
+    def snapshots(self) -> list[dict]:
+        with self._lock:
+            shards = list(self._all)
+        return [d.copy() for d in shards]
+
+class Counter:
+    def __init__(self, name: str, doc: str, labels: tuple = ()):
+        self.name, self.doc, self.labels = name, doc, labels
+        self._shards = _Shards()
+
+    def inc(self, *label_values, n: float = 1):
+        d = self._shards.mine()
+        d[label_values] = d.get(label_values, 0) + n
+
+    def collect(self) -> dict:
+        total: dict = {}
+        for d in self._shards.snapshots():
+            for k, v in d.items():
+                total[k] = total.get(k, 0) + v
+        return total
+
+    def render(self, out: list):
+        out.append(f"# HELP {self.name} {self.doc}\n# TYPE {self.name} counter\n")
+        for k, v in sorted(self.collect().items()):
+            out.append(f"{self.name}{_labels(self.labels, k)} {_num(v)}\n")
+
+class Histogram:
+    def __init__(self, name: str, doc: str, labels: tuple = (), buckets=LATENCY_BUCKETS):
+        self.name, self.doc, self.labels = name, doc, labels
+        self.buckets = tuple(buckets)
+        self._shards = _Shards()
+
+    def observe(self, value: float, *label_values):
+        d = self._shards.mine()
+        row = d.get(label_values)
+        if row is None:
+            # [버킷별 개수..., +Inf 개수, 합계]
+            row = d[label_values] = [0] * (len(self.buckets) + 1) + [0.0]
+        row[bisect.bisect_left(self.buckets, value)] += 1
+        row[-1] += value
+
+    def collect(self) -> dict:
+        total: dict = {}
+        for d in self._shards.snapshots():
+            for k, row in d.items():
+                row = list(row)
+                acc = total.get(k)
+                total[k] = row if acc is None else [a + b for a, b in zip(acc, row)]
+        return total
+
+    def render(self, out: list):
+        out.append(f"# HELP {self.name} {self.doc}\n# TYPE {self.name} histogram\n")
+        for k, row in sorted(self.collect().items()):
+            cum = 0
+            for le, c in zip(self.buckets + ("+Inf",), row[:-1]):
+                cum += c
+                out.append(f"{self.name}_bucket{_labels(self.labels + ('le',), k + (_num(le),))} {cum}\n")
+            out.append(f"{self.name}_sum{_labels(self.labels, k)} {_num(row[-1])}\n")
+            out.append(f"{self.name}_count{_labels(self.labels, k)} {cum}\n")
+
+class Gauge:
+    """조회 시점에 fn()이 돌려주는 {label_values: 값}을 그대로 출력(상태 값: 풀 사용량, in-flight 등)"""
+    def __init__(self, name: str, doc: str, labels: tuple, fn, kind: str = "gauge"):
+        self.name, self.doc, self.labels, self.fn, self.kind = name, doc, labels, fn, kind
+
+    def render(self, out: list):
+        try:
+            values = self.fn()
+        except Exception:
+            return
+        if not values:
+            return
+        out.append(f"# HELP {self.name} {self.doc}\n# TYPE {self.name} {self.kind}\n")
+        for k, v in sorted(values.items()):
+            out.append(f"{self.name}{_labels(self.labels, k)} {_num(v)}\n")
+
+def _num(v) -> str:
+    if isinstance(v, str):
+        return v
+    return str(int(v)) if float(v).is_integer() else repr(float(v))
+
+def _labels(names: tuple, values: tuple) -> str:
+    if not names:
+        return ""
+    esc = lambda s: str(s).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+    return "{" + ",".join(f'{n}="{esc(v)}"' for n, v in zip(names, values)) + "}"
+
+# ---------------- 기본 메트릭 ----------------
+REGISTRY: list = []
+
+def register(metric):
+    REGISTRY.append(metric)
+    return metric
+
+REQUESTS = register(Counter("http_requests_total", "HTTP requests", ("method", "route", "status")))
+LATENCY = register(Histogram("http_request_duration_seconds", "HTTP request latency", ("route",)))
+STAGES = register(Histogram("http_request_stage_seconds", "Per-stage latency within a request", ("route", "stage")))
+ENCODE_BATCH = register(Histogram("encoder_batch_size", "Texts per model.encode call", (), BATCH_BUCKETS))
+
+SEARCH_STRATEGY = register(Counter("vector_search_strategy_total", "Owner-scoped vector searches by strategy",
+                                   ("strategy",)))
+
+EMBEDDING_VERSION = register(Counter("embedding_version_queries_total", "Vector searches by embedding model version",
+                                     ("table", "version")))
+
+def observe_encode(batch_size: int):
+    ENCODE_BATCH.observe(batch_size)
+
+def observe_search_strategy(strategy: str):
+    SEARCH_STRATEGY.inc(strategy)
+
+def observe_embedding_version(table: str, version: int):
+    EMBEDDING_VERSION.inc(table, str(version))
+
+def _on_request(method, route, status, duration_s, stages_ms):
+    REQUESTS.inc(method, route, str(status))
+    LATENCY.observe(duration_s, route)
+    for stage, ms in stages_ms.items():
+        STAGES.observe(ms / 1000, route, stage)
+
+# 커넥션 풀: psycopg2 SimpleConnectionPool/ThreadedConnectionPool(_used/_pool/maxconn)
+_POOLS: dict = {}
+
+def register_pool(name: str, pool):
+    _POOLS[name] = pool
+
+def _pool_values():
+    out = {}
+    for name, pool in list(_POOLS.items()):
+        if pool is None or getattr(pool, "closed", False):
+            continue
+        out[(name, "in_use")] = len(pool._used)
+        out[(name, "idle")] = len(pool._pool)
+        out[(name, "max")] = pool.maxconn
+    return out
+
+register(Gauge("db_pool_connections", "DB pool connections by state", ("pool", "state"), _pool_values))
+
+# LLM 게이트웨이: 이미 만들어진 경우에만 읽음(메트릭 조회가 게이트웨이를 생성하지 않도록)
+def _gateway_stats():
+    mod = sys.modules.get("llm_gateway")
+    gw = getattr(mod, "_GATEWAY", None) if mod else None
+    return dict(gw.stats) if gw is not None else None
+
+def _gateway_counter(key):
+    def fn():
+        s = _gateway_stats()
+        return {(): s[key]} if s else None
+    return fn
+
+for _key, _doc in [("calls", "Upstream LLM calls"), ("cache_hits", "LLM responses served from cache"),
+                   ("coalesced", "LLM requests merged into an identical in-flight call"),
+                   ("retries", "LLM call retries"), ("errors", "LLM calls that failed after retries"),
+                   ("cancelled", "Streaming LLM calls cancelled by the client")]:
+    register(Gauge(f"llm_{_key}_total", _doc, (), _gateway_counter(_key), kind="counter"))
+register(Gauge("llm_in_flight", "LLM calls currently in flight", (), _gateway_counter("in_flight")))
+
+def _cache_ratio():
+    s = _gateway_stats()
+    if not s:
+        return None
+    served = s["cache_hits"] + s["calls"]
+    return {(): s["cache_hits"] / served if served else 0.0}
+
+register(Gauge("llm_cache_hit_ratio", "cache_hits / (cache_hits + upstream calls)", (), _cache_ratio))
+
+# 임베딩 버전/백필: 앱이 이미 읽어 둔 embedding_versions 캐시만 사용(EMBED_VERSION_TTL마다 갱신, DB 조회 없음)
+def _versions(fn):
+    def values():
+        mod = sys.modules.get("embedding_versions")
+        if mod is None:
+            return None
+        out = {}
+        for table, rows in mod.snapshot().items():
+            for r in rows:
+                out.update(fn(table, r))
+        return out
+    return values
+
+register(Gauge("embedding_version_info", "Registered embedding versions (1 = active, 0 = other states)",
+               ("table", "version", "model", "state"),
+               _versions(lambda t, r: {(t, str(r["version"]), r["model"], r["state"]): int(r["state"] == "active")})))
+register(Gauge("embedding_backfill_rows", "Rows written by the embedding backfill", ("table", "version"),
+               _versions(lambda t, r: {(t, str(r["version"])): r["rows_done"]})))
+register(Gauge("embedding_backfill_rows_per_second", "Embedding backfill throughput (last run)", ("table", "version"),
+               _versions(lambda t, r: {(t, str(r["version"])): r["rows_per_s"]} if r["rows_per_s"] is not None
+                         else {})))
+register(Gauge("embedding_backfill_probe_p95_seconds",
+               "Search probe p95 seen by the backfill (kind=baseline: before it started)", ("table", "version", "kind"),
+               _versions(lambda t, r: {(t, str(r["version"]), kind): r[f"{key}_p95_ms"] / 1000
+                                       for kind, key in (("during", "probe"), ("baseline", "baseline"))
+                                       if r[f"{key}_p95_ms"] is not None})))
+
+def render() -> str:
+    out: list = []
+    for metric in REGISTRY:
+        metric.render(out)
+    return "".join(out)
+
+def install_metrics(app, path: str = "/metrics"):
+    """/metrics 라우트 추가 + 요청 관찰자 등록(request_log 미들웨어가 없으면 함께 설치)"""
+    if not any(m.cls is request_log.RequestLogMiddleware for m in app.user_middleware):
+        request_log.install_request_logging(app)
+    request_log.add_observer(_on_request)
+
+    def metrics_endpoint():
+        return PlainTextResponse(render(), media_type=CONTENT_TYPE)
+
+    app.add_api_route(path, metrics_endpoint, methods=["GET"], include_in_schema=False)
+    return app
+
+if __name__ == "__main__":
+    # Prometheus 없이 확인: 가짜 요청 몇 개를 보내고 /metrics 출력
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+
+    os.environ.setdefault("REQUEST_LOG_SAMPLE", "0")
+    demo = FastAPI()
+    request_log.install_request_logging(demo, sample=0, slow_ms=0)
+    install_metrics(demo)
+
+    @demo.get("/search")
+    def search(q: str):
+        with request_log.stage("encode"):
+            observe_encode(1)
+        return {"q": q}
+
+    client = TestClient(demo)
+    for i in range(5):
+        client.get("/search", params={"q": str(i)})
+    client.get("/missing")
+    print(client.get("/metrics").text)
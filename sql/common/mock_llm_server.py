@@ -0,0 +1,112 @@
+# -*- coding: utf-8 -*-
+"""
+mock_llm_server.py
+- OpenAI 호환 /v1/chat/completions 를 흉내 내는 로컬 모의 서버(외부 호출/과금 없음)
+- 게이트웨이 검증과 벤치마크에서 실제 API 대신 사용
+- "stream": true 요청이면 토큰을 SSE(data: {...}) 청크로 token-ms 간격으로 흘려보냄
+  (클라이언트가 중간에 끊으면 server.cancelled 증가 → 상류 취소 여부 확인용)
+Usage:
+  python mock_llm_server.py --port 8999 --latency-ms 300 --fail-rate 0.1 --token-ms 30
+  # 앱 쪽: OPENAI_BASE_URL=http://127.0.0.1:8999/v1  OPENAI_API_KEY=mock
+"""
+import argparse, json, random, threading, time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+class MockLLMHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive 지원(커넥션 재사용 효과 측정용)
+
+    def log_message(self, *args):
+        pass
+
+    def _send_json(self, status, body):
+        data = json.dumps(body, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        req = json.loads(self.rfile.read(length) or b"{}")
+        srv = self.server
+        with srv.lock:
+            srv.requests += 1
+        if not self.path.endswith("/chat/completions"):
+            return self._send_json(404, {"error": {"message": "not found"}})
+        if random.random() < srv.fail_rate:
+            return self._send_json(503, {"error": {"message": "mock overload"}})
+        time.sleep(srv.latency_ms / 1000)
+
+        prompt = (req.get("messages") or [{}])[-1].get("content", "")
+        text = f"[MOCK] {len(prompt)} chars received"
+        if req.get("stream"):
+            return self._stream(req, text)
+        self._send_json(200, {
+            "id": f"chatcmpl-mock-{srv.requests}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": req.get("model", "mock"),
+            "choices": [{"index": 0, "finish_reason": "stop",
+                         "message": {"role": "assistant", "content": text}}],
+            "usage": {"prompt_tokens": len(prompt) // 4, "completion_tokens": 8,
+                      "total_tokens": len(prompt) // 4 + 8},
+        })
+
+    def _stream(self, req, text):
+        srv = self.server
+        self.close_connection = True
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Connection", "close")
+        self.end_headers()
+        base = {"id": f"chatcmpl-mock-{srv.requests}", "object": "chat.completion.chunk",
+                "created": int(time.time()), "model": req.get("model", "mock")}
+        tokens = [w + " " for w in text.split()] * srv.stream_repeat
+        try:
+            for tok in tokens:
+                chunk = dict(base, choices=[{"index": 0, "delta": {"content": tok},
+                                             "finish_reason": None}])
+                self.wfile.write(f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n".encode("utf-8"))
+                self.wfile.flush()
+                time.sleep(srv.token_ms / 1000)
+            done = dict(base, choices=[{"index": 0, "delta": {}, "finish_reason": "stop"}])
+            self.wfile.write(f"data: {json.dumps(done)}\n\ndata: [DONE]\n\n".encode("utf-8"))
+            self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            with srv.lock:
+                srv.cancelled += 1
+
+def make_server(port=0, latency_ms=200, fail_rate=0.0, host="127.0.0.1",
+                token_ms=20, stream_repeat=5):
+    srv = ThreadingHTTPServer((host, port), MockLLMHandler)
+    srv.daemon_threads = True
+    srv.latency_ms = latency_ms
+    srv.fail_rate = fail_rate
+    srv.token_ms = token_ms
+    srv.stream_repeat = stream_repeat  # 스트리밍 응답 길이 조절(토큰 수 = 단어 수 × repeat)
+    srv.requests = 0
+    srv.cancelled = 0
+    srv.lock = threading.Lock()
+    return srv
+
+def start_in_thread(port=0, latency_ms=200, fail_rate=0.0, token_ms=20, stream_repeat=5):
+    """백그라운드 스레드로 기동 → (server, base_url) 반환. 종료: server.shutdown()"""
+    srv = make_server(port, latency_ms, fail_rate, token_ms=token_ms, stream_repeat=stream_repeat)
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    host, port = srv.server_address[:2]
+    return srv, f"http://{host}:{port}/v1"
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--port", type=int, default=8999)
+    ap.add_argument("--latency-ms", type=int, default=200)
+    ap.add_argument("--fail-rate", type=float, default=0.0)
+    ap.add_argument("--token-ms", type=int, default=20)
+    args = ap.parse_args()
+    srv = make_server(args.port, args.latency_ms, args.fail_rate, token_ms=args.token_ms)
+    print(f"mock LLM on http://127.0.0.1:{args.port}/v1 (latency={args.latency_ms}ms)")
+    srv.serve_forever()
+
+if __name__ == "__main__":
+    main()
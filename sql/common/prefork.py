@@ -0,0 +1,213 @@
+# -*- coding: utf-8 -*-
+"""
+prefork.py
+- uvicorn 다중 워커용 "먼저 로드하고 fork" 런처(Linux/macOS, fork 필요)
+  1) 부모가 앱 모듈을 import 하고 preload()(모델 로드 + 워밍업 encode)를 한 번 실행
+  2) gc.freeze() 후 포트를 한 번 bind 하고 워커 N개를 fork → 모델 가중치는 copy-on-write 로 공유
+  3) 모든 워커가 요청을 받을 준비가 되면 준비 시간과 워커별 메모리(RSS/PSS/공유/전용) 출력
+     (실행 중 kill -USR1 <부모 pid> 로 메모리 표를 다시 출력)
+  uvicorn --workers 는 워커마다 새 인터프리터(spawn)라 모델도 워커 수만큼 따로 로드됨.
+- 앱 모듈 규약: 모듈 수준 preload() 가 있으면 부모에서 호출(없으면 import 만).
+  DB 연결/풀은 fork 이후 워커의 startup 에서 만들어야 함(연결은 프로세스 간 공유 불가).
+사용(앱 디렉터리에서):
+    python ../../common/prefork.py app:app --workers 4 --port 8000                  # sql/bugs/api
+    python ../common/prefork.py app:app --workers 4 --port 8000                     # sql/ai-embedding-tx-lab
+    python ../../common/prefork.py app:app --workers 4 --exit-after-ready           # 준비 시간/메모리만 측정
+    python ../../common/prefork.py app:app --workers 4 --exit-after-ready --no-preload   # 비교: 워커마다 로드
+환경 변수:
+  WORKER_TORCH_THREADS  워커당 torch / onnxruntime 스레드 수(기본: CPU 수 / 워커 수, 최소 1) — 워커끼리 코어를 과점유하지 않도록
+"""
+import argparse, gc, importlib, os, select, signal, socket, sys, threading, time
+
+os.environ.setdefault("TOKENIZERS_PARALLELISM", "false")  # fork 후 HF tokenizers 경고/교착 방지
+
+def import_app(target: str, app_dir: str):
+    module_name, _, attr = target.partition(":")
+    if app_dir not in sys.path:
+        sys.path.insert(0, app_dir)
+    module = importlib.import_module(module_name)
+    return module, getattr(module, attr or "app")
+
+def preload(target: str, app_dir: str):
+    t0 = time.monotonic()
+    module, app = import_app(target, app_dir)
+    t1 = time.monotonic()
+    if callable(getattr(module, "preload", None)):
+        module.preload()
+    return app, t1 - t0, time.monotonic() - t1
+
+def bind(host: str, port: int) -> socket.socket:
+    sock = socket.socket(socket.AF_INET6 if ":" in host else socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+    return sock
+
+def memory(pid: int) -> dict:
+    """/proc/<pid>/smaps_rollup → MB 단위 rss/pss/shared/private (없으면 status의 VmRSS만)"""
+    kb = {}
+    try:
+        with open(f"/proc/{pid}/smaps_rollup") as f:
+            for line in f:
+                parts = line.split()
+                if len(parts) >= 2 and parts[0].endswith(":") and parts[1].isdigit():
+                    kb[parts[0][:-1]] = int(parts[1])
+    except OSError:
+        try:
+            with open(f"/proc/{pid}/status") as f:
+                for line in f:
+                    if line.startswith("VmRSS:"):
+                        kb["Rss"] = int(line.split()[1])
+        except OSError:
+            return {}
+    mb = lambda *keys: sum(kb.get(k, 0) for k in keys) / 1024 if any(k in kb for k in keys) else None
+    return {"rss": mb("Rss"), "pss": mb("Pss"), "shared": mb("Shared_Clean", "Shared_Dirty"),
+            "private": mb("Private_Clean", "Private_Dirty")}
+
+def report(parent_pid: int, workers: dict, ready: dict, t_start: float, out=sys.stderr):
+    fmt = lambda v: f"{v:10.1f}" if v is not None else f"{'-':>10}"
+    print(f"{'pid':>8} {'role':<8} {'ready_s':>8} {'rss_mb':>10} {'pss_mb':>10} {'shared_mb':>10} {'private_mb':>10}",
+          file=out)
+    total_pss = 0.0
+    for pid, role in [(parent_pid, "parent")] + [(p, f"worker{i}") for p, i in workers.items()]:
+        m = memory(pid)
+        total_pss += m.get("pss") or 0.0
+        r = f"{ready[pid] - t_start:8.2f}" if pid in ready else f"{'-':>8}"
+        print(f"{pid:>8} {role:<8} {r} {fmt(m.get('rss'))} {fmt(m.get('pss'))} {fmt(m.get('shared'))} "
+              f"{fmt(m.get('private'))}", file=out)
+    if total_pss:
+        print(f"total PSS (실제 사용 메모리 합): {total_pss:.1f} MB", file=out)
+
+def _set_worker_threads(workers: int):
+    n = int(os.getenv("WORKER_TORCH_THREADS", "0")) or max(1, (os.cpu_count() or 1) // workers)
+    os.environ.setdefault("ENCODER_THREADS", str(n))  # onnx 백엔드(encoder.py)는 워커에서 세션을 새로 만들 때 적용
+    torch = sys.modules.get("torch")
+    if torch is not None:
+        torch.set_num_threads(n)
+
+def run_worker(app, target, app_dir, sock, ready_fd, args):
+    """fork된 자식에서 실행. 반환하지 않음"""
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    signal.signal(signal.SIGUSR1, signal.SIG_DFL)
+    code = 0
+    try:
+        import uvicorn
+        if app is None:  # --no-preload: 워커가 직접 import/로드(비교용)
+            app, _, _ = preload(target, app_dir)
+        _set_worker_threads(args.workers)
+        server = uvicorn.Server(uvicorn.Config(app, log_level=args.log_level, access_log=False,
+                                               timeout_keep_alive=args.keep_alive))
+
+        def notify_ready():
+            while not server.started and not server.should_exit:
+                time.sleep(0.01)
+            if server.started:
+                os.write(ready_fd, f"{os.getpid()} {time.monotonic()}\n".encode())
+
+        threading.Thread(target=notify_ready, daemon=True).start()
+        server.run(sockets=[sock])
+    except BaseException:
+        import traceback
+        traceback.print_exc()
+        code = 1
+    finally:
+        sys.stdout.flush()
+        sys.stderr.flush()
+        os._exit(code)
+
+def main():
+    ap = argparse.ArgumentParser(description="preload-and-fork uvicorn launcher")
+    ap.add_argument("target", help="module:attr (예: app:app)")
+    ap.add_argument("--app-dir", default=".")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8000)
+    ap.add_argument("--workers", type=int, default=2)
+    ap.add_argument("--log-level", default="warning")
+    ap.add_argument("--keep-alive", type=int, default=5)
+    ap.add_argument("--no-preload", action="store_true", help="부모에서 로드하지 않음(워커마다 로드, 비교용)")
+    ap.add_argument("--exit-after-ready", action="store_true", help="준비 시간/메모리 출력 후 종료")
+    ap.add_argument("--ready-timeout", type=float, default=300.0)
+    args = ap.parse_args()
+    if not hasattr(os, "fork"):
+        sys.exit("prefork.py 는 fork 를 지원하는 OS(Linux/macOS)에서만 동작합니다")
+
+    t_start = time.monotonic()
+    app_dir = os.path.abspath(args.app_dir)
+    app = None
+    if not args.no_preload:
+        app, t_import, t_warm = preload(args.target, app_dir)
+        print(f"[prefork] preloaded {args.target}: import {t_import:.2f}s, warmup {t_warm:.2f}s", file=sys.stderr)
+    sock = bind(args.host, args.port)
+    gc.collect()
+    gc.freeze()  # 이후 GC가 부모에서 만든 객체를 건드리지 않음 → 공유 페이지가 덜 복사됨
+
+    ready_r, ready_w = os.pipe()
+    workers: dict[int, int] = {}  # pid → 워커 번호
+    stopping = False
+
+    def spawn(idx):
+        pid = os.fork()
+        if pid == 0:
+            os.close(ready_r)
+            run_worker(app, args.target, app_dir, sock, ready_w, args)
+        workers[pid] = idx
+
+    for i in range(args.workers):
+        spawn(i)
+
+    # 준비 대기: 워커가 pipe 로 "pid 시각" 을 보냄
+    ready: dict[int, float] = {}
+    buf = b""
+    deadline = time.monotonic() + args.ready_timeout
+    while len(ready) < args.workers and time.monotonic() < deadline:
+        if any(os.waitpid(p, os.WNOHANG)[0] for p in list(workers)):
+            print("[prefork] a worker exited before it was ready", file=sys.stderr)
+            break
+        if select.select([ready_r], [], [], 0.2)[0]:
+            buf += os.read(ready_r, 4096)
+            *lines, buf = buf.split(b"\n")
+            for line in lines:
+                pid, ts = line.split()
+                ready[int(pid)] = float(ts)
+    mode = "per-worker load" if args.no_preload else "preload+fork"
+    if len(ready) == args.workers:
+        print(f"[prefork] {args.workers} workers ready in {max(ready.values()) - t_start:.2f}s ({mode}) "
+              f"on http://{args.host}:{args.port}", file=sys.stderr)
+    else:
+        print(f"[prefork] only {len(ready)}/{args.workers} workers ready ({mode})", file=sys.stderr)
+    report(os.getpid(), workers, ready, t_start)
+
+    def shutdown(*_):
+        nonlocal stopping
+        stopping = True
+        for pid in list(workers):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, shutdown)
+    signal.signal(signal.SIGINT, shutdown)
+    signal.signal(signal.SIGUSR1, lambda *_: report(os.getpid(), workers, ready, t_start))
+    if args.exit_after_ready or len(ready) < args.workers:
+        shutdown()
+
+    # 감독: 예기치 않게 죽은 워커는 다시 fork(부모에 모델이 있으므로 로드 없이 바로 준비)
+    while workers:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        except InterruptedError:
+            continue
+        idx = workers.pop(pid, None)
+        if idx is not None and not stopping:
+            print(f"[prefork] worker{idx} (pid {pid}) exited with {status}, restarting", file=sys.stderr)
+            spawn(idx)
+    sock.close()
+    return 0 if len(ready) == args.workers else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
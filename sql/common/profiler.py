@@ -0,0 +1,226 @@
+# -*- coding: utf-8 -*-
+"""
+profiler.py
+- 켤 때만 동작하는 샘플링 프로파일러(외부 패키지 없음): encode / 벡터 리터럴 포맷 / psycopg2 실행 중
+  어디서 시간이 쓰이는지 확인용
+  * 백그라운드 스레드가 PROFILE_INTERVAL_MS 마다 sys._current_frames() 로 모든 스레드의 스택을 수집
+    (대기 중인 스레드 — 스레드풀 워커/이벤트 루프 select/로그 리스너 — 는 제외)
+  * 결과: {이름}-{시각}-{pid}-{n}.folded  — 접힌 스택(flamegraph.pl, speedscope, inferno 입력 형식)
+          {이름}-{시각}-{pid}-{n}.txt     — 함수별 self/total 샘플 비율 상위 목록
+- 꺼져 있으면 비용 없음: profiled()는 공용 no-op 객체를 돌려주고, install_profiling()은 미들웨어를 추가하지 않음
+사용:
+    with profiled("batch_embed"):      # 배치 스크립트: PROFILE=1 이면 실행 전체를 프로파일
+        main()
+    install_profiling(app)             # FastAPI: 아래 환경 변수 중 하나가 켜져 있을 때만 미들웨어 추가
+환경 변수:
+  PROFILE(0)               1이면 profiled() 블록 전체를 프로파일(배치 1회 실행)
+  PROFILE_REQUESTS(0)      N>0이면 서버 시작 후 처음 N개 요청 구간을 프로파일
+  PROFILE_HEADER(0)        1이면 "X-Profile: N" 요청 헤더로 그 요청부터 N개(기본 1) 구간을 프로파일
+  PROFILE_INTERVAL_MS(5)   샘플 간격
+  PROFILE_DIR(profiles)    출력 디렉터리
+  요청 구간은 프로세스 전체를 샘플링하므로 구간 중 동시에 처리된 다른 요청도 함께 잡힘(/metrics 요청은 구간에서 제외)
+"""
+import itertools, os, sys, threading, time
+from collections import Counter
+
+ENABLED = os.getenv("PROFILE", "0") == "1"
+REQUESTS = int(os.getenv("PROFILE_REQUESTS", "0"))
+HEADER = os.getenv("PROFILE_HEADER", "0") == "1"
+INTERVAL_MS = float(os.getenv("PROFILE_INTERVAL_MS", "5"))
+OUT_DIR = os.getenv("PROFILE_DIR", "profiles")
+MAX_WINDOW = 1000  # 헤더로 요청할 수 있는 최대 구간 길이
+TOP_N = 40
+_seq = itertools.count(1)  # 같은 초에 끝난 구간끼리 파일 이름이 겹치지 않도록
+
+# 가장 안쪽 프레임이 이 (파일, 함수)이면 일을 하지 않고 기다리는 스레드로 보고 건너뜀
+_IDLE = {
+    ("threading.py", "wait"), ("threading.py", "_wait_for_tstate_lock"),
+    ("queue.py", "get"), ("selectors.py", "select"), ("selectors.py", "poll"),
+}
+
+class Sampler:
+    """start() ~ stop() 사이 모든 스레드의 스택을 주기적으로 수집해 접힌 스택별 샘플 수로 누적"""
+
+    def __init__(self, name: str, interval_ms: float = INTERVAL_MS):
+        self.name, self.interval = name, interval_ms / 1000
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self.threads: set = set()
+        self._labels: dict = {}   # code 객체 → "func (dir/file.py:line)"
+        self._names: dict = {}    # 스레드 ident → 이름
+        self._stop = threading.Event()
+        self._thread = None
+        self.t0 = self.t1 = None
+
+    def start(self):
+        self.t0 = time.perf_counter()
+        self._thread = threading.Thread(target=self._run, name="profiler", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.t1 = time.perf_counter()
+        return self
+
+    def _label(self, code) -> str:
+        label = self._labels.get(code)
+        if label is None:
+            parts = code.co_filename.replace("\\", "/").rsplit("/", 2)
+            label = self._labels[code] = f"{code.co_name} ({'/'.join(parts[-2:])}:{code.co_firstlineno})"
+        return label
+
+    def _thread_name(self, ident) -> str:
+        name = self._names.get(ident)
+        if name is None:
+            self._names = {t.ident: t.name for t in threading.enumerate()}
+            name = self._names.setdefault(ident, f"thread-{ident}")
+        return name
+
+    def _run(self):
+        me = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            for ident, frame in sys._current_frames().items():
+                if ident == me:
+                    continue
+                code = frame.f_code
+                if (os.path.basename(code.co_filename), code.co_name) in _IDLE:
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(self._label(frame.f_code))
+                    frame = frame.f_back
+                tname = self._thread_name(ident)
+                stack.append(tname)
+                stack.reverse()
+                self.stacks[";".join(stack)] += 1
+                self.threads.add(tname)
+            self.samples += 1
+
+    def summary(self, folded_path: str = "") -> str:
+        self_counts: Counter = Counter()
+        total_counts: Counter = Counter()
+        for stack, n in self.stacks.items():
+            frames = stack.split(";")[1:]  # 맨 앞은 스레드 이름
+            if not frames:
+                continue
+            self_counts[frames[-1]] += n
+            for f in set(frames):
+                total_counts[f] += n
+        busy = sum(self.stacks.values()) or 1
+        wall = (self.t1 or time.perf_counter()) - self.t0
+        lines = [
+            f"# profile: {self.name}  wall={wall:.2f}s  ticks={self.samples}  busy_samples={busy}  "
+            f"interval={self.interval * 1000:g}ms  threads={','.join(sorted(self.threads))}",
+        ]
+        if folded_path:
+            lines.append(f"# folded stacks: {folded_path}  (flamegraph.pl / speedscope)")
+        lines.append("")
+        lines.append(f"{'self%':>7} {'total%':>7} {'self':>7} {'total':>7}  function  — self 순")
+        for f, n in self_counts.most_common(TOP_N):
+            lines.append(f"{n / busy:7.1%} {total_counts[f] / busy:7.1%} {n:7d} {total_counts[f]:7d}  {f}")
+        lines.append("")
+        lines.append(f"{'total%':>7} {'total':>7}  function  — total 순")
+        for f, n in total_counts.most_common(TOP_N):
+            lines.append(f"{n / busy:7.1%} {n:7d}  {f}")
+        return "\n".join(lines) + "\n"
+
+    def write(self, out_dir: str = OUT_DIR) -> str:
+        """접힌 스택(.folded)과 요약(.txt)을 쓰고 요약 파일 경로를 반환"""
+        os.makedirs(out_dir, exist_ok=True)
+        base = os.path.join(out_dir, f"{self.name}-{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}-{next(_seq)}")
+        with open(base + ".folded", "w", encoding="utf-8") as f:
+            for stack, n in self.stacks.most_common():
+                f.write(f"{stack} {n}\n")
+        with open(base + ".txt", "w", encoding="utf-8") as f:
+            f.write(self.summary(base + ".folded"))
+        return base + ".txt"
+
+def _finish(sampler: Sampler):
+    path = sampler.write()
+    print(f"[profiler] {sampler.name}: {sum(sampler.stacks.values())} samples → {path}", file=sys.stderr)
+
+class _Profiled:
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.sampler = Sampler(self.name).start()
+        return self.sampler
+
+    def __exit__(self, *exc):
+        _finish(self.sampler.stop())
+
+class _NoProfile:
+    def __enter__(self):
+        return None
+
+    def __exit__(self, *exc):
+        pass
+
+_NO_PROFILE = _NoProfile()
+
+def profiled(name: str, enabled: bool | None = None):
+    """with profiled("make_embeddings"): ...  PROFILE=1(또는 enabled=True)일 때만 샘플링"""
+    return _Profiled(name) if (ENABLED if enabled is None else enabled) else _NO_PROFILE
+
+class ProfileMiddleware:
+    """
+    순수 ASGI 미들웨어. 구간 시작 요청에서 Sampler를 켜고, 구간 요청이 모두 끝나면 끄고 파일로 씀.
+    카운터는 이벤트 루프 스레드에서만 바뀌므로 락 없음.
+    """
+
+    def __init__(self, app, name: str = "requests", requests: int = REQUESTS, header: bool = HEADER):
+        self.app, self.name, self.header = app, name, header
+        self.pending = requests   # 아직 구간에 넣을 수 있는 요청 수
+        self.active = 0           # 구간에 포함되어 진행 중인 요청 수
+        self.sampler = None
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] == "/metrics":
+            return await self.app(scope, receive, send)
+        if self.header and self.sampler is None and not self.pending:
+            for k, v in scope["headers"]:
+                if k == b"x-profile":
+                    v = v.decode("latin-1").strip()
+                    self.pending = min(int(v), MAX_WINDOW) if v.isdigit() else 1
+                    break
+        if not self.pending:
+            return await self.app(scope, receive, send)
+
+        if self.sampler is None:
+            self.sampler = Sampler(self.name).start()
+        self.pending -= 1
+        self.active += 1
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.active -= 1
+            if not self.pending and not self.active:
+                sampler, self.sampler = self.sampler, None
+                _finish(sampler.stop())
+
+def install_profiling(app, name: str = "requests", requests: int = REQUESTS, header: bool = HEADER):
+    """PROFILE_REQUESTS 또는 PROFILE_HEADER 가 켜져 있을 때만 미들웨어 추가(꺼져 있으면 아무것도 안 함)"""
+    if requests > 0 or header:
+        app.add_middleware(ProfileMiddleware, name=name, requests=requests, header=header)
+    return app
+
+if __name__ == "__main__":
+    # 예시: 벡터 리터럴 포맷 + 행렬 곱을 프로파일하고 요약 출력
+    import numpy as np
+
+    def vec_literal(v):
+        return "[" + ",".join(f"{x:.6f}" for x in v) + "]"
+
+    def work():
+        m = np.random.rand(2000, 384).astype(np.float32)
+        for _ in range(5):
+            m @ m.T
+        return [vec_literal(v) for v in m[:1500]]
+
+    with profiled("demo", enabled=True) as s:
+        work()
+    print(s.summary())
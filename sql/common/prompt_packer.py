@@ -0,0 +1,134 @@
+# -*- coding: utf-8 -*-
+"""
+prompt_packer.py
+- RAG 프롬프트용 컨텍스트 패킹(토큰 예산 기반)
+  * 로컬 토크나이저로 토큰 수 계산(tiktoken, 없거나 BPE 파일을 못 받으면 정규식 근사)
+  * 관련도(score) 순으로 토큰 예산(PROMPT_TOKEN_BUDGET)까지 채움
+  * 임베딩 코사인 유사도가 임계값 이상인 거의 중복 컨텍스트는 제외
+  * pack_batch(): 여러 사용자/질의의 컨텍스트를 한 번에 패킹(토큰 수는 일괄 계산, 그룹마다 pack_contexts와 같은 규칙) → 오프라인 배치용
+"""
+import os, re
+import numpy as np
+
+TOKENIZER = os.getenv("PROMPT_TOKENIZER", "o200k_base")
+DEFAULT_BUDGET = int(os.getenv("PROMPT_TOKEN_BUDGET", "1500"))
+DEFAULT_DEDUP = float(os.getenv("PROMPT_DEDUP_THRESHOLD", "0.95"))
+
+_WORD = re.compile(r"\w+|[^\w\s]", re.UNICODE)
+_ENC = None
+_ENC_LOADED = False
+
+def _encoder():
+    # BPE 파일이 로컬 캐시에 없고 네트워크도 없으면 실패 → 근사 카운터로 대체
+    global _ENC, _ENC_LOADED
+    if not _ENC_LOADED:
+        _ENC_LOADED = True
+        try:
+            import tiktoken
+            _ENC = tiktoken.get_encoding(TOKENIZER)
+        except Exception:
+            _ENC = None
+    return _ENC
+
+def _approx_tokens(text: str) -> int:
+    # 단어/기호 1개 ≈ 1토큰, 긴 단어(한글 어절 포함)는 4글자마다 1토큰 추가
+    return sum(1 + len(w) // 4 for w in _WORD.findall(text))
+
+def count_tokens(text: str) -> int:
+    enc = _encoder()
+    return len(enc.encode_ordinary(text)) if enc else _approx_tokens(text)
+
+def count_tokens_batch(texts) -> np.ndarray:
+    texts = list(texts)
+    enc = _encoder()
+    if enc:
+        return np.fromiter((len(t) for t in enc.encode_ordinary_batch(texts)), dtype=np.int64, count=len(texts))
+    return np.fromiter((_approx_tokens(t) for t in texts), dtype=np.int64, count=len(texts))
+
+def truncate_tokens(text: str, max_tokens: int) -> str:
+    """max_tokens를 넘는 텍스트를 잘라냄(문자 수 절단 대신 토큰 기준). 붙이는 "…"까지 합쳐 max_tokens 이하"""
+    enc = _encoder()
+    if enc:
+        ids = enc.encode_ordinary(text)
+        if len(ids) <= max_tokens:
+            return text
+        if max_tokens <= 0:
+            return ""
+        # "…" 자리 1토큰을 남기고 자름. 경계에서 토큰이 합쳐져 넘으면 한 토큰씩 더 줄임
+        keep = max_tokens - 1
+        while True:
+            out = enc.decode(ids[:keep]) + "…"
+            if keep <= 0 or len(enc.encode_ordinary(out)) <= max_tokens:
+                return out
+            keep -= 1
+    if _approx_tokens(text) <= max_tokens:
+        return text
+    if max_tokens <= 0:
+        return ""
+    used = 0
+    for m in _WORD.finditer(text):
+        used += 1 + len(m.group()) // 4
+        if used > max_tokens - 1:  # "…"도 1토큰
+            return text[:m.start()].rstrip() + "…"
+    return text
+
+def _normalize(embs) -> np.ndarray:
+    e = np.asarray(embs, dtype=np.float32)
+    n = np.linalg.norm(e, axis=1, keepdims=True)
+    return e / np.where(n == 0, 1, n)
+
+def _greedy(order, tokens, budget, normed, dedup_threshold) -> list[int]:
+    """order(점수 내림차순) 순서로 예산 안에 들어가는 항목을 고름 — 넘는 항목은 건너뛰고 계속"""
+    picked, used = [], 0
+    for i in order:
+        if used + tokens[i] > budget:
+            continue
+        if normed is not None and picked and float(np.max(normed[picked] @ normed[i])) >= dedup_threshold:
+            continue
+        picked.append(int(i))
+        used += int(tokens[i])
+    return picked
+
+def pack_contexts(texts, scores, budget: int = DEFAULT_BUDGET, embeddings=None,
+                  dedup_threshold: float = DEFAULT_DEDUP) -> list[int]:
+    """
+    texts/scores(높을수록 관련) → 선택된 인덱스(점수 내림차순).
+    - 예산을 넘는 컨텍스트는 건너뛰고 더 짧은 다음 후보로 계속 채움
+    - embeddings가 있으면 이미 고른 것과 코사인 ≥ dedup_threshold 인 후보 제외
+    """
+    scores = np.asarray(scores, dtype=np.float64)
+    tokens = count_tokens_batch(texts)
+    order = np.argsort(-scores, kind="stable")
+    normed = _normalize(embeddings) if embeddings is not None and len(texts) else None
+    return _greedy(order, tokens, budget, normed, dedup_threshold)
+
+def pack_batch(group_ids, texts, scores, budget: int = DEFAULT_BUDGET, embeddings=None,
+               dedup_threshold: float = DEFAULT_DEDUP) -> np.ndarray:
+    """
+    여러 그룹(사용자/질의)의 컨텍스트를 한 번에 패킹 → 유지 여부 bool 마스크(입력 순서).
+    그룹마다 pack_contexts와 같은 결과(건너뛰고 계속 채움, 고른 항목 기준 중복 제거).
+    토큰 수는 전체를 한 번에 세고, 그룹 전체가 예산 안에 들어가면(중복 제거 없을 때) 그대로 유지
+    → 파이썬 루프는 예산을 넘거나 중복 제거가 필요한 그룹에서만 돔.
+    """
+    group_ids = np.asarray(group_ids)
+    scores = np.asarray(scores, dtype=np.float64)
+    n = len(scores)
+    keep = np.ones(n, dtype=bool)
+    if n == 0:
+        return keep
+
+    order = np.lexsort((-scores, group_ids))  # 그룹별, 점수 내림차순(동점은 입력 순서)
+    g_sorted = group_ids[order]
+    starts = np.r_[True, g_sorted[1:] != g_sorted[:-1]]
+    bounds = np.r_[np.flatnonzero(starts), n]
+    tokens = count_tokens_batch(texts)
+    totals = np.add.reduceat(tokens[order], bounds[:-1])
+    normed = _normalize(embeddings) if embeddings is not None else None
+
+    for a, b, total in zip(bounds[:-1], bounds[1:], totals):
+        if normed is None and total <= budget:
+            continue
+        idx = order[a:b]
+        keep[idx] = False
+        keep[_greedy(idx, tokens, budget, normed, dedup_threshold)] = True
+    return keep
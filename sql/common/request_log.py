@@ -0,0 +1,223 @@
+# -*- coding: utf-8 -*-
+"""
+request_log.py
+- FastAPI 요청마다 구조화된 JSON 로그 한 줄(요청 ID + 단계별 소요 시간)
+  * stage("encode" | "pool" | "sql" | "llm") 로 구간을 감싸면 요청 단위로 ms 누적
+  * serialize: 엔드포인트 반환 → 응답 시작 사이(응답 모델 검증/JSON 직렬화)
+  * 느린 SQL은 샘플링해서 EXPLAIN (FORMAT JSON) 계획을 함께 기록(timed_query)
+  * X-Request-Id 헤더가 있으면 그대로, 없으면 새로 발급해 응답 헤더로 돌려줌
+- 출력: 파이썬/env_logging_example/log_setup.py 의 큐 기반 로깅(요청 스레드에서 디스크 I/O 없음)
+사용:
+    app = FastAPI(...)
+    install_request_logging(app)   # 라우트 정의보다 먼저(serialize 측정용 route_class 설정)
+환경 변수:
+  REQUEST_LOG_SAMPLE(1.0)   정상 요청 중 기록 비율(0이면 느린 요청만)
+  REQUEST_LOG_SLOW_MS(1000) 이보다 느린 요청은 샘플링과 무관하게 기록(0이면 끔)
+  SLOW_QUERY_MS(200)        이보다 느린 SQL은 계획 샘플링 대상
+  QUERY_PLAN_SAMPLE(0.1)    느린 SQL 중 EXPLAIN을 실행할 비율
+  REQUEST_LOG_FILE("")      지정 시 콘솔과 함께 파일에도 기록(회전 포함)
+  둘 다 0(REQUEST_LOG_SAMPLE, REQUEST_LOG_SLOW_MS)이고 관찰자(add_observer, 예: metrics.py)도
+  없으면 미들웨어는 요청을 그대로 통과시킴
+"""
+import functools, inspect, json, os, random, sys, time, uuid
+from contextvars import ContextVar
+
+from fastapi.routing import APIRoute
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "..", "파이썬", "env_logging_example"))
+from log_setup import setup_logging
+
+SAMPLE = float(os.getenv("REQUEST_LOG_SAMPLE", "1.0"))
+SLOW_MS = float(os.getenv("REQUEST_LOG_SLOW_MS", "1000"))
+SLOW_QUERY_MS = float(os.getenv("SLOW_QUERY_MS", "200"))
+PLAN_SAMPLE = float(os.getenv("QUERY_PLAN_SAMPLE", "0.1"))
+LOGGER_NAME = "request"
+
+_current: ContextVar["RequestTimings | None"] = ContextVar("request_timings", default=None)
+_observers = []  # fn(method, route, status, duration_s, stages_ms) — 샘플링과 무관하게 모든 요청
+
+def add_observer(fn):
+    """요청이 끝날 때마다 호출할 함수 등록(메트릭 집계 등). 예외는 요청에 영향 주지 않음"""
+    if fn not in _observers:
+        _observers.append(fn)
+
+class RequestTimings:
+    __slots__ = ("request_id", "stages", "plans", "endpoint_done")
+
+    def __init__(self, request_id: str):
+        self.request_id = request_id
+        self.stages: dict[str, float] = {}
+        self.plans: list[dict] = []
+        self.endpoint_done = None
+
+    def add(self, name: str, ms: float):
+        self.stages[name] = self.stages.get(name, 0.0) + ms
+
+def current() -> "RequestTimings | None":
+    return _current.get()
+
+class _Stage:
+    __slots__ = ("t", "name", "t0")
+
+    def __init__(self, t, name):
+        self.t, self.name = t, name
+
+    def __enter__(self):
+        self.t0 = time.perf_counter()
+
+    def __exit__(self, *exc):
+        self.t.add(self.name, (time.perf_counter() - self.t0) * 1000)
+
+class _NoStage:
+    def __enter__(self):
+        pass
+
+    def __exit__(self, *exc):
+        pass
+
+_NO_STAGE = _NoStage()
+
+def stage(name: str):
+    """with stage("encode"): ...  요청 밖(배치 스크립트 등)에서는 아무것도 하지 않음"""
+    t = _current.get()
+    return _NO_STAGE if t is None else _Stage(t, name)
+
+def _explain(cur, sql: str, params):
+    # 계획 조회가 실패해도 본 트랜잭션은 살아 있도록 SAVEPOINT 안에서 실행(autocommit이면 생략)
+    try:
+        cur.execute("SAVEPOINT request_log_plan")
+        savepoint = True
+    except Exception:
+        savepoint = False
+    try:
+        cur.execute("EXPLAIN (FORMAT JSON) " + sql, params)
+        plan = cur.fetchone()[0]
+    except Exception:
+        plan = None
+        if savepoint:
+            cur.execute("ROLLBACK TO SAVEPOINT request_log_plan")
+    else:
+        if savepoint:
+            cur.execute("RELEASE SAVEPOINT request_log_plan")
+    return plan
+
+def timed_query(cur, sql: str, params=None, fetch: bool = True):
+    """
+    cur.execute + fetchall 을 "sql" 단계로 측정. 느리면 QUERY_PLAN_SAMPLE 확률로 EXPLAIN 계획 첨부.
+    (EXPLAIN은 결과를 다 읽은 뒤 실행하므로 반환 rows에는 영향 없음)
+    """
+    t = _current.get()
+    t0 = time.perf_counter()
+    cur.execute(sql, params)
+    rows = cur.fetchall() if fetch else None
+    if t is None:
+        return rows
+    ms = (time.perf_counter() - t0) * 1000
+    t.add("sql", ms)
+    if ms >= SLOW_QUERY_MS and random.random() < PLAN_SAMPLE:
+        plan = _explain(cur, sql, params)
+        if plan is not None:
+            t.plans.append({"sql_ms": round(ms, 2), "sql": " ".join(sql.split())[:500], "plan": plan})
+    return rows
+
+def _mark_endpoint_done(endpoint):
+    # 엔드포인트가 끝난 시점 기록 → 응답 시작까지를 serialize 단계로 계산
+    if inspect.iscoroutinefunction(endpoint):
+        @functools.wraps(endpoint)
+        async def wrapper(*args, **kwargs):
+            try:
+                return await endpoint(*args, **kwargs)
+            finally:
+                t = _current.get()
+                if t is not None:
+                    t.endpoint_done = time.perf_counter()
+    else:
+        @functools.wraps(endpoint)
+        def wrapper(*args, **kwargs):
+            try:
+                return endpoint(*args, **kwargs)
+            finally:
+                t = _current.get()
+                if t is not None:
+                    t.endpoint_done = time.perf_counter()
+    return wrapper
+
+class TimedRoute(APIRoute):
+    def __init__(self, path, endpoint, **kwargs):
+        super().__init__(path, _mark_endpoint_done(endpoint), **kwargs)
+
+class RequestLogMiddleware:
+    """순수 ASGI 미들웨어(스트리밍 응답도 끝까지 측정, BaseHTTPMiddleware의 추가 태스크 없음)"""
+
+    def __init__(self, app, logger, sample: float = SAMPLE, slow_ms: float = SLOW_MS):
+        self.app, self.logger, self.sample, self.slow_ms = app, logger, sample, slow_ms
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or (self.sample <= 0 and self.slow_ms <= 0 and not _observers):
+            return await self.app(scope, receive, send)
+
+        rid = None
+        for k, v in scope["headers"]:
+            if k == b"x-request-id":
+                rid = v.decode("latin-1")[:128]
+                break
+        t = RequestTimings(rid or uuid.uuid4().hex)
+        token = _current.set(t)
+        status = 500
+        t_start = time.perf_counter()
+        t_first = None
+
+        async def send_wrapper(message):
+            nonlocal status, t_first
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                t_first = time.perf_counter()
+                message["headers"] = list(message.get("headers", [])) + [(b"x-request-id", t.request_id.encode())]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            _current.reset(token)
+            total = (time.perf_counter() - t_start) * 1000
+            if t.endpoint_done is not None and t_first is not None:
+                t.add("serialize", max(0.0, (t_first - t.endpoint_done) * 1000))
+            route = scope.get("route")
+            path = getattr(route, "path", None)
+            for fn in _observers:
+                try:
+                    # 라우트가 없는 요청(404 등)은 경로별 시계열이 무한히 늘지 않도록 하나로 묶음
+                    fn(scope["method"], path or "<unmatched>", status, total / 1000, t.stages)
+                except Exception:
+                    pass
+            slow = 0 < self.slow_ms <= total
+            if slow or (self.sample > 0 and random.random() < self.sample):
+                record = {
+                    "ts": round(time.time(), 3),
+                    "request_id": t.request_id,
+                    "method": scope["method"],
+                    "path": path or scope["path"],
+                    "status": status,
+                    "duration_ms": round(total, 2),
+                    "ttfb_ms": round((t_first - t_start) * 1000, 2) if t_first else None,
+                    "stages": {k: round(v, 2) for k, v in t.stages.items()},
+                }
+                if slow:
+                    record["slow"] = True
+                if t.plans:
+                    record["plans"] = t.plans
+                self.logger.info("%s", json.dumps(record, ensure_ascii=False, default=str))
+
+def install_request_logging(app, sample: float = SAMPLE, slow_ms: float = SLOW_MS):
+    """
+    app에 요청 로그 미들웨어와 TimedRoute를 등록.
+    라우트 데코레이터보다 먼저 호출해야 serialize 단계가 측정됨(나중에 호출하면 그 단계만 빠짐).
+    """
+    import logging
+    logger = logging.getLogger(LOGGER_NAME)
+    if not logger.handlers:
+        setup_logging(logger_name=LOGGER_NAME, fmt="%(message)s",
+                      log_file=os.getenv("REQUEST_LOG_FILE", ""), console=True)
+    app.router.route_class = TimedRoute
+    app.add_middleware(RequestLogMiddleware, logger=logger, sample=sample, slow_ms=slow_ms)
+    return app
@@ -0,0 +1,59 @@
+# -*- coding: utf-8 -*-
+"""
+sse.py
+- FastAPI 엔드포인트용 Server-Sent Events 헬퍼
+  * 검색 결과(head 이벤트)를 먼저 내보내고, 이어서 LLM 토큰을 event: token 으로 흘려보냄
+  * 클라이언트 연결이 끊기면 LLMStream.close() 로 상류 LLM 호출을 즉시 취소
+이벤트 형식(data는 항상 JSON):
+  event: items|neighbors ... → event: token (문자열 조각) ... → event: done | event: error
+"""
+import json
+from typing import Iterable
+from starlette.concurrency import run_in_threadpool
+from starlette.requests import Request
+from starlette.responses import StreamingResponse
+
+_DONE = object()
+
+def sse_event(event: str, data) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False, default=str)}\n\n"
+
+async def stream_events(request: Request, head: list[tuple[str, object]], tokens: Iterable[str] | None):
+    """
+    head   : [(event, data), ...] 즉시 전송할 이벤트(검색 결과 등)
+    tokens : LLMStream 또는 문자열 iterable. 블로킹 읽기는 스레드풀에서 수행
+    """
+    for event, data in head:
+        yield sse_event(event, data)
+    if tokens is None:
+        yield sse_event("done", {})
+        return
+
+    it = iter(tokens)
+    try:
+        while True:
+            chunk = await run_in_threadpool(next, it, _DONE)
+            if chunk is _DONE:
+                break
+            if await request.is_disconnected():
+                break
+            yield sse_event("token", chunk)
+        if not await request.is_disconnected():
+            yield sse_event("done", {})
+    except Exception as e:
+        yield sse_event("error", {"detail": str(e)})
+    finally:
+        # 연결 끊김(태스크 취소 포함) 시 상류 호출 취소 → 슬롯/비용 즉시 반환
+        close = getattr(tokens, "close", None)
+        if close:
+            close()
+        try:
+            getattr(it, "close", lambda: None)()
+        except ValueError:
+            pass  # 다른 스레드에서 next() 실행 중 → 위 close()로 상류가 끊겨 곧 스스로 종료
+
+def sse_response(gen) -> StreamingResponse:
+    return StreamingResponse(gen, media_type="text/event-stream", headers={
+        "Cache-Control": "no-cache",
+        "X-Accel-Buffering": "no",  # nginx 프록시 버퍼링 방지
+    })
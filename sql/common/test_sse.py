@@ -0,0 +1,215 @@
+# -*- coding: utf-8 -*-
+"""
+test_sse.py
+- sse.py / SSE 엔드포인트(/recommend_llm/stream, /rag/stream) 테스트
+  * 이벤트 형식(event/data 줄, data는 JSON 한 줄), head → token ... → done 순서
+  * 상류 오류 → event: error(done 없음), 상류 close() 호출
+  * 클라이언트 연결 끊김 → 상류 LLM 호출 취소(모의 스트리밍 서버 mock_llm_server.py + LLMGateway)
+- 외부 API/DB 없이 실행: 이웃/검색 조회는 가짜 함수로 바꾸고 LLM은 로컬 모의 서버 사용
+Usage:
+  python -m pytest -q test_sse.py
+"""
+import json, os, socket, sys, threading, time
+
+import httpx
+import pytest
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, HERE)
+sys.path.append(os.path.join(HERE, "..", "pandas"))
+
+from llm_gateway import LLMGateway
+from mock_llm_server import start_in_thread
+from sse import sse_event, sse_response, stream_events
+
+def parse_sse(text: str) -> list[tuple[str, object]]:
+    """SSE 본문 → [(event, data)]. 이벤트마다 event 한 줄 + data 한 줄(JSON)이어야 함"""
+    events = []
+    for block in text.split("\n\n"):
+        if not block:
+            continue
+        lines = block.split("\n")
+        assert len(lines) == 2 and lines[0].startswith("event: ") and lines[1].startswith("data: "), block
+        events.append((lines[0][len("event: "):], json.loads(lines[1][len("data: "):])))
+    return events
+
+class FakeStream:
+    """LLMStream 대역: 토큰을 내보내고(선택적으로 도중에 예외), close() 호출 여부를 기록"""
+    def __init__(self, tokens, fail_after=None):
+        self.tokens = tokens
+        self.fail_after = fail_after
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+    def __iter__(self):
+        for i, tok in enumerate(self.tokens):
+            if i == self.fail_after:
+                raise RuntimeError("upstream exploded")
+            yield tok
+
+def echo_app(head, tokens):
+    app = FastAPI()
+
+    @app.get("/stream")
+    async def stream(request: Request):
+        return sse_response(stream_events(request, head, tokens))
+
+    return app
+
+@pytest.fixture
+def mock_llm():
+    srv, base_url = start_in_thread(latency_ms=0, token_ms=5, stream_repeat=5)
+    gw = LLMGateway(api_key="mock", base_url=base_url, rate_per_sec=0, cache_path=None)
+    yield srv, gw
+    srv.shutdown()
+
+def serve(app):
+    """uvicorn을 스레드로 띄움(실제 소켓 → 클라이언트 연결 끊김을 재현) → (server, url)"""
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    deadline = time.time() + 10
+    while not server.started and time.time() < deadline:
+        time.sleep(0.01)
+    return server, f"http://127.0.0.1:{port}"
+
+def read_first_token_and_disconnect(url, params=None):
+    with httpx.Client(timeout=10) as c:
+        with c.stream("GET", url, params=params) as r:
+            assert r.status_code == 200
+            for line in r.iter_lines():
+                if line == "event: token":
+                    break
+
+def wait_cancelled(srv, gw, timeout=5.0):
+    deadline = time.time() + timeout
+    while (srv.cancelled == 0 or gw.stats["in_flight"] or not gw.stats["cancelled"]) and time.time() < deadline:
+        time.sleep(0.02)
+
+# ---------------- sse.py ----------------
+def test_sse_event_framing():
+    assert sse_event("token", "안녕") == 'event: token\ndata: "안녕"\n\n'
+    # 줄바꿈이 든 조각도 data 한 줄(JSON 이스케이프) → 이벤트 경계가 깨지지 않음
+    assert parse_sse(sse_event("token", "a\n\nb")) == [("token", "a\n\nb")]
+
+def test_stream_events_head_tokens_done():
+    tokens = FakeStream(["Hel", "lo\n", "!"])
+    client = TestClient(echo_app([("items", [{"id": 1}])], tokens))
+    r = client.get("/stream")
+    assert r.status_code == 200
+    assert r.headers["content-type"].startswith("text/event-stream")
+    assert r.headers["cache-control"] == "no-cache"
+    assert parse_sse(r.text) == [("items", [{"id": 1}]), ("token", "Hel"), ("token", "lo\n"), ("token", "!"),
+                                 ("done", {})]
+    assert tokens.closed
+
+def test_stream_events_without_tokens_sends_done():
+    r = TestClient(echo_app([("items", []), ("answer", "no LLM")], None)).get("/stream")
+    assert parse_sse(r.text) == [("items", []), ("answer", "no LLM"), ("done", {})]
+
+def test_stream_events_upstream_error():
+    tokens = FakeStream(["a", "b", "c"], fail_after=1)
+    r = TestClient(echo_app([("items", [])], tokens)).get("/stream")
+    events = parse_sse(r.text)
+    assert events == [("items", []), ("token", "a"), ("error", {"detail": "upstream exploded"})]
+    assert tokens.closed
+
+def test_stream_events_disconnect_cancels_upstream(mock_llm):
+    srv, gw = mock_llm
+    srv.stream_repeat = 200  # 클라이언트가 끊을 때까지 충분히 긴 응답
+    server, url = serve(echo_app([("items", [])], gw.stream("long answer please", model="mock")))
+    try:
+        read_first_token_and_disconnect(f"{url}/stream")
+        wait_cancelled(srv, gw)
+    finally:
+        server.should_exit = True
+    assert srv.cancelled >= 1
+    assert gw.stats["cancelled"] == 1
+    assert gw.stats["in_flight"] == 0
+
+# ---------------- /recommend_llm/stream (sql/pandas/fastapi_app_llm.py) ----------------
+@pytest.fixture
+def llm_app(mock_llm, monkeypatch):
+    import fastapi_app_llm, llm_recommender
+    srv, gw = mock_llm
+    neighbors = [{"user_id": "U2", "cosine_distance": 0.12}, {"user_id": "U3", "cosine_distance": 0.2}]
+    monkeypatch.setattr(fastapi_app_llm, "fetch_neighbors", lambda user_id, k: neighbors[:k])
+    monkeypatch.setattr(llm_recommender, "get_gateway", lambda: gw)
+    return fastapi_app_llm.app, srv, gw, neighbors
+
+def test_recommend_llm_stream_events(llm_app):
+    app, srv, gw, neighbors = llm_app
+    r = TestClient(app).get("/recommend_llm/stream", params={"user_id": "U1", "k": 2})
+    assert r.status_code == 200
+    events = parse_sse(r.text)
+    assert events[0] == ("neighbors", {"user_id": "U1", "k": 2, "neighbors": neighbors})
+    assert events[-1] == ("done", {})
+    tokens = [data for event, data in events[1:-1]]
+    assert all(event == "token" for event, _ in events[1:-1]) and tokens
+    assert "".join(tokens).startswith("[MOCK] ")
+    assert gw.stats["in_flight"] == 0
+
+def test_recommend_llm_stream_upstream_error(llm_app, monkeypatch):
+    app, srv, gw, _ = llm_app
+    srv.fail_rate = 1.0  # 모의 서버가 항상 503
+    gw.max_retries = 0
+    r = TestClient(app).get("/recommend_llm/stream", params={"user_id": "U1"})
+    events = parse_sse(r.text)
+    assert events[0][0] == "neighbors"
+    assert events[-1][0] == "error" and events[-1][1]["detail"]
+    assert "done" not in [e for e, _ in events]
+    assert gw.stats["in_flight"] == 0
+
+def test_recommend_llm_stream_disconnect_cancels_upstream(llm_app):
+    app, srv, gw, _ = llm_app
+    srv.stream_repeat = 200
+    server, url = serve(app)
+    try:
+        read_first_token_and_disconnect(f"{url}/recommend_llm/stream", {"user_id": "U1"})
+        wait_cancelled(srv, gw)
+    finally:
+        server.should_exit = True
+    assert srv.cancelled >= 1
+    assert gw.stats["cancelled"] == 1
+    assert gw.stats["in_flight"] == 0
+
+# ---------------- /rag/stream (sql/bugs/api/app.py) ----------------
+@pytest.fixture
+def rag_app(mock_llm, monkeypatch):
+    # 앱 import 시 임베딩 모델을 올리므로 sentence-transformers가 있어야 함
+    pytest.importorskip("sentence_transformers")
+    sys.path.insert(0, os.path.join(HERE, "..", "bugs", "api"))
+    import app as bugs_app
+    srv, gw = mock_llm
+    items = [bugs_app.Item(id=1, title="crash on save", score=0.9)]
+    contexts = [{"id": 1, "title": "crash on save", "description": "stack trace ...", "score": 0.9,
+                 "embedding": [1.0, 0.0, 0.0]}]
+    monkeypatch.setattr(bugs_app, "_rag_contexts", lambda q, k, user_id, tags=None, match="all": (items, contexts))
+    monkeypatch.setattr(bugs_app, "get_gateway", lambda: gw)
+    return bugs_app.app, srv, gw, items
+
+def test_rag_stream_events(rag_app):
+    app, srv, gw, items = rag_app
+    events = parse_sse(TestClient(app).get("/rag/stream", params={"q": "crash"}).text)
+    assert events[0] == ("items", [i.model_dump() for i in items])
+    assert events[-1] == ("done", {})
+    assert all(event == "token" for event, _ in events[1:-1]) and len(events) > 2
+
+def test_rag_stream_disconnect_cancels_upstream(rag_app):
+    app, srv, gw, _ = rag_app
+    srv.stream_repeat = 200
+    server, url = serve(app)
+    try:
+        read_first_token_and_disconnect(f"{url}/rag/stream", {"q": "crash"})
+        wait_cancelled(srv, gw)
+    finally:
+        server.should_exit = True
+    assert srv.cancelled >= 1
+    assert gw.stats["in_flight"] == 0
@@ -3,9 +3,16 @@
 from fastapi import FastAPI, HTTPException
 from fastapi.responses import HTMLResponse
 from typing import Optional
-import os
+import os, sys
+
+# Shared request log (sql/common): one JSON line per request with per-stage timings
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "common"))
+from request_log import install_request_logging, stage, timed_query
+from metrics import install_metrics
 
 app = FastAPI(title="User Embeddings UI (Standalone)")
+install_request_logging(app)
+install_metrics(app)  # GET /metrics
 
 def get_conn():
     import psycopg2, psycopg2.extras
@@ -98,11 +105,12 @@ def neighbors(user_id: Optional[str] = None, x: Optional[float] = None, y: Optio
     if not user_id and (x is None or y is None):
         raise HTTPException(status_code=400, detail="Provide user_id OR both x and y")
     import psycopg2, psycopg2.extras
-    conn = get_conn()
+    with stage("pool"):
+        conn = get_conn()
     cur = conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
     if user_id:
-        cur.execute("SELECT embedding FROM user_embeddings WHERE user_id=%s", (user_id,))
-        row = cur.fetchone()
+        rows = timed_query(cur, "SELECT embedding FROM user_embeddings WHERE user_id=%s", (user_id,))
+        row = rows[0] if rows else None
         if not row: cur.close(); conn.close(); raise HTTPException(status_code=404, detail=f"user_id {user_id} not found")
         qvec=row["embedding"]; sql="""SELECT user_id, embedding <=> %s::vector AS cosine_distance
                                       FROM user_embeddings WHERE user_id <> %s
@@ -112,4 +120,4 @@ def neighbors(user_id: Optional[str] = None, x: Optional[float] = None, y: Optio
         vec=f"[{x}, {y}]"; sql="""SELECT user_id, embedding <=> %s::vector AS cosine_distance
                                   FROM user_embeddings ORDER BY embedding <=> %s::vector LIMIT %s"""
         params=(vec, vec, k)
-    cur.execute(sql, params); rows=cur.fetchall(); cur.close(); conn.close(); return rows
\ No newline at end of file
+    rows=timed_query(cur, sql, params); cur.close(); conn.close(); return rows
\ No newline at end of file
@@ -0,0 +1,194 @@
+# -*- coding: utf-8 -*-
+"""
+batch_recommend.py
+- 전체 사용자 대상 오프라인 LLM 추천 배치 (/recommend_llm 을 사용자마다 부르는 대신)
+  1) 이웃 조회: 사용자 청크 단위 LATERAL JOIN 한 번으로 모든 타깃의 Top-K 이웃을 가져옴
+  2) 프롬프트: build_prompts_batch 로 청크 전체를 한 번에 생성(토큰 예산 적용)
+  3) LLM: 스레드풀로 동시 호출(동시 호출 상한 = --concurrency, 게이트웨이 속도 제한/캐시 적용)
+  4) 체크포인트: 청크마다 Parquet part 파일(또는 --table 로 PostgreSQL upsert) → 재실행 시 이어서 진행
+     사용자별 status: ok / failed(LLM 오류, error 컬럼에 사유) / no_prompt(이웃 없음) / mock(--mock, 모의 출력)
+     한 사용자의 LLM 오류가 청크 전체를 멈추지 않음. 재실행 시 failed 사용자만 다시 시도(--skip-failed 로 건너뜀)
+     mock 행은 완료로 보지 않음 → 실제 키로 다시 돌리면 그 사용자들도 처리
+     OPENAI_API_KEY 가 없으면 시작 시 종료(--mock 을 주면 모의 출력으로 진행)
+  5) 처리량(users/s)과 1천 명당 추정 토큰/비용 출력
+Usage:
+  python batch_recommend.py --out recs --k 5 --chunk 500 --concurrency 16
+  python batch_recommend.py --table llm_recommendations --k 5
+  python batch_recommend.py --table analytics.llm_recommendations --skip-failed
+  python batch_recommend.py --out recs_dry --limit 1000 --mock   # API 키 없이 처리량만 확인
+  # 비용 단가(USD / 1M tokens): LLM_PRICE_IN_PER_1M(0.15), LLM_PRICE_OUT_PER_1M(0.60)
+"""
+import os, re, glob, time, argparse
+from concurrent.futures import ThreadPoolExecutor
+import pandas as pd
+import psycopg2, psycopg2.extras
+from psycopg2 import sql
+
+from llm_recommender import get_conn, call_llm, get_gateway
+from rag_prompt_builder_embeddings import build_prompts_batch
+from prompt_packer import count_tokens_batch  # sql/common (added to sys.path by llm_recommender)
+
+NEIGHBORS_SQL = """
+    SELECT t.user_id AS target_user_id, n.user_id, n.cosine_distance
+    FROM user_embeddings t
+    CROSS JOIN LATERAL (
+        SELECT u.user_id, u.embedding <=> t.embedding AS cosine_distance
+        FROM user_embeddings u
+        WHERE u.user_id <> t.user_id
+        ORDER BY u.embedding <=> t.embedding
+        LIMIT %s
+    ) n
+    WHERE t.user_id = ANY(%s)
+"""
+
+TABLE_DDL = """
+CREATE TABLE IF NOT EXISTS {table} (
+    user_id     VARCHAR(10) PRIMARY KEY,
+    k           INT NOT NULL,
+    prompt      TEXT NOT NULL,
+    llm_output  TEXT NOT NULL,
+    status      TEXT NOT NULL DEFAULT 'ok',
+    error       TEXT,
+    created_at  TIMESTAMPTZ NOT NULL DEFAULT now()
+);
+ALTER TABLE {table} ADD COLUMN IF NOT EXISTS status TEXT NOT NULL DEFAULT 'ok';
+ALTER TABLE {table} ADD COLUMN IF NOT EXISTS error TEXT;
+"""
+
+COLUMNS = ["user_id", "k", "prompt", "llm_output", "status", "error"]
+
+def table_name(value: str) -> str:
+    """--table: table or schema.table made of plain identifiers (quoted via psycopg2.sql, never interpolated)"""
+    if not re.fullmatch(r"[A-Za-z_][A-Za-z0-9_]*(\.[A-Za-z_][A-Za-z0-9_]*)?", value):
+        raise argparse.ArgumentTypeError(f"invalid table name: {value!r}")
+    return value
+
+def table_ident(name: str) -> sql.Identifier:
+    return sql.Identifier(*name.split("."))
+
+def done_users(args, cur) -> set:
+    """Users already finished (ok / no_prompt). Failed users are retried unless --skip-failed; mock rows always are."""
+    finished = ("ok", "no_prompt", "failed") if args.skip_failed else ("ok", "no_prompt")
+    if args.table:
+        cur.execute(sql.SQL(TABLE_DDL).format(table=table_ident(args.table)))
+        cur.execute(sql.SQL("SELECT user_id FROM {} WHERE status = ANY(%s)").format(table_ident(args.table)),
+                    (list(finished),))
+        return {r[0] for r in cur.fetchall()}
+    parts = sorted(glob.glob(os.path.join(args.out, "part-*.parquet")))
+    if not parts:
+        return set()
+    import pyarrow.parquet as pq
+    df = pd.concat([pd.read_parquet(p, columns=[c for c in ("user_id", "status") if c in pq.read_schema(p).names])
+                    for p in parts], ignore_index=True)
+    if "status" not in df:
+        df["status"] = "ok"  # parts written before the status column
+    df["status"] = df["status"].fillna("ok")
+    latest = df.drop_duplicates("user_id", keep="last")  # a retried user's newest part wins
+    return set(latest.loc[latest["status"].isin(finished), "user_id"])
+
+def save_chunk(args, cur, conn, df: pd.DataFrame):
+    if args.table:
+        psycopg2.extras.execute_values(cur, sql.SQL("""
+            INSERT INTO {} (user_id, k, prompt, llm_output, status, error) VALUES %s
+            ON CONFLICT (user_id) DO UPDATE
+            SET k = EXCLUDED.k, prompt = EXCLUDED.prompt, llm_output = EXCLUDED.llm_output,
+                status = EXCLUDED.status, error = EXCLUDED.error, created_at = now()
+        """).format(table_ident(args.table)).as_string(conn),
+            list(df[COLUMNS].itertuples(index=False, name=None)))
+        conn.commit()
+        return
+    n = len(glob.glob(os.path.join(args.out, "part-*.parquet")))
+    path = os.path.join(args.out, f"part-{n:05d}.parquet")
+    df.to_parquet(path + ".tmp", index=False)
+    os.replace(path + ".tmp", path)  # 원자적 교체 → 중단돼도 반쯤 쓴 part 파일이 남지 않음
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--k", type=int, default=5)
+    ap.add_argument("--chunk", type=int, default=500, help="한 번에 처리할 사용자 수(체크포인트 단위)")
+    ap.add_argument("--concurrency", type=int, default=16, help="동시 LLM 호출 수")
+    ap.add_argument("--model", default=None)
+    ap.add_argument("--temperature", type=float, default=0.5)
+    ap.add_argument("--out", default="recs", help="Parquet 체크포인트 디렉터리")
+    ap.add_argument("--table", type=table_name, default=None,
+                    help="지정 시 Parquet 대신 PostgreSQL 테이블에 저장(table 또는 schema.table)")
+    ap.add_argument("--skip-failed", action="store_true", help="이전 실행에서 LLM 오류가 난 사용자를 다시 시도하지 않음")
+    ap.add_argument("--limit", type=int, default=None, help="처리할 최대 사용자 수(테스트용)")
+    ap.add_argument("--mock", action="store_true",
+                    help="OPENAI_API_KEY 없이 모의 출력으로 실행(status=mock, 이후 실행에서 다시 처리)")
+    args = ap.parse_args()
+    live = get_gateway().available
+    if not live and not args.mock:
+        ap.error("OPENAI_API_KEY is not set: refusing to store mock output as results (pass --mock for a dry run)")
+    ok_status = "ok" if live else "mock"
+    if not args.table:
+        os.makedirs(args.out, exist_ok=True)
+
+    price_in = float(os.getenv("LLM_PRICE_IN_PER_1M", "0.15"))
+    price_out = float(os.getenv("LLM_PRICE_OUT_PER_1M", "0.60"))
+
+    conn = get_conn()
+    cur = conn.cursor()
+    skip = done_users(args, cur)
+    conn.commit()
+    cur.execute("SELECT user_id FROM user_embeddings ORDER BY user_id")
+    todo = [r[0] for r in cur.fetchall() if r[0] not in skip][:args.limit]
+    print(f"users: todo={len(todo)} already_done={len(skip)}")
+
+    t_start = time.perf_counter()
+    n_users = tok_in = tok_out = 0
+    t_db = t_llm = 0.0
+    n_ok = n_failed = 0
+
+    def generate(prompt):
+        # one user's LLM error is recorded for that user instead of aborting the chunk
+        try:
+            return call_llm(prompt, model=args.model, temperature=args.temperature), ok_status, None
+        except Exception as e:
+            return "", "failed", f"{type(e).__name__}: {e}"
+
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        for i in range(0, len(todo), args.chunk):
+            chunk = todo[i:i + args.chunk]
+
+            t0 = time.perf_counter()
+            cur.execute(NEIGHBORS_SQL, (args.k, chunk))
+            nb = pd.DataFrame(cur.fetchall(), columns=["target_user_id", "user_id", "cosine_distance"])
+            conn.commit()
+            t_db += time.perf_counter() - t0
+
+            prompts = build_prompts_batch(nb)
+            users = [u for u in chunk if u in prompts]
+            t0 = time.perf_counter()
+            results = list(pool.map(generate, [prompts[u] for u in users]))
+            t_llm += time.perf_counter() - t0
+
+            rows = [(u, args.k, prompts[u], out, status, err) for u, (out, status, err) in zip(users, results)]
+            # users without neighbours get no prompt: checkpoint them too so reruns don't refetch them
+            rows += [(u, args.k, "", "", "no_prompt", None) for u in chunk if u not in prompts]
+            df = pd.DataFrame(rows, columns=COLUMNS)
+            save_chunk(args, cur, conn, df)
+
+            ok = df[df["status"] == ok_status]
+            n_users += len(df)
+            n_ok += len(ok)
+            n_failed += int((df["status"] == "failed").sum())
+            tok_in += int(count_tokens_batch(ok["prompt"]).sum())
+            tok_out += int(count_tokens_batch(ok["llm_output"]).sum())
+            elapsed = time.perf_counter() - t_start
+            print(f"[{n_users}/{len(todo)}] {n_users / elapsed:.1f} users/s "
+                  f"(db {t_db:.1f}s, llm {t_llm:.1f}s, failed {n_failed})")
+
+    cur.close(); conn.close()
+    elapsed = time.perf_counter() - t_start
+    if n_users:
+        print(f"done: {n_users} users in {elapsed:.1f}s → {n_users / elapsed:.1f} users/s"
+              + (f" ({n_failed} failed, retried on the next run)" if n_failed and not args.skip_failed else ""))
+    if n_ok:
+        per_k = 1000 / n_ok
+        cost = (tok_in * price_in + tok_out * price_out) / 1e6 * per_k
+        print(f"per 1k users: ~{tok_in * per_k:,.0f} prompt tok, ~{tok_out * per_k:,.0f} output tok, "
+              f"~${cost:.4f} (local token estimate{'' if live else ', mock output'})")
+
+if __name__ == "__main__":
+    main()
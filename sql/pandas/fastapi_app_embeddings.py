@@ -1,11 +1,16 @@
 
 # fastapi_app_embeddings.py
 # Run: uvicorn fastapi_app_embeddings:app --reload
-import os
+import os, sys
 from typing import Any, Dict, List, Optional
 import psycopg2, psycopg2.extras
 from fastapi import FastAPI, HTTPException, Query
 
+# Shared request log (sql/common): one JSON line per request with per-stage timings
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "common"))
+from request_log import install_request_logging, stage, timed_query
+from metrics import install_metrics
+
 def get_conn():
     return psycopg2.connect(
         host=os.getenv("PGHOST","localhost"),
@@ -16,6 +21,8 @@ def get_conn():
     )
 
 app = FastAPI(title="User Embeddings API (pgvector)")
+install_request_logging(app)
+install_metrics(app)  # GET /metrics
 
 @app.get("/health")
 def health():
@@ -36,12 +43,13 @@ def neighbors(
     if not user_id and (x is None or y is None):
         raise HTTPException(status_code=400, detail="Provide user_id OR both x and y")
 
-    conn = get_conn()
+    with stage("pool"):
+        conn = get_conn()
     cur = conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
 
     if user_id:
-        cur.execute("SELECT embedding FROM user_embeddings WHERE user_id = %s", (user_id,))
-        row = cur.fetchone()
+        rows = timed_query(cur, "SELECT embedding FROM user_embeddings WHERE user_id = %s", (user_id,))
+        row = rows[0] if rows else None
         if not row:
             cur.close(); conn.close()
             raise HTTPException(status_code=404, detail=f"user_id {user_id} not found")
@@ -66,8 +74,7 @@ def neighbors(
             LIMIT %s
         """
 
-    cur.execute(sql, params)
-    rows = cur.fetchall()
+    rows = timed_query(cur, sql, params)
     cur.close(); conn.close()
     return {
         "mode": "user_id" if user_id else "ad_hoc",
@@ -1,11 +1,16 @@
 
 # fastapi_app_embeddings_ui.py
 # Run: python -m uvicorn fastapi_app_embeddings_ui:app --reload --host 127.0.0.1 --port 8010
-import os, json
+import os, sys, json
 import psycopg2, psycopg2.extras
 from fastapi import FastAPI, HTTPException
 from fastapi.responses import HTMLResponse
 
+# Shared request log (sql/common): one JSON line per request with per-stage timings
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "common"))
+from request_log import install_request_logging, stage, timed_query
+from metrics import install_metrics
+
 def get_conn():
     return psycopg2.connect(
         host=os.getenv("PGHOST","localhost"),
@@ -16,6 +21,8 @@ def get_conn():
     )
 
 app = FastAPI(title="User Embeddings API (with UI)")
+install_request_logging(app)
+install_metrics(app)  # GET /metrics
 
 @app.get("/health")
 def health():
@@ -26,12 +33,13 @@ def neighbors(user_id: str | None = None, x: float | None = None, y: float | Non
     if not user_id and (x is None or y is None):
         raise HTTPException(status_code=400, detail="Provide user_id OR both x and y")
 
-    conn = get_conn()
+    with stage("pool"):
+        conn = get_conn()
     cur = conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
 
     if user_id:
-        cur.execute("SELECT embedding FROM user_embeddings WHERE user_id = %s", (user_id,))
-        row = cur.fetchone()
+        rows = timed_query(cur, "SELECT embedding FROM user_embeddings WHERE user_id = %s", (user_id,))
+        row = rows[0] if rows else None
         if not row:
             cur.close(); conn.close()
             raise HTTPException(status_code=404, detail=f"user_id {user_id} not found")
@@ -54,8 +62,7 @@ def neighbors(user_id: str | None = None, x: float | None = None, y: float | Non
         """
         params = (vec_literal, vec_literal, k)
 
-    cur.execute(sql, params)
-    rows = cur.fetchall()
+    rows = timed_query(cur, sql, params)
     cur.close(); conn.close()
     return rows
 
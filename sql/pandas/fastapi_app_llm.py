@@ -4,12 +4,19 @@
 
 import os
 from typing import Any, Dict
-from fastapi import FastAPI, HTTPException, Query
+from fastapi import FastAPI, HTTPException, Query, Request
+from fastapi.concurrency import run_in_threadpool
 from fastapi.responses import JSONResponse
 
-from llm_recommender import recommend_for_user
+from llm_recommender import recommend_for_user, fetch_neighbors, stream_llm
+from rag_prompt_builder_embeddings import build_prompt
+from sse import sse_response, stream_events  # sql/common (added to sys.path by llm_recommender)
+from request_log import install_request_logging
+from metrics import install_metrics
 
 app = FastAPI(title="User Embeddings + LLM Recommender")
+install_request_logging(app)
+install_metrics(app)  # GET /metrics (incl. LLM gateway in-flight / cache hit ratio)
 
 @app.get("/health")
 def health():
@@ -29,3 +36,25 @@ def recommend_llm(
         return JSONResponse(content=result)
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
+
+@app.get("/recommend_llm/stream")
+async def recommend_llm_stream(
+    request: Request,
+    user_id: str,
+    k: int = Query(5, ge=1, le=20),
+    model: str = Query(None, description="OpenAI model name, e.g., gpt-4o-mini"),
+    temperature: float = Query(0.5, ge=0.0, le=1.0),
+):
+    """
+    Server-Sent Events: `neighbors` is sent as soon as the DB lookup returns,
+    then LLM output arrives as `token` events, then `done`.
+    Disconnecting cancels the upstream LLM call.
+    """
+    try:
+        neighbors = await run_in_threadpool(fetch_neighbors, user_id, k)
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    prompt = build_prompt(user_id, neighbors)
+    head = [("neighbors", {"user_id": user_id, "k": k, "neighbors": neighbors})]
+    tokens = stream_llm(prompt, model=model, temperature=temperature)
+    return sse_response(stream_events(request, head, tokens))
@@ -2,14 +2,14 @@
 # llm_recommender.py
 # Utilities to fetch neighbors from Postgres, build a prompt, and call an LLM.
 
-import os
+import os, sys
 from typing import List, Dict, Any
 import psycopg2, psycopg2.extras
 
-try:
-    from openai import OpenAI
-except Exception:
-    OpenAI = None  # handled at runtime
+# Shared LLM gateway (sql/common): pooled client, in-flight cap, rate limit, retry, cache
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "common"))
+from llm_gateway import get_gateway
+from request_log import stage, timed_query  # no-op outside a request (e.g. batch_recommend.py)
 
 from rag_prompt_builder_embeddings import build_prompt
 
@@ -23,11 +23,12 @@ def get_conn():
     )
 
 def fetch_neighbors(user_id: str, k: int = 5) -> List[Dict[str, Any]]:
-    conn = get_conn()
+    with stage("pool"):
+        conn = get_conn()
     cur = conn.cursor(cursor_factory=psycopg2.extras.RealDictCursor)
 
-    cur.execute("SELECT embedding FROM user_embeddings WHERE user_id=%s", (user_id,))
-    row = cur.fetchone()
+    rows = timed_query(cur, "SELECT embedding FROM user_embeddings WHERE user_id=%s", (user_id,))
+    row = rows[0] if rows else None
     if not row:
         cur.close(); conn.close()
         raise ValueError(f"user_id {user_id} not found")
@@ -40,28 +41,32 @@ def fetch_neighbors(user_id: str, k: int = 5) -> List[Dict[str, Any]]:
         ORDER BY embedding <=> %s::vector
         LIMIT %s
     """
-    cur.execute(sql, (qvec, user_id, qvec, k))
-    rows = cur.fetchall()
+    rows = timed_query(cur, sql, (qvec, user_id, qvec, k))
     cur.close(); conn.close()
     return rows
 
 def call_llm(prompt: str, model: str = None, temperature: float = 0.5) -> str:
     """
     Returns generated text from OpenAI. Requires OPENAI_API_KEY env var.
+    Goes through the shared gateway, so identical prompts are served from its cache.
     """
-    api_key = os.getenv("OPENAI_API_KEY")
-    if not api_key or OpenAI is None:
+    gateway = get_gateway()
+    if not gateway.available:
         # Fallback mock (no external call)
         return "[MOCK OUTPUT]\\n- 첫 제안\\n- 둘째 제안\\n- 셋째 제안"
 
-    client = OpenAI(api_key=api_key)
-    model = model or os.getenv("OPENAI_MODEL", "gpt-4o-mini")
-    resp = client.chat.completions.create(
-        model=model,
-        messages=[{"role": "user", "content": prompt}],
-        temperature=temperature,
-    )
-    return resp.choices[0].message.content.strip()
+    with stage("llm"):
+        return gateway.complete(prompt, model=model, temperature=temperature)
+
+def stream_llm(prompt: str, model: str = None, temperature: float = 0.5):
+    """
+    Streaming variant of call_llm: returns an iterable of text chunks.
+    The gateway's LLMStream supports close() to cancel the upstream call.
+    """
+    gateway = get_gateway()
+    if not gateway.available:
+        return [call_llm(prompt, model=model, temperature=temperature)]
+    return gateway.stream(prompt, model=model, temperature=temperature)
 
 def recommend_for_user(user_id: str, k: int = 5, model: str = None, temperature: float = 0.5) -> Dict[str, Any]:
     neighbors = fetch_neighbors(user_id, k=k)
@@ -1,7 +1,18 @@
 
 # rag_prompt_builder_embeddings.py
 # Build a concise LLM prompt using a target user and its neighbors.
+import os, sys
 from typing import List, Dict
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "common"))
+from prompt_packer import pack_batch, truncate_tokens, DEFAULT_BUDGET
+
+HEADER = "다음은 타깃 사용자와 임베딩 상 가까운 사용자들입니다.\n"
+GUIDE = (
+    "\n\n위 이웃 목록을 근거로, 타깃 사용자에게 적합한 마케팅 한 줄 제안 3가지를 "
+    "한국어로 제시하세요. 각 제안은 25자 이내로 간결하게."
+)
 
 def build_prompt(target_user_id: str, neighbors: List[Dict]) -> str:
     """
@@ -9,15 +20,44 @@ def build_prompt(target_user_id: str, neighbors: List[Dict]) -> str:
       - user_id
       - cosine_distance
     """
-    header = "다음은 타깃 사용자와 임베딩 상 가까운 사용자들입니다.\n"
     target = f"- 타깃 사용자: {target_user_id}\n\n"
     lines = ["[Top-K 유사 사용자]"]
     for i, n in enumerate(neighbors, 1):
         cos = n.get("cosine_distance", None)
         cos_str = f"{cos:.6f}" if isinstance(cos, (int, float)) else str(cos)
         lines.append(f"{i}. {n.get('user_id')} (cosine distance={cos_str})")
-    guide = (
-        "\n\n위 이웃 목록을 근거로, 타깃 사용자에게 적합한 마케팅 한 줄 제안 3가지를 "
-        "한국어로 제시하세요. 각 제안은 25자 이내로 간결하게."
-    )
-    return header + target + "\n".join(lines) + guide
+    return HEADER + target + "\n".join(lines) + GUIDE
+
+def build_prompts_batch(neighbors_df, token_budget: int = DEFAULT_BUDGET) -> Dict[str, str]:
+    """
+    Build prompts for many target users in one vectorized pass.
+    neighbors_df columns: target_user_id, user_id, cosine_distance
+    Lines are ranked by cosine distance per target and packed into token_budget
+    (same rule as pack_contexts: a line that does not fit is skipped, shorter ones
+    after it can still fill the budget). Kept lines are numbered 1..n after packing,
+    so the text matches build_prompt over the kept neighbours.
+    Every target gets a prompt: if no line fits, the closest neighbour's line is
+    truncated to the budget (budget <= 0 → no neighbour lines, just the question).
+    Returns {target_user_id: prompt}.
+    """
+    df = neighbors_df.sort_values(["target_user_id", "cosine_distance"], kind="stable").reset_index(drop=True)
+    if df.empty:
+        return {}
+    rank = df.groupby("target_user_id", sort=False).cumcount() + 1
+    dist = df["cosine_distance"].astype(float).map("{:.6f}".format)
+    entry = df["user_id"].astype(str) + " (cosine distance=" + dist + ")"
+    # pack with the pre-packing rank: the final number is never larger, so the kept lines stay within budget
+    df["line"] = rank.astype(str) + ". " + entry
+
+    keep = pack_batch(df["target_user_id"].to_numpy(), df["line"].tolist(),
+                      -df["cosine_distance"].to_numpy(dtype=np.float64), budget=token_budget)
+    kept = df[keep]
+    lines = (kept.groupby("target_user_id", sort=False).cumcount() + 1).astype(str) + ". " + entry[keep]
+    body = lines.groupby(kept["target_user_id"], sort=False).agg("\n".join).to_dict()
+    for uid, line in df.groupby("target_user_id", sort=False)["line"].first().items():
+        if uid not in body:
+            body[uid] = truncate_tokens(line, token_budget) if token_budget > 0 else ""
+    return {
+        uid: HEADER + f"- 타깃 사용자: {uid}\n\n" + "\n".join(["[Top-K 유사 사용자]"] + ([lines] if lines else [])) + GUIDE
+        for uid, lines in body.items()
+    }
@@ -0,0 +1,242 @@
+"""
+==========================================
+파일명   : OOP/bench_beverage.py
+목적     : opp_beverage-recommadaion.py 성능 측정 스크립트
+설명     :
+    aggregates : 주문 이력 길이별 get_total_spent / get_recent_tags 1회 호출 비용
+                 (매번 전체 주문을 다시 훑던 기존 방식 vs add_order 시 누적한 집계)
+                 + User 인스턴스 1개당 메모리
+    columnar   : 객체형(User/Order) vs 컬럼형(ColumnarOrderStore) 주문 1건당 메모리와
+                 사용자별 지출/상위 음료/태그 히스토그램 집계 시간
+    snapshot   : save_snapshot 저장 시간/크기, load_snapshot 콜드 로드 시간
+                 (비교: 같은 주문을 add_order로 하나씩 재생해 재구성하는 시간)
+    concurrent : 쓰기 스레드 N개(OrderSystem.add_order) + 읽기 스레드 M개(recommend)를
+                 동시에 돌려 주문 처리량(orders/s)과 recommend 지연(p50/p99) 측정
+                 (락 1개 = 전역 락 vs 사용자 락 분산, --log/--fsync로 주문 로그를 켠 상태도 측정)
+
+실행     :
+    python bench_beverage.py aggregates
+    python bench_beverage.py columnar --orders 1000000 --users 50000
+    python bench_beverage.py snapshot --orders 2000000 --users 100000
+    python bench_beverage.py concurrent --writers 8 --readers 4 --seconds 3
+    python bench_beverage.py concurrent --writers 8 --readers 4 --seconds 3 --log --fsync
+==========================================
+"""
+import argparse, importlib.util, os, random, shutil, sys, tempfile, threading, time, tracemalloc
+
+def load_module():
+    # 파일명에 '-'가 있어 일반 import 불가 → 경로로 로드
+    path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "opp_beverage-recommadaion.py")
+    spec = importlib.util.spec_from_file_location("beverage", path)
+    mod = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(mod)
+    return mod
+
+bev = load_module()
+
+def make_menu(n_items=200, n_tags=30, seed=0):
+    rng = random.Random(seed)
+    tags = [f"tag{i}" for i in range(n_tags)]
+    return [bev.Beverage(f"drink{i}", rng.randint(20, 60) * 100, rng.sample(tags, rng.randint(1, 4)))
+            for i in range(n_items)]
+
+def per_call(fn, repeat):
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - t0) / repeat * 1e6  # µs
+
+def bench_aggregates(args):
+    menu = make_menu()
+    rng = random.Random(1)
+    print(f"{'orders':>8} | {'total(old)':>11} {'total(new)':>11} | {'tags(old)':>11} {'tags(new)':>11}  (µs/call)")
+    for n in (10, 100, 1_000, 10_000, 100_000):
+        user = bev.User("bench")
+        for _ in range(n):
+            user.add_order(bev.Order(rng.choice(menu), rng.randint(1, 3)))
+        repeat = max(10, 200_000 // n)
+        old_total = per_call(lambda: sum(o.total_price for o in user.orders), repeat)
+        new_total = per_call(user.get_total_spent, repeat)
+        old_tags = per_call(lambda: list(set(t for o in user.orders[-3:] for t in o.beverage.tags)), repeat)
+        new_tags = per_call(user.get_recent_tags, repeat)
+        print(f"{n:>8} | {old_total:>11.2f} {new_total:>11.2f} | {old_tags:>11.2f} {new_tags:>11.2f}")
+
+    tracemalloc.start()
+    users = [bev.User(f"u{i}") for i in range(args.users)]
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"empty User: ~{size / len(users):.0f} bytes/user ({args.users} users)")
+
+def timed(fn):
+    t0 = time.perf_counter()
+    out = fn()
+    return out, time.perf_counter() - t0
+
+def bench_columnar(args):
+    from collections import Counter
+    menu = make_menu()
+    rng = random.Random(2)
+    picks = [(rng.randrange(args.users), rng.randrange(len(menu)), rng.randint(1, 3)) for _ in range(args.orders)]
+
+    tracemalloc.start()
+    users = [bev.User(f"u{i}") for i in range(args.users)]
+    for u, b, q in picks:
+        users[u].add_order(bev.Order(menu[b], q))
+    obj_bytes, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    tracemalloc.start()
+    store = bev.ColumnarOrderStore(menu)
+    for i in range(args.users):
+        store.intern_user(f"u{i}")
+    for seq, (u, b, q) in enumerate(picks):
+        store.append(f"u{u}", menu[b], q, float(seq))
+    col_bytes, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    print(f"orders={args.orders} users={args.users}")
+    print(f"memory/order : object {obj_bytes / args.orders:7.1f} B   columnar {col_bytes / args.orders:7.1f} B")
+
+    def obj_tags():
+        c = Counter()
+        for u in users:
+            for o in u.orders:
+                for t in o.beverage.tags:
+                    c[t] += o.quantity
+        return c
+
+    def obj_top():
+        c = Counter()
+        for u in users:
+            for o in u.orders:
+                c[o.beverage.name] += o.quantity
+        return c.most_common(5)
+
+    for label, obj_fn, col_fn in [
+        ("spend/user", lambda: {u.name: sum(o.total_price for o in u.orders) for u in users}, store.spend_per_user),
+        ("top drinks", obj_top, lambda: store.top_beverages(5)),
+        ("tag hist  ", obj_tags, store.tag_histogram),
+    ]:
+        _, t_obj = timed(obj_fn)
+        _, t_col = timed(col_fn)
+        print(f"{label}   : object {t_obj * 1000:8.1f} ms   columnar {t_col * 1000:8.1f} ms")
+
+def bench_snapshot(args):
+    menu = make_menu()
+    rng = random.Random(3)
+    picks = [(rng.randrange(args.users), rng.randrange(len(menu)), rng.randint(1, 3)) for _ in range(args.orders)]
+
+    def replay():
+        system = bev.OrderSystem(menu)
+        users = [bev.User(f"u{i}") for i in range(args.users)]
+        for u in users:
+            system.add_user(u)
+        for u, b, q in picks:
+            users[u].add_order(bev.Order(menu[b], q))
+        return system
+
+    system, t_replay = timed(replay)
+    path = args.path or tempfile.mkdtemp(prefix="bev_snapshot_")
+    try:
+        _, t_save = timed(lambda: system.save_snapshot(path))
+        size = sum(os.path.getsize(os.path.join(path, f)) for f in os.listdir(path))
+        loaded, t_load = timed(lambda: bev.OrderSystem.load_snapshot(path))
+        _, t_rec = timed(lambda: loaded.recommend(loaded.users[0], 3))
+        loaded.close_log()
+    finally:
+        if not args.path:
+            shutil.rmtree(path, ignore_errors=True)
+
+    print(f"orders={args.orders} users={args.users}")
+    print(f"save snapshot : {t_save:6.2f} s   {size / 1e6:.1f} MB ({size / args.orders:.1f} B/order)")
+    print(f"cold load     : {t_load:6.2f} s   (+first recommend {t_rec * 1000:.1f} ms)")
+    print(f"replay orders : {t_replay:6.2f} s   (add_order per order)")
+
+def run_concurrent(args, stripes):
+    menu = make_menu()
+    system = bev.OrderSystem(menu, lock_stripes=stripes)
+    users = [bev.User(f"u{i}") for i in range(args.users)]
+    for u in users:
+        system.add_user(u)
+    log_dir = tempfile.mkdtemp(prefix="bev_log_") if args.log else None
+    if log_dir:
+        system.open_log(os.path.join(log_dir, "orders.log"), fsync=args.fsync)
+    stop = threading.Event()
+    written = [0] * args.writers
+    latencies = [[] for _ in range(args.readers)]
+
+    def writer(w):
+        rng = random.Random(w)
+        n = 0
+        while not stop.is_set():
+            system.add_order(users[rng.randrange(len(users))], bev.Order(menu[rng.randrange(len(menu))], 1))
+            n += 1
+        written[w] = n
+
+    def reader(r):
+        rng = random.Random(1000 + r)
+        lat = latencies[r]
+        while not stop.is_set():
+            t0 = time.perf_counter()
+            system.recommend(users[rng.randrange(len(users))], 3)
+            lat.append(time.perf_counter() - t0)
+
+    threads = [threading.Thread(target=writer, args=(w,)) for w in range(args.writers)]
+    threads += [threading.Thread(target=reader, args=(r,)) for r in range(args.readers)]
+    for t in threads:
+        t.start()
+    time.sleep(args.seconds)
+    stop.set()
+    for t in threads:
+        t.join()
+    if log_dir:
+        system.close_log()
+        with open(os.path.join(log_dir, "orders.log"), encoding="utf-8") as f:
+            logged = sum(1 for line in f if '"op": "order"' in line)
+        shutil.rmtree(log_dir, ignore_errors=True)
+        assert logged == sum(written), "lost log records"
+
+    total = sum(written)
+    assert total == sum(len(u.orders) for u in users), "lost orders"
+    lat = sorted(x for l in latencies for x in l)
+    pct = lambda p: lat[min(len(lat) - 1, int(p * len(lat)))] * 1e6 if lat else float("nan")
+    print(f"stripes={stripes:>3} | {total / args.seconds:>10,.0f} orders/s | "
+          f"recommend {len(lat) / args.seconds:>8,.0f}/s  p50 {pct(0.5):7.1f} µs  p99 {pct(0.99):8.1f} µs")
+
+def bench_concurrent(args):
+    gil = getattr(sys, "_is_gil_enabled", lambda: True)()
+    log = ("fsync" if args.fsync else "on") if args.log else "off"
+    print(f"writers={args.writers} readers={args.readers} users={args.users} "
+          f"seconds={args.seconds} log={log} (GIL {'on' if gil else 'off'})")
+    for stripes in (1, args.stripes):
+        run_concurrent(args, stripes)
+
+def main():
+    ap = argparse.ArgumentParser()
+    sub = ap.add_subparsers(dest="cmd", required=True)
+    p = sub.add_parser("aggregates")
+    p.add_argument("--users", type=int, default=100_000)
+    p.set_defaults(func=bench_aggregates)
+    p = sub.add_parser("columnar")
+    p.add_argument("--orders", type=int, default=1_000_000)
+    p.add_argument("--users", type=int, default=50_000)
+    p.set_defaults(func=bench_columnar)
+    p = sub.add_parser("snapshot")
+    p.add_argument("--orders", type=int, default=2_000_000)
+    p.add_argument("--users", type=int, default=100_000)
+    p.add_argument("--path", default=None, help="스냅샷 디렉터리(기본: 임시 디렉터리, 종료 시 삭제)")
+    p.set_defaults(func=bench_snapshot)
+    p = sub.add_parser("concurrent")
+    p.add_argument("--writers", type=int, default=8)
+    p.add_argument("--readers", type=int, default=4)
+    p.add_argument("--users", type=int, default=10_000)
+    p.add_argument("--stripes", type=int, default=bev.LOCK_STRIPES)
+    p.add_argument("--seconds", type=float, default=3.0)
+    p.add_argument("--log", action="store_true", help="주문 로그를 켜고 측정(임시 디렉터리)")
+    p.add_argument("--fsync", action="store_true", help="--log와 함께: 기록마다 fsync(group commit)")
+    p.set_defaults(func=bench_concurrent)
+    args = ap.parse_args()
+    args.func(args)
+
+if __name__ == "__main__":
+    main()
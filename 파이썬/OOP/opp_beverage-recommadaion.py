@@ -1,6 +1,29 @@
 from dataclasses import dataclass
-from typing import List, Dict, Optional
+from collections import defaultdict, deque
+from typing import List, Dict, Optional, Set
+from array import array
+from contextlib import ExitStack, contextmanager
+import gc
+import json
+import math
+import os
 import random
+import heapq
+import threading
+import time
+
+# 추천 점수용 파라미터: 최근 RECENT_ORDERS건의 주문만 보고, 한 건 오래될수록 RECENCY_DECAY배
+RECENT_ORDERS = 10
+RECENCY_DECAY = 0.7
+# get_recent_tags 기본 창 크기(최근 3건)
+RECENT_TAG_WINDOW = 3
+# OrderSystem 사용자 락 개수(이름 해시로 분산). 1이면 전역 락 하나와 같음
+LOCK_STRIPES = 64
+# 추천 순위 비교 시 점수 단위(2⁻³⁰). 합산 순서에 따른 마지막 자리 오차를 동점으로 보고 메뉴 순서로 정렬
+# (recommend와 recommend_batch가 같은 결과를 내도록 두 경로 모두 floor(점수 × SCORE_SCALE + 0.5)로 비교)
+SCORE_SCALE = float(2 ** 30)
+# 주문 없는 사용자가 공유하는 빈 구매 집합(첫 주문 때 사용자별 set으로 교체)
+_NO_PURCHASES: frozenset = frozenset()
 
 @dataclass
 class Beverage:
@@ -34,94 +57,840 @@ class Order:
         property로 노출해 읽기 전용 계산 속성처럼 사용.
         """
         return self.beverage.price * self.quantity
+
 class User:
     """
     사용자(고객)를 표현하는 클래스.
     - name: 사용자 이름(식별자 대용)
     - orders: 사용자가 지금까지 담아온 주문 목록(List[Order])
+    대시보드/추천에서 매번 전체 주문을 다시 훑지 않도록 add_order에서 O(1)로 갱신하는 집계:
+    - _total_spent : 누적 지출액
+    - _recent      : 최근 주문(길이 제한 deque, 추천 가중치용)
+    - _recent_tags : 최근 RECENT_TAG_WINDOW건 주문의 태그 카운터(get_recent_tags 기본값용)
     """
+    # 사용자 수가 많아도 인스턴스당 메모리를 작게 유지(Order와 동일한 방식)
+    __slots__ = ('name', 'orders', 'purchased', '_total_spent', '_recent', '_recent_tags')
+
     def __init__(self, name: str):
         self.name = name
         self.orders: List[Order] = []  # 초기 주문 내역은 비어 있음
+        # 구매한 음료 이름 집합. 추천 시 '이미 산 음료 제외'를 O(1)로 판단하기 위함
+        self.purchased: Set[str] = _NO_PURCHASES
+        self._total_spent = 0
+        # 주문이 없는 사용자가 많으므로 구매 집합/deque/카운터는 첫 주문 때 생성
+        self._recent: Optional[deque] = None
+        self._recent_tags: Optional[Dict[str, int]] = None
 
     def add_order(self, order: Order):
         """
         사용자의 주문 내역에 새로운 주문 항목(Order)을 추가.
+        구매 음료 집합과 누적 집계(총액, 최근 주문, 최근 태그 카운터)도 함께 갱신.
         """
         self.orders.append(order)
+        if self.purchased is _NO_PURCHASES:
+            self.purchased = set()
+        self.purchased.add(order.beverage.name)
+        self._total_spent += order.total_price
+        self._push_recent(order)
+
+    def _push_recent(self, order: Order):
+        if self._recent is None:
+            self._recent = deque(maxlen=max(RECENT_ORDERS, RECENT_TAG_WINDOW))
+            self._recent_tags = {}
+
+        # 최근 RECENT_TAG_WINDOW건 창에서 밀려나는 주문의 태그를 빼고, 새 주문의 태그를 더함
+        if len(self._recent) >= RECENT_TAG_WINDOW:
+            for tag in set(self._recent[-RECENT_TAG_WINDOW].beverage.tags):
+                left = self._recent_tags[tag] - 1
+                if left:
+                    self._recent_tags[tag] = left
+                else:
+                    del self._recent_tags[tag]
+        for tag in set(order.beverage.tags):
+            self._recent_tags[tag] = self._recent_tags.get(tag, 0) + 1
+        self._recent.append(order)
+
+    @classmethod
+    def _restore(cls, name: str, orders: List[Order], purchased: Set[str], total_spent: float) -> 'User':
+        """
+        스냅샷 복원용: 이미 계산된 집계(구매 집합, 총액)를 그대로 넣고
+        최근 주문 창만 마지막 몇 건으로 채움(주문 전체를 add_order로 재생하지 않음).
+        """
+        user = cls(name)
+        user.orders = orders
+        user.purchased = purchased
+        user._total_spent = total_spent
+        if orders:
+            user._recent = deque(orders[-max(RECENT_ORDERS, RECENT_TAG_WINDOW):],
+                                 maxlen=max(RECENT_ORDERS, RECENT_TAG_WINDOW))
+            user._recent_tags = {}
+            for order in orders[-RECENT_TAG_WINDOW:]:
+                for tag in set(order.beverage.tags):
+                    user._recent_tags[tag] = user._recent_tags.get(tag, 0) + 1
+        return user
 
     def get_total_spent(self) -> float:
         """
-        지금까지 해당 사용자가 지출한 총액(원)을 계산.
-        모든 주문 항목의 total_price 합.
+        지금까지 해당 사용자가 지출한 총액(원).
+        add_order 시점에 누적해 둔 값을 반환(O(1)).
         """
-        return sum(order.total_price for order in self.orders)
+        return self._total_spent
+
+    def get_average_spent(self) -> float:
+        """주문 항목 1건당 평균 지출액(원). 주문이 없으면 0."""
+        return self._total_spent / len(self.orders) if self.orders else 0.0
 
-    def get_recent_tags(self, n: int = 3) -> List[str]:
+    def get_recent_tags(self, n: int = RECENT_TAG_WINDOW) -> List[str]:
         """
         최근 n개의 주문을 기준으로 태그를 수집하여 반환.
         - 최근 주문일수록 사용자 취향 반영도가 높다고 가정.
-        - set으로 중복을 제거 후 list로 변환해 반환.
+        - 기본 창(n=RECENT_TAG_WINDOW)은 add_order에서 유지한 태그 카운터를 그대로 사용.
+        - 그 외 n은 최근 주문 deque(모자라면 전체 주문 목록)에서 수집.
+        """
+        if n == RECENT_TAG_WINDOW:
+            return list(self._recent_tags or ())
+        if n <= 0 or self._recent is None:
+            return []
+        recent = list(self._recent)[-n:] if n <= len(self._recent) else self.orders[-n:]
+        return list({tag for order in recent for tag in order.beverage.tags})
+
+    def get_tag_weights(self, n: int = RECENT_ORDERS, decay: float = RECENCY_DECAY) -> Dict[str, float]:
         """
-        tags = []
-        # 슬라이싱 self.orders[-n:]: 주문 수가 n보다 적어도 안전하게 동작.
-        for order in self.orders[-n:]:
-            # 각 주문의 음료가 가진 태그들을 누적
-            tags.extend(order.beverage.tags)
-        # 중복 제거를 위해 set으로 변환했다가 다시 list로 변환
-        return list(set(tags))
+        최근 n개 주문으로 만든 태그 가중치(추천 점수용).
+        - 가장 최근 주문은 수량 × 1, 그 이전은 수량 × decay, decay², ...
+        """
+        recent = self._recent or ()
+        if n < len(recent):
+            recent = list(recent)[-n:]
+        return _tag_weights(recent, decay)
+
+def _tag_weights(recent_orders, decay: float) -> Dict[str, float]:
+    """오래된→최근 순 주문 목록으로 태그 가중치 계산(User와 UserView가 공유)"""
+    weights: Dict[str, float] = defaultdict(float)
+    w = 1.0
+    for order in reversed(recent_orders):
+        for tag in set(order.beverage.tags):
+            weights[tag] += w * order.quantity
+        w *= decay
+    return weights
+
+class _MenuIndex:
+    """
+    메뉴와 파생 인덱스 묶음. 만든 뒤에는 수정하지 않음(copy-on-write):
+    메뉴가 바뀌면 새 _MenuIndex를 만들어 참조 하나만 교체 → 읽는 쪽은 락 없이 일관된 메뉴를 봄.
+    - by_name: 이름 → 음료 (find_beverage O(1))
+    - by_tag : 태그 → 해당 태그를 가진 음료 목록(역색인, 추천 후보 수집용)
+    - pos    : 음료 → 메뉴상 위치(추천 결과를 메뉴 순서로 정렬할 때 사용)
+    - by_id  : id(음료) → 음료 (점수 dict의 키를 음료로 되돌릴 때 사용, 호출마다 만들지 않음)
+    """
+    __slots__ = ('menu', 'by_name', 'by_tag', 'pos', 'by_id', 'item_tags')
+
+    def __init__(self, menu: List['Beverage']):
+        self.menu = list(menu)
+        self.by_name: Dict[str, Beverage] = {}
+        self.by_tag: Dict[str, List[Beverage]] = defaultdict(list)
+        self.pos: Dict[int, int] = {}
+        self.by_id: Dict[int, Beverage] = {}
+        self.item_tags = None  # recommend_batch용 음료×태그 행렬(지연 생성)
+        for pos, beverage in enumerate(self.menu):
+            self.pos.setdefault(id(beverage), pos)
+            self.by_id[id(beverage)] = beverage
+            # 동일 이름이 여러 개면 첫 번째 항목 우선(기존 선형 탐색과 동일한 결과)
+            self.by_name.setdefault(beverage.name, beverage)
+            for tag in set(beverage.tags):
+                self.by_tag[tag].append(beverage)
 
 class OrderSystem:
     """
     주문/추천 시스템의 메인 진입점.
     - menu: 판매 중인 전체 음료 목록(List[Beverage])
     - users: 시스템에 등록된 사용자 목록(List[User])
+    동시성(멀티스레드 웹 서버 등):
+    - 사용자 상태는 이름 해시로 나눈 lock_stripes개의 락으로 보호 → 서로 다른 사용자의
+      add_order는 하나의 전역 락에서 줄 서지 않음
+    - 메뉴 인덱스(_MenuIndex)는 copy-on-write → recommend는 메뉴 락 없이 읽음
+    - 로그(open_log)는 _LogWriter가 모아서 write/fsync(group commit) → 사용자 락 안에서는 대기열에 넣기만 함
+    - 여러 스레드에서 주문을 넣을 때는 User.add_order 대신 OrderSystem.add_order 사용
     """
-    def __init__(self, menu: List['Beverage']):
-        self.menu = menu
+    def __init__(self, menu: List['Beverage'], lock_stripes: int = LOCK_STRIPES):
+        self._index = _MenuIndex(menu)
+        self._menu_lock = threading.Lock()   # 메뉴 변경끼리만 직렬화
+        self._users_lock = threading.Lock()
+        self._stripes = [threading.Lock() for _ in range(max(1, lock_stripes))]
         self.users: List[User] = []
+        self._log: Optional[_LogWriter] = None  # 스냅샷 이후 변경분을 기록하는 append-only 로그(open_log)
+
+    def _lock_for(self, user) -> threading.Lock:
+        return self._stripes[hash(user.name) % len(self._stripes)]
+
+    @contextmanager
+    def _all_locks(self):
+        """모든 사용자 락을 같은 순서로 잡음(스냅샷 저장 등 전체 일관성이 필요할 때)"""
+        with ExitStack() as stack:
+            for lock in self._stripes:
+                stack.enter_context(lock)
+            yield
+
+    @property
+    def menu(self) -> List['Beverage']:
+        return self._index.menu
+
+    @menu.setter
+    def menu(self, menu: List['Beverage']):
+        # 메뉴 전체 교체 시 인덱스 재구성. 로그에도 남겨야 재생 때 이후 주문이 같은 메뉴에서 음료를 찾음
+        with self._menu_lock:
+            self._index = _MenuIndex(menu)
+            self._write_log({"op": "menu_replace",
+                             "menu": [{"name": b.name, "price": b.price, "tags": list(b.tags)} for b in menu]})
+
+    def add_beverage(self, beverage: 'Beverage'):
+        """메뉴에 음료를 추가(새 인덱스를 만들어 교체, 메뉴 변경은 드묾)"""
+        with self._menu_lock:
+            self._index = _MenuIndex(self._index.menu + [beverage])
+            self._write_log({"op": "menu_add", "name": beverage.name, "price": beverage.price,
+                             "tags": list(beverage.tags)})
+
+    def remove_beverage(self, name: str) -> bool:
+        """이름이 같은 음료를 메뉴에서 제거"""
+        with self._menu_lock:
+            remaining = [b for b in self._index.menu if b.name != name]
+            if len(remaining) == len(self._index.menu):
+                return False
+            self._index = _MenuIndex(remaining)
+            self._write_log({"op": "menu_remove", "name": name})
+        return True
 
     def find_beverage(self, name: str) -> Optional['Beverage']:
         """
-        메뉴 목록에서 이름으로 음료를 검색해 반환.
+        메뉴에서 이름으로 음료를 검색해 반환(이름 → 음료 dict 조회, O(1)).
         - 동일 이름이 여러 개인 경우 첫 번째 항목을 반환(일반적으로는 이름이 유니크라고 가정)
         - 없으면 None 반환
         """
-        for beverage in self.menu:
-            if beverage.name == name:
-                return beverage
-        return None
+        return self._index.by_name.get(name)
 
     def add_user(self, user: User):
         """
         새로운 사용자를 시스템에 등록.
         (간단한 리스트 추가지만, 확장 시 중복 사용자 검증/ID 발급 등 로직 추가 가능)
         """
-        self.users.append(user)
+        with self._users_lock:
+            self.users.append(user)
+            self._write_log({"op": "user", "name": user.name})
+
+    def add_order(self, user: User, order: Order):
+        """
+        사용자 주문 추가 + 로그 기록. 재시작 후에도 남아야 하는 주문은 이 경로로 추가.
+        (user.add_order를 직접 부르면 메모리에만 반영됨)
+        """
+        log = self._log
+        if log is None:
+            with self._lock_for(user):
+                user.add_order(order)
+            return
+        # 가격/태그도 항상 기록: 메뉴 확인과 로그 등록 사이에 remove_beverage 등이 끼어들어도
+        # 재생 시 메뉴 상태와 상관없이 음료를 복원할 수 있음
+        record = {"op": "order", "user": user.name, "beverage": order.beverage.name,
+                  "quantity": order.quantity, "price": order.beverage.price, "tags": list(order.beverage.tags)}
+        line = json.dumps(record, ensure_ascii=False) + "\n"
+        # 로그 큐 등록까지 같은 락 안에서 → save_snapshot과 겹쳐도 주문이 빠지거나 두 번 반영되지 않음.
+        # 실제 write/fsync는 락을 놓은 뒤 다른 주문들과 모아서 함
+        with self._lock_for(user):
+            user.add_order(order)
+            seq = log.put(line)
+        log.wait(seq)
+
+    # ---------------- 스냅샷 / 로그 ----------------
+    # 디렉터리 구성:
+    #   meta.json                       세대 번호(gen), 음료 목록(메뉴 + 삭제됐지만 주문에 남은 음료), 사용자 이름, 주문 수
+    #   orders_user.<gen>.npy / orders_bev.<gen>.npy / orders_qty.<gen>.npy
+    #                                   주문 컬럼(int32, 사용자별·주문순). 로드 시 memmap
+    #   orders.log                      스냅샷 이후 변경분(JSON lines, append-only). 첫 줄 {"op": "log", "gen": N}
+    # meta.json 교체가 유일한 커밋 지점: 새 세대 컬럼 파일을 먼저 쓰고 meta.json을 바꾼 뒤 로그를 새 세대로 비움.
+    # 그 사이에 중단되면 로그 세대(이전) < meta 세대 → 이미 스냅샷에 들어간 로그로 보고 재생하지 않음
+    def save_snapshot(self, path: str):
+        """
+        현재 메뉴/사용자/주문을 컬럼형 스냅샷으로 저장하고 로그를 비움.
+        저장하는 동안 모든 쓰기(메뉴/사용자/주문)를 막아 스냅샷과 로그가 어긋나지 않게 함.
+        """
+        import numpy as np
+        with self._menu_lock, self._users_lock, self._all_locks():
+            os.makedirs(path, exist_ok=True)
+            prev_gen = _snapshot_gen(path)
+            gen = prev_gen + 1
+            # 메뉴에서 삭제된 음료도 과거 주문에는 남아 있으므로 메뉴 뒤에 이어 붙여 함께 저장
+            catalog = list(self._index.menu)
+            bev_ids = {id(b): i for i, b in enumerate(catalog)}
+            n = sum(len(u.orders) for u in self.users)
+            cols = {c: np.empty(n, dtype=np.int32) for c in ("user", "bev", "qty")}
+            row = 0
+            for uid, user in enumerate(self.users):
+                k = len(user.orders)
+                for order in user.orders:
+                    if id(order.beverage) not in bev_ids:
+                        bev_ids[id(order.beverage)] = len(catalog)
+                        catalog.append(order.beverage)
+                cols["user"][row:row + k] = uid
+                cols["bev"][row:row + k] = [bev_ids[id(o.beverage)] for o in user.orders]
+                cols["qty"][row:row + k] = [o.quantity for o in user.orders]
+                row += k
+
+            # 새 세대 파일을 모두 쓴 뒤 meta.json 교체 → 저장 중 중단돼도 이전 스냅샷(이전 세대 파일)이 유지됨
+            for c, arr in cols.items():
+                np.save(os.path.join(path, f"orders_{c}.{gen}.npy"), arr)
+            meta = {"version": 2, "gen": gen, "orders": n, "users": [u.name for u in self.users],
+                    "menu_size": len(self._index.menu),
+                    "beverages": [{"name": b.name, "price": b.price, "tags": list(b.tags)} for b in catalog]}
+            with open(os.path.join(path, "meta.tmp.json"), "w", encoding="utf-8") as f:
+                json.dump(meta, f, ensure_ascii=False)
+            os.replace(os.path.join(path, "meta.tmp.json"), os.path.join(path, "meta.json"))
+
+            # 스냅샷에 모두 반영됐으므로 로그는 새 세대로 시작
+            log_path = os.path.join(path, "orders.log")
+            if self._log is not None and os.path.abspath(self._log.path) == os.path.abspath(log_path):
+                self._log.truncate()
+                self._write_log({"op": "log", "gen": gen})
+            else:
+                _start_log(log_path, gen)
+            for c in cols:
+                for old in (f"orders_{c}.{prev_gen}.npy", f"orders_{c}.npy"):
+                    if os.path.exists(os.path.join(path, old)):
+                        os.remove(os.path.join(path, old))
+
+    @classmethod
+    def load_snapshot(cls, path: str, open_log: bool = True) -> 'OrderSystem':
+        """
+        스냅샷 + 로그로 시스템 복원.
+        - 주문 컬럼은 memmap으로 읽고, 총액/구매 집합은 numpy로 일괄 계산
+        - 메뉴 인덱스는 메뉴 setter에서 한 번에 구성(주문별 add_order 재생 없음)
+        - 로그(스냅샷 이후 변경분)만 순서대로 재생
+        """
+        import numpy as np
+        with open(os.path.join(path, "meta.json"), encoding="utf-8") as f:
+            meta = json.load(f)
+        catalog = [Beverage(m["name"], m["price"], list(m["tags"])) for m in meta["beverages"]]
+        system = cls(catalog[:meta["menu_size"]])
+        names = meta["users"]
+        gen = meta.get("gen", 0)
+
+        # 세대 없는 이전 형식(version 1)은 orders_<c>.npy
+        suffix = f".{gen}" if "gen" in meta else ""
+        u, b, q = (np.load(os.path.join(path, f"orders_{c}{suffix}.npy"), mmap_mode="r") for c in ("user", "bev", "qty"))
+        if not len(u) == len(b) == len(q) == meta["orders"]:
+            raise ValueError(f"snapshot {path}: order columns ({len(u)}, {len(b)}, {len(q)}) "
+                             f"do not match meta orders={meta['orders']}")
+        prices = np.array([m.price for m in catalog], dtype=np.float64)
+        totals = np.bincount(u, weights=prices[b] * q, minlength=len(names)) if len(u) else np.zeros(len(names))
+        offsets = np.searchsorted(u, np.arange(len(names) + 1))  # 사용자별로 연속 저장돼 있음
+
+        # Order 객체 생성은 한 번의 map으로, 사용자별 목록은 슬라이스로.
+        # 수백만 개 객체를 만드는 동안 순환 GC가 반복 실행되지 않도록 잠시 끔
+        gc_was_enabled = gc.isenabled()
+        gc.disable()
+        try:
+            b_list = b.tolist()
+            orders = list(map(Order, map(catalog.__getitem__, b_list), q.tolist()))
+            bev_names = [m.name for m in catalog]
+            bounds = offsets.tolist()
+            totals = totals.tolist()
+            for uid, name in enumerate(names):
+                lo, hi = bounds[uid], bounds[uid + 1]
+                purchased = {bev_names[i] for i in set(b_list[lo:hi])}
+                system.users.append(User._restore(name, orders[lo:hi], purchased, totals[uid]))
+        finally:
+            if gc_was_enabled:
+                gc.enable()
+
+        log_path = os.path.join(path, "orders.log")
+        if os.path.exists(log_path) and _log_gen(log_path) >= gen:
+            system._replay_log(log_path)
+        else:
+            # 로그가 없거나 스냅샷 저장이 로그를 비우기 전에 중단됨(내용은 이미 스냅샷에 있음)
+            _start_log(log_path, gen)
+        if open_log:
+            system.open_log(log_path)
+        return system
+
+    def open_log(self, path: str, fsync: bool = False):
+        """이후 add_user/add_order/메뉴 변경을 path에 한 줄씩 추가 기록"""
+        self._log = _LogWriter(path, fsync)
+
+    def close_log(self):
+        if self._log is not None:
+            self._log.close()
+            self._log = None
+
+    def _write_log(self, record: dict):
+        if self._log is None:
+            return
+        self._log.wait(self._log.put(json.dumps(record, ensure_ascii=False) + "\n"))
+
+    def _replay_log(self, path: str):
+        log, self._log = self._log, None  # 재생 중에는 다시 기록하지 않음
+        users = {u.name: u for u in self.users}
+        detached: Dict[tuple, Beverage] = {}  # 메뉴에 없는 음료는 (이름, 가격, 태그)별로 한 객체만 만듦
+        try:
+            with open(path, encoding="utf-8") as f:
+                for line in f:
+                    if not line.strip():
+                        continue
+                    try:
+                        rec = json.loads(line)
+                    except json.JSONDecodeError:
+                        break  # 마지막 줄이 기록 도중 끊긴 경우 → 거기까지만 반영
+                    op = rec["op"]
+                    if op == "log":
+                        continue
+                    if op == "user":
+                        users[rec["name"]] = User(rec["name"])
+                        self.add_user(users[rec["name"]])
+                    elif op == "order":
+                        user = users.get(rec["user"])
+                        if user is None:
+                            user = users[rec["user"]] = User(rec["user"])
+                            self.add_user(user)
+                        beverage = self.find_beverage(rec["beverage"])
+                        if "price" in rec and (beverage is None or beverage.price != rec["price"]
+                                               or list(beverage.tags) != rec["tags"]):
+                            key = (rec["beverage"], rec["price"], tuple(rec["tags"]))
+                            if key not in detached:
+                                detached[key] = Beverage(rec["beverage"], rec["price"], list(rec["tags"]))
+                            beverage = detached[key]
+                        if beverage is None:
+                            raise ValueError(f"orders.log: unknown beverage {rec['beverage']!r}")
+                        user.add_order(Order(beverage, rec["quantity"]))
+                    elif op == "menu_add":
+                        self.add_beverage(Beverage(rec["name"], rec["price"], list(rec["tags"])))
+                    elif op == "menu_remove":
+                        self.remove_beverage(rec["name"])
+                    elif op == "menu_replace":
+                        self.menu = [Beverage(m["name"], m["price"], list(m["tags"])) for m in rec["menu"]]
+        finally:
+            self._log = log
+
+    def _score_candidates(self, user: User, index: Optional[_MenuIndex] = None) -> Dict[int, float]:
+        """
+        후보 음료별 점수. 점수 = 음료가 가진 태그들의 사용자 태그 가중치 합.
+        태그 역색인에서 가중치가 있는 태그의 음료만 방문 → 메뉴 전체를 보지 않음.
+        이미 구매한 음료는 제외.
+        """
+        by_tag = (index or self._index).by_tag
+        purchased = user.purchased  # UserView는 속성 접근마다 조회하므로 한 번만
+        scores: Dict[int, float] = defaultdict(float)
+        for tag, weight in user.get_tag_weights().items():
+            for b in by_tag.get(tag, ()):
+                if b.name not in purchased:
+                    scores[id(b)] += weight
+        return scores
 
     def recommend(self, user: User, count: int = 3) -> List['Beverage']:
         """
-        최근 주문의 태그를 바탕으로 '태그가 겹치는' 다른 음료를 추천.
+        최근 주문의 태그를 바탕으로 '태그가 겹치는' 다른 음료를 점수순으로 추천.
         - 이미 사용자가 주문했던 음료는 제외(새로운 경험 제공 가정)
-        - count 개수만큼 잘라서 반환
-        - 추천 로직은 단순 교집합 기반. (스코어링/정렬 로직은 필요 시 확장 가능)
+        - 점수: 최근 주문일수록, 수량이 많을수록 큰 태그 가중치(User.get_tag_weights)의 합
+        - heapq.nlargest로 상위 count개만 선택 → O(후보 수 · log count)
+        - 동점이면 메뉴 순서 우선(점수는 SCORE_SCALE 단위로 맞춰 비교)
+        - 동시 주문 중에도 일관된 값: 메뉴는 호출 시점 인덱스 하나, 사용자 상태는 해당 락 안에서 읽음
         """
-        if not user.orders:
+        index = self._index
+        scores = None
+        with self._lock_for(user):
+            if user.orders:
+                scores = self._score_candidates(user, index)
+        if scores is None:
             # 주문 내역이 없으면 랜덤 추천
             # 메뉴 개수가 count보다 적을 경우에도 min()을 써서 안전하게 처리.
-            return random.sample(self.menu, min(count, len(self.menu)))
+            return random.sample(index.menu, min(count, len(index.menu)))
+
+        top = heapq.nlargest(count, scores.items(), key=lambda kv: (math.floor(kv[1] * SCORE_SCALE + 0.5), -index.pos[kv[0]]))
+        return [index.by_id[bid] for bid, _ in top]
+
+    def _tag_matrix(self, index: _MenuIndex):
+        """음료×태그 0/1 행렬(메뉴 인덱스마다 필요할 때 한 번만 생성)"""
+        if index.item_tags is None:
+            tag_ids = {t: j for j, t in enumerate(index.by_tag)}
+            rows, cols = [], []
+            for i, b in enumerate(index.menu):
+                for t in set(b.tags):
+                    rows.append(i); cols.append(tag_ids[t])
+            index.item_tags = (tag_ids, _sparse_matrix(rows, cols, (len(index.menu), len(tag_ids))))
+        return index.item_tags
+
+    def recommend_batch(self, users: List[User], count: int = 3, chunk: int = 1024) -> List[List['Beverage']]:
+        """
+        여러 사용자를 한 번에 추천(야간 배치용).
+        사용자×태그 가중치 행렬 U와 음료×태그 행렬 I로 점수 S = U · Iᵀ 를 행렬곱으로 계산.
+        후보는 recommend()와 같은 규칙: 사용자 가중치에 있는 태그(가중치 0 포함)를 하나라도 가진 음료 중
+        구매하지 않은 것 → 점수 부호가 아니라 태그 포함 여부(0/1 행렬곱)로 판단.
+        결과는 사용자별 recommend()와 같은 순서(점수 내림차순, 동점은 메뉴 순서 → lexsort).
+        밀집 점수 행렬은 사용자 chunk명씩만 만들어 메모리를 chunk × 메뉴 크기로 제한.
+        """
+        import numpy as np
+        index = self._index
+        tag_ids, item_tags = self._tag_matrix(index)
+        n_items = len(index.menu)
+        rows, cols, vals = [], [], []
+        purchased, has_orders = [], []
+        for u, user in enumerate(users):
+            # 사용자별 가중치/구매 목록은 같은 락 안에서 함께 읽음
+            with self._lock_for(user):
+                weights = user.get_tag_weights()
+                purchased.append(list(user.purchased))
+                has_orders.append(bool(user.orders))
+            for tag, w in weights.items():
+                j = tag_ids.get(tag)
+                if j is not None:
+                    rows.append(u); cols.append(j); vals.append(w)
+        shape = (len(users), len(tag_ids))
+        user_tags = _sparse_matrix(rows, cols, shape, vals)
+        user_has_tag = _sparse_matrix(rows, cols, shape)
+        name_col = {}
+        for i, b in enumerate(index.menu):
+            name_col.setdefault(b.name, []).append(i)
+
+        def dense(m):
+            return np.asarray(m.todense() if hasattr(m, "todense") else m, dtype=np.float64)
+
+        out: List[List[Beverage]] = []
+        for start in range(0, len(users), chunk):
+            stop = min(start + chunk, len(users))
+            scores = np.floor(dense(user_tags[start:stop] @ item_tags.T) * SCORE_SCALE + 0.5)
+            scores[dense(user_has_tag[start:stop] @ item_tags.T) == 0] = -np.inf
+            for u in range(start, stop):
+                row = scores[u - start]
+                if not has_orders[u]:
+                    # 주문 내역이 없으면 recommend()처럼 랜덤 추천
+                    out.append(random.sample(index.menu, min(count, n_items)))
+                    continue
+                for name in purchased[u]:
+                    row[name_col.get(name, [])] = -np.inf
+                cand = np.flatnonzero(np.isfinite(row))
+                if count <= 0 or not len(cand):
+                    out.append([])
+                    continue
+                if len(cand) > count:
+                    # count번째 점수 이상인 후보만 남긴 뒤(동점 포함) 정렬
+                    kth = np.partition(row[cand], len(cand) - count)[len(cand) - count]
+                    cand = cand[row[cand] >= kth]
+                top = cand[np.lexsort((cand, -row[cand]))][:count]
+                out.append([index.menu[i] for i in top])
+        return out
+
+class _LogWriter:
+    """
+    orders.log 기록기(group commit).
+    - put(line): 대기열에 넣고 순번을 받음(짧은 락 하나뿐이라 사용자 락 안에서 불러도 됨)
+    - wait(seq): 그 순번까지 기록될 때까지 대기. 진행 중인 기록이 없으면 호출한 스레드가 리더가 되어
+      그동안 쌓인 줄을 한 번에 write + flush(+ fsync) → 동시 주문 N건이 fsync 1번을 나눠 씀
+      (전용 스레드로 넘기지 않으므로 GIL 아래에서도 스레드 전환 비용이 없음)
+    - 기록 실패 시 예외는 이후 wait에서 다시 올림
+    """
+    def __init__(self, path: str, fsync: bool = False):
+        self.path = path
+        self._fsync = fsync
+        self._f = open(path, "a", encoding="utf-8")
+        self._put_lock = threading.Lock()  # 순번과 대기열 순서를 맞춤
+        self._pending: List[str] = []
+        self._seq = 0
+        self._done_cv = threading.Condition()
+        self._done = 0
+        self._flushing = False
+        self._error: Optional[BaseException] = None
+
+    def put(self, line: str) -> int:
+        with self._put_lock:
+            self._seq += 1
+            self._pending.append(line)
+            return self._seq
+
+    def wait(self, seq: int):
+        while True:
+            with self._done_cv:
+                if self._done >= seq:
+                    if self._error is not None:
+                        raise self._error
+                    return
+                if self._flushing:
+                    self._done_cv.wait()
+                    continue
+                self._flushing = True
+            self._flush_pending()
+
+    def _flush_pending(self):
+        with self._put_lock:
+            lines, self._pending = self._pending, []
+            upto = self._seq
+        try:
+            self._f.write("".join(lines))
+            self._f.flush()
+            if self._fsync:
+                os.fsync(self._f.fileno())
+        except OSError as e:
+            self._error = e
+        finally:
+            with self._done_cv:
+                self._done = upto
+                self._flushing = False
+                self._done_cv.notify_all()
+
+    def drain(self):
+        """지금까지 put된 줄이 모두 기록될 때까지 대기"""
+        with self._put_lock:
+            seq = self._seq
+        self.wait(seq)
+
+    def truncate(self):
+        """대기열을 모두 기록한 뒤 파일을 비움(호출 측이 새 put을 막고 있어야 함)"""
+        self.drain()
+        self._f.truncate(0)
+
+    def close(self):
+        self.drain()
+        self._f.close()
+
+def _snapshot_gen(path: str) -> int:
+    """디렉터리에 있는 스냅샷의 세대 번호(없으면 0, 세대 없는 이전 형식도 0)"""
+    try:
+        with open(os.path.join(path, "meta.json"), encoding="utf-8") as f:
+            return json.load(f).get("gen", 0)
+    except FileNotFoundError:
+        return 0
+
+def _log_gen(path: str) -> int:
+    """로그 첫 줄의 세대 번호(머리줄 없는 이전 형식 로그는 0)"""
+    with open(path, encoding="utf-8") as f:
+        first = f.readline()
+    try:
+        rec = json.loads(first)
+    except json.JSONDecodeError:
+        return 0
+    return rec.get("gen", 0) if rec.get("op") == "log" else 0
+
+def _start_log(path: str, gen: int):
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(json.dumps({"op": "log", "gen": gen}) + "\n")
+
+def _sparse_matrix(rows, cols, shape, vals=None):
+    """scipy가 있으면 CSR 희소 행렬, 없으면 numpy 밀집 행렬"""
+    import numpy as np
+    vals = np.ones(len(rows)) if vals is None else np.asarray(vals, dtype=np.float64)
+    try:
+        from scipy.sparse import csr_matrix
+        return csr_matrix((vals, (rows, cols)), shape=shape)
+    except ImportError:
+        dense = np.zeros(shape)
+        np.add.at(dense, (np.asarray(rows, dtype=int), np.asarray(cols, dtype=int)), vals)
+        return dense
+
+# ---------------- 컬럼형(배열 기반) 주문 저장소 ----------------
+class ColumnarOrderStore:
+    """
+    주문 수가 수백만 건일 때를 위한 대안 저장소.
+    Order 객체 대신 주문을 평행한 타입 배열 4개로 보관(주문 1건 ≈ 20바이트):
+    - user_idx(int32), bev_idx(int32), quantity(int32), ts(float64, epoch 초)
+    음료/사용자는 이름 → 정수 id로 인터닝. 집계 쿼리는 numpy 벡터 연산으로 수행.
+    기존 API가 필요한 곳에는 user(name)이 돌려주는 UserView(User와 같은 메서드)를 사용.
+    """
+    def __init__(self, menu: Optional[List['Beverage']] = None):
+        self.beverages: List[Beverage] = []
+        self.bev_ids: Dict[str, int] = {}
+        self.user_names: List[str] = []
+        self.user_ids: Dict[str, int] = {}
+        self.user_idx = array('i')
+        self.bev_idx = array('i')
+        self.quantity = array('i')
+        self.ts = array('d')
+        self._by_user = None  # 사용자별 행 인덱스(CSR). 만든 뒤 append된 행은 _tail에 사용자별로 쌓음
+        self._tail: Dict[int, List[int]] = {}
+        self._tail_rows = 0
+        self._purchased: Dict[int, Set[str]] = {}  # 사용자별 구매 음료 이름(조회된 사용자만, append 시 갱신)
+        for b in menu or ():
+            self.intern_beverage(b)
+
+    def __len__(self) -> int:
+        return len(self.quantity)
+
+    def intern_beverage(self, beverage: 'Beverage') -> int:
+        bid = self.bev_ids.get(beverage.name)
+        if bid is None:
+            bid = self.bev_ids[beverage.name] = len(self.beverages)
+            self.beverages.append(beverage)
+        return bid
+
+    def intern_user(self, name: str) -> int:
+        uid = self.user_ids.get(name)
+        if uid is None:
+            uid = self.user_ids[name] = len(self.user_names)
+            self.user_names.append(name)
+        return uid
+
+    def append(self, user_name: str, beverage: 'Beverage', quantity: int, ts: Optional[float] = None):
+        uid = self.intern_user(user_name)
+        row = len(self.quantity)
+        self.user_idx.append(uid)
+        self.bev_idx.append(self.intern_beverage(beverage))
+        self.quantity.append(quantity)
+        self.ts.append(time.time() if ts is None else ts)
+        if self._by_user is not None:
+            self._tail.setdefault(uid, []).append(row)
+            self._tail_rows += 1
+        purchased = self._purchased.get(uid)
+        if purchased is not None:
+            purchased.add(beverage.name)
+
+    @classmethod
+    def from_users(cls, users: List['User'], menu: Optional[List['Beverage']] = None) -> 'ColumnarOrderStore':
+        """기존 객체형 User 목록을 컬럼형으로 변환(주문 순서 유지, ts는 0부터 순번)"""
+        store = cls(menu)
+        seq = 0
+        for user in users:
+            store.intern_user(user.name)
+            for order in user.orders:
+                store.append(user.name, order.beverage, order.quantity, float(seq))
+                seq += 1
+        return store
+
+    # ----- numpy 뷰(복사 없음) -----
+    def _np(self):
+        import numpy as np
+        return (np.frombuffer(self.user_idx, dtype=np.int32), np.frombuffer(self.bev_idx, dtype=np.int32),
+                np.frombuffer(self.quantity, dtype=np.int32), np.frombuffer(self.ts, dtype=np.float64))
+
+    def prices(self):
+        import numpy as np
+        return np.fromiter((b.price for b in self.beverages), dtype=np.float64, count=len(self.beverages))
+
+    # ----- 벡터화 집계 쿼리 -----
+    def spend_per_user(self) -> Dict[str, float]:
+        """사용자별 총 지출액: bincount(user, weights=단가[음료] × 수량)"""
+        import numpy as np
+        users, bevs, qty, _ = self._np()
+        spent = np.bincount(users, weights=self.prices()[bevs] * qty, minlength=len(self.user_names))
+        return dict(zip(self.user_names, spent.tolist()))
+
+    def top_beverages(self, n: int = 5) -> List[tuple]:
+        """판매 수량 상위 n개 음료 [(Beverage, 수량), ...]"""
+        import numpy as np
+        _, bevs, qty, _ = self._np()
+        sold = np.bincount(bevs, weights=qty, minlength=len(self.beverages))
+        n = min(n, len(sold))
+        if n == 0:
+            return []
+        top = np.argpartition(-sold, n - 1)[:n]
+        top = top[np.argsort(-sold[top], kind="stable")]
+        return [(self.beverages[i], int(sold[i])) for i in top]
+
+    def tag_histogram(self) -> Dict[str, int]:
+        """태그별 판매 수량: 음료별 수량(bincount) · 음료×태그 행렬"""
+        import numpy as np
+        _, bevs, qty, _ = self._np()
+        sold = np.bincount(bevs, weights=qty, minlength=len(self.beverages))
+        tags = sorted({t for b in self.beverages for t in b.tags})
+        tag_col = {t: j for j, t in enumerate(tags)}
+        item_tags = np.zeros((len(self.beverages), len(tags)))
+        for i, b in enumerate(self.beverages):
+            item_tags[i, [tag_col[t] for t in set(b.tags)]] = 1
+        return {t: int(c) for t, c in zip(tags, sold @ item_tags)}
+
+    # ----- 기존 User/Order API 호환 뷰 -----
+    def rows_of(self, uid: int):
+        """
+        사용자의 주문 행 번호(주문 순서).
+        사용자별 CSR 인덱스를 필요할 때 만들고, 이후 추가된 행은 _tail에서 이어 붙임.
+        _tail이 전체의 1/8을 넘으면 CSR을 다시 만듦(정렬 비용을 추가 행 수에 나눠 냄).
+        """
+        import numpy as np
+        if self._by_user is None or self._tail_rows > max(1024, len(self) // 8):
+            users = self._np()[0]
+            order = np.argsort(users, kind="stable")
+            offsets = np.searchsorted(users[order], np.arange(len(self.user_names) + 1))
+            self._by_user = (order, offsets)
+            self._tail = {}
+            self._tail_rows = 0
+        order, offsets = self._by_user
+        base = order[offsets[uid]:offsets[uid + 1]] if uid + 1 < len(offsets) else order[:0]
+        tail = self._tail.get(uid)
+        return np.concatenate((base, np.asarray(tail, dtype=base.dtype))) if tail else base
+
+    def purchased_of(self, uid: int) -> Set[str]:
+        """사용자가 구매한 음료 이름 집합(처음 조회 때 만들고 이후 append로 갱신)"""
+        import numpy as np
+        purchased = self._purchased.get(uid)
+        if purchased is None:
+            bevs = self._np()[1][self.rows_of(uid)]
+            purchased = self._purchased[uid] = {self.beverages[i].name for i in np.unique(bevs).tolist()}
+        return purchased
+
+    def user(self, name: str) -> 'UserView':
+        return UserView(self, self.intern_user(name))
+
+    def users(self) -> List['UserView']:
+        return [UserView(self, uid) for uid in range(len(self.user_names))]
+
+class OrderView:
+    """컬럼형 저장소의 주문 1행을 Order처럼 보여주는 얇은 뷰"""
+    __slots__ = ('_store', '_row')
+
+    def __init__(self, store: ColumnarOrderStore, row: int):
+        self._store = store
+        self._row = row
+
+    @property
+    def beverage(self) -> 'Beverage':
+        return self._store.beverages[self._store.bev_idx[self._row]]
+
+    @property
+    def quantity(self) -> int:
+        return self._store.quantity[self._row]
+
+    @property
+    def total_price(self) -> float:
+        return self.beverage.price * self.quantity
+
+class UserView:
+    """
+    컬럼형 저장소의 사용자 1명을 User처럼 보여주는 얇은 뷰.
+    OrderSystem.recommend 등 User를 받는 코드에 그대로 넘길 수 있음.
+    """
+    __slots__ = ('_store', '_uid')
+
+    def __init__(self, store: ColumnarOrderStore, uid: int):
+        self._store = store
+        self._uid = uid
+
+    @property
+    def name(self) -> str:
+        return self._store.user_names[self._uid]
+
+    @property
+    def orders(self) -> List[OrderView]:
+        return [OrderView(self._store, int(r)) for r in self._store.rows_of(self._uid)]
+
+    @property
+    def purchased(self) -> Set[str]:
+        return self._store.purchased_of(self._uid)
+
+    def add_order(self, order: 'Order'):
+        self._store.append(self.name, order.beverage, order.quantity)
+
+    def get_total_spent(self) -> float:
+        store = self._store
+        rows = store.rows_of(self._uid)
+        _, bevs, qty, _ = store._np()
+        return float((store.prices()[bevs[rows]] * qty[rows]).sum())
+
+    def get_average_spent(self) -> float:
+        n = len(self._store.rows_of(self._uid))
+        return self.get_total_spent() / n if n else 0.0
 
-        # 사용자 최근 n(기본 3)건의 주문에서 모은 태그 집합
-        recent_tags = set(user.get_recent_tags())
+    def _recent(self, n: int) -> List[OrderView]:
+        rows = self._store.rows_of(self._uid)[-n:] if n > 0 else []
+        return [OrderView(self._store, int(r)) for r in rows]
 
-        # 메뉴 전체를 순회하며, (1) 아직 안 사봤고 (2) 태그 교집합이 있는 음료만 필터링
-        recommendations = [
-            b for b in self.menu
-            if b not in [o.beverage for o in user.orders] and recent_tags & set(b.tags)
-        ]
+    def get_recent_tags(self, n: int = RECENT_TAG_WINDOW) -> List[str]:
+        return list({tag for order in self._recent(n) for tag in order.beverage.tags})
 
-        # 상위 count개만 반환 (현재는 정렬 없이 필터링된 순서 그대로)
-        return recommendations[:count]
+    def get_tag_weights(self, n: int = RECENT_ORDERS, decay: float = RECENCY_DECAY) -> Dict[str, float]:
+        return _tag_weights(self._recent(n), decay)
 
 # ---------------- 실행 예시 ----------------
 if __name__ == "__main__":
@@ -0,0 +1,153 @@
+"""
+opp_beverage-recommadaion.py 스냅샷/로그 재생 테스트
+
+실행: python -m pytest -q test_beverage.py
+"""
+import importlib.util, json, os
+
+import pytest
+
+def load_module():
+    # 파일명에 '-'가 있어 일반 import 불가 → 경로로 로드
+    path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "opp_beverage-recommadaion.py")
+    spec = importlib.util.spec_from_file_location("beverage", path)
+    mod = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(mod)
+    return mod
+
+bev = load_module()
+
+def make_menu():
+    return [bev.Beverage("americano", 3000, ["coffee", "hot"]),
+            bev.Beverage("latte", 4000, ["coffee", "milk"]),
+            bev.Beverage("lemonade", 3500, ["cold", "sweet"])]
+
+def history(system):
+    return {u.name: [(o.beverage.name, o.beverage.price, o.quantity) for o in u.orders] for u in system.users}
+
+def test_replay_after_menu_replace(tmp_path):
+    menu = make_menu()
+    system = bev.OrderSystem(menu)
+    system.save_snapshot(str(tmp_path))
+    system.open_log(str(tmp_path / "orders.log"))
+    alice = bev.User("alice")
+    system.add_user(alice)
+    system.add_order(alice, bev.Order(menu[0], 1))
+
+    # 앞 주문의 음료가 빠진 새 메뉴로 교체한 뒤 새 메뉴 음료 주문
+    new_menu = [bev.Beverage("mocha", 4500, ["coffee", "sweet"]), menu[2]]
+    system.menu = new_menu
+    system.add_order(alice, bev.Order(new_menu[0], 2))
+    system.close_log()
+
+    loaded = bev.OrderSystem.load_snapshot(str(tmp_path), open_log=False)
+    assert [b.name for b in loaded.menu] == ["mocha", "lemonade"]
+    assert history(loaded) == history(system)
+    assert loaded.users[0].get_total_spent() == alice.get_total_spent()
+
+def test_crash_after_meta_replace_does_not_replay_log(tmp_path, monkeypatch):
+    menu = make_menu()
+    system = bev.OrderSystem(menu)
+    system.save_snapshot(str(tmp_path))
+    system.open_log(str(tmp_path / "orders.log"))
+    bob = bev.User("bob")
+    system.add_user(bob)
+    system.add_order(bob, bev.Order(menu[1], 3))
+    system.close_log()
+
+    # meta.json까지 교체한 뒤 로그를 비우기 전에 중단된 상황
+    def crash(path, gen):
+        raise RuntimeError("crash")
+    monkeypatch.setattr(bev, "_start_log", crash)
+    with pytest.raises(RuntimeError):
+        system.save_snapshot(str(tmp_path))
+    monkeypatch.undo()
+
+    loaded = bev.OrderSystem.load_snapshot(str(tmp_path), open_log=False)
+    assert [u.name for u in loaded.users] == ["bob"]
+    assert history(loaded) == history(system)
+
+    # 다시 열면 로그가 새 세대로 시작돼 이후 주문만 재생됨
+    loaded.open_log(str(tmp_path / "orders.log"))
+    loaded.add_order(loaded.users[0], bev.Order(menu[0], 1))
+    loaded.close_log()
+    again = bev.OrderSystem.load_snapshot(str(tmp_path), open_log=False)
+    assert history(again) == history(loaded)
+
+def test_snapshot_rejects_mismatched_order_count(tmp_path):
+    menu = make_menu()
+    system = bev.OrderSystem(menu)
+    carol = bev.User("carol")
+    system.add_user(carol)
+    system.add_order(carol, bev.Order(menu[2], 1))
+    system.save_snapshot(str(tmp_path))
+
+    meta_path = tmp_path / "meta.json"
+    meta = json.loads(meta_path.read_text(encoding="utf-8"))
+    meta["orders"] += 1
+    meta_path.write_text(json.dumps(meta), encoding="utf-8")
+    with pytest.raises(ValueError):
+        bev.OrderSystem.load_snapshot(str(tmp_path), open_log=False)
+
+def test_columnar_incremental_index_matches_rebuild():
+    menu = make_menu()
+    store = bev.ColumnarOrderStore(menu)
+    picks = [("u%d" % (i % 7), menu[i % 3], 1 + i % 2) for i in range(3000)]
+    for i, (name, b, q) in enumerate(picks):
+        store.append(name, b, q, float(i))
+        if i % 97 == 0:
+            # 중간 조회로 CSR/구매 집합을 만든 뒤에도 계속 append
+            store.user(name).purchased
+    fresh = bev.ColumnarOrderStore(menu)
+    for i, (name, b, q) in enumerate(picks):
+        fresh.append(name, b, q, float(i))
+    for uid, name in enumerate(store.user_names):
+        assert store.rows_of(uid).tolist() == fresh.rows_of(uid).tolist()
+        assert store.user(name).purchased == {o.beverage.name for o in fresh.user(name).orders}
+    late = store.user("late")
+    late.add_order(bev.Order(menu[1], 1))
+    assert late.purchased == {"latte"}
+    assert [o.beverage.name for o in late.orders] == ["latte"]
+
+def test_recommend_batch_matches_recommend():
+    menu = make_menu() + [bev.Beverage("cold brew", 4200, ["coffee", "cold"]),
+                          bev.Beverage("iced tea", 3000, ["cold", "sweet"])]
+    system = bev.OrderSystem(menu)
+    users = [bev.User(f"u{i}") for i in range(6)]
+    for u in users:
+        system.add_user(u)
+    users[0].add_order(bev.Order(menu[0], 1))
+    users[1].add_order(bev.Order(menu[2], 0))   # 수량 0 → 가중치 0인 태그도 후보
+    users[2].add_order(bev.Order(menu[1], 2))
+    users[2].add_order(bev.Order(menu[2], 1))
+    users[3].add_order(bev.Order(menu[3], 1))   # 동점 → 메뉴 순서
+    for b in menu:
+        users[4].add_order(bev.Order(b, 1))     # 후보 없음
+    batch = system.recommend_batch(users[:5], 3, chunk=2)
+    for user, got in zip(users[:5], batch):
+        assert [b.name for b in got] == [b.name for b in system.recommend(user, 3)]
+    assert batch[1] != []
+    assert len(system.recommend_batch([users[5]], 3)[0]) == 3
+
+def test_replay_order_racing_menu_remove(tmp_path):
+    menu = make_menu()
+    system = bev.OrderSystem(menu)
+    system.save_snapshot(str(tmp_path))
+    system.open_log(str(tmp_path / "orders.log"))
+    dave = bev.User("dave")
+    system.add_user(dave)
+
+    # 메뉴 확인 뒤 주문 줄보다 menu_remove 줄이 먼저 기록되는 경합 재현
+    log = system._log
+    put = log.put
+    def racing_put(line):
+        log.put = put
+        system.remove_beverage("latte")
+        return put(line)
+    log.put = racing_put
+    system.add_order(dave, bev.Order(menu[1], 2))
+    system.close_log()
+
+    loaded = bev.OrderSystem.load_snapshot(str(tmp_path), open_log=False)
+    assert [b.name for b in loaded.menu] == ["americano", "lemonade"]
+    assert history(loaded) == history(system)
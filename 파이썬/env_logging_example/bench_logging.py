@@ -0,0 +1,147 @@
+"""
+==========================================
+파일명   : env_logging_example/bench_logging.py
+목적     : 로그 호출 1건당 지연 측정(디스크가 느릴 때)
+설명     :
+    sync  : 기존 main.py 방식(FileHandler가 호출 스레드에서 바로 쓰고 매번 flush)
+    queue : log_setup.setup_logging(큐 + 백그라운드 스레드 + 묶음 flush)
+    두 방식에서 같은 로그 호출을 반복하며 호출 1건 지연 p50/p99/max를 측정.
+
+    디스크 압박 재현:
+    --stall-ms / --stall-every : 파일 쓰기 N번마다 지정한 시간만큼 멈춤(느린 디스크 흉내)
+    --pressure                 : 같은 디렉터리에 큰 파일을 계속 쓰고 fsync하는 스레드 실행
+    --disabled                 : 비활성 레벨(DEBUG) 호출 비용 비교(f-string vs %-인자)
+
+실행     :
+    python bench_logging.py --calls 20000 --stall-ms 20 --stall-every 200 --pressure
+==========================================
+"""
+
+import argparse
+import logging
+import os
+import shutil
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from log_setup import setup_logging, shutdown_logging
+
+
+class SlowStream:
+    """파일 객체 래퍼: write every번마다 stall초 멈춤"""
+    def __init__(self, stream, stall, every):
+        self._stream, self._stall, self._every, self._n = stream, stall, every, 0
+
+    def write(self, s):
+        self._n += 1
+        if self._stall and self._n % self._every == 0:
+            time.sleep(self._stall)
+        return self._stream.write(s)
+
+    def __getattr__(self, name):
+        return getattr(self._stream, name)
+
+
+def disk_pressure(path, stop):
+    chunk = os.urandom(4 * 1024 * 1024)
+    with open(path, "wb") as f:
+        while not stop.is_set():
+            f.write(chunk)
+            f.flush()
+            os.fsync(f.fileno())
+            f.seek(0)
+
+
+def slow_down(handler, args):
+    if isinstance(handler, logging.FileHandler):
+        handler.stream = SlowStream(handler.stream, args.stall_ms / 1000, args.stall_every)
+
+
+def measure(log, calls):
+    lat = []
+    for i in range(calls):
+        t0 = time.perf_counter()
+        log.info("request id=%d user=%s took %.2f ms", i, "u42", 12.5)
+        lat.append(time.perf_counter() - t0)
+    lat.sort()
+    return lat
+
+
+def report(label, lat):
+    pct = lambda p: lat[min(len(lat) - 1, int(p * len(lat)))] * 1e6
+    print(f"{label:<6}: p50 {pct(0.5):8.1f} µs  p99 {pct(0.99):9.1f} µs  max {lat[-1] * 1e6:10.1f} µs  "
+          f"total {sum(lat):6.2f} s")
+
+
+def run_sync(args, path):
+    root = logging.getLogger()
+    for h in root.handlers[:]:
+        root.removeHandler(h)
+    fh = logging.FileHandler(path, encoding="utf-8")
+    fh.setFormatter(logging.Formatter("%(asctime)s [%(levelname)s] %(message)s"))
+    slow_down(fh, args)
+    root.addHandler(fh)
+    root.setLevel(logging.INFO)
+    lat = measure(logging.getLogger("bench"), args.calls)
+    root.removeHandler(fh)
+    fh.close()
+    return lat
+
+
+def run_queue(args, path):
+    listener = setup_logging(level="INFO", log_file=path, console=False)
+    for h in listener.handlers:
+        slow_down(h, args)
+    lat = measure(logging.getLogger("bench"), args.calls)
+    t0 = time.perf_counter()
+    dropped = listener.queue_handler.dropped
+    shutdown_logging()
+    print(f"        (queue drained in {time.perf_counter() - t0:.2f} s after the loop, dropped={dropped})")
+    return lat
+
+
+def bench_disabled(calls):
+    log = logging.getLogger("bench.disabled")
+    log.setLevel(logging.INFO)
+    payload = {"k": list(range(50))}
+    t0 = time.perf_counter()
+    for i in range(calls):
+        log.debug(f"payload={payload} i={i}")
+    t_f = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    for i in range(calls):
+        log.debug("payload=%s i=%d", payload, i)
+    t_p = time.perf_counter() - t0
+    print(f"disabled DEBUG: f-string {t_f / calls * 1e6:.2f} µs/call   %-args {t_p / calls * 1e6:.2f} µs/call")
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--calls", type=int, default=20_000)
+    ap.add_argument("--stall-ms", type=float, default=20.0)
+    ap.add_argument("--stall-every", type=int, default=200)
+    ap.add_argument("--pressure", action="store_true")
+    ap.add_argument("--disabled", action="store_true")
+    args = ap.parse_args()
+
+    tmp = tempfile.mkdtemp(prefix="bench_logging_")
+    stop = threading.Event()
+    if args.pressure:
+        threading.Thread(target=disk_pressure, args=(os.path.join(tmp, "pressure.bin"), stop), daemon=True).start()
+    try:
+        print(f"calls={args.calls} stall={args.stall_ms} ms every {args.stall_every} writes "
+              f"pressure={'on' if args.pressure else 'off'}")
+        report("sync", run_sync(args, os.path.join(tmp, "sync.log")))
+        report("queue", run_queue(args, os.path.join(tmp, "queue.log")))
+        if args.disabled:
+            bench_disabled(args.calls)
+    finally:
+        stop.set()
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,241 @@
+"""
+==========================================
+파일명   : env_logging_example/log_setup.py
+목적     : main.py의 .env 기반 로그 설정을 여러 프로그램(API 서버 등)에서
+          재사용할 수 있는 비동기(큐 기반) 로깅 구성으로 분리
+설명     :
+    로그를 호출한 스레드는 레코드를 큐에 넣기만 하고(QueueHandler),
+    콘솔/파일 쓰기는 백그라운드 스레드(QueueListener)가 처리합니다.
+    → 디스크가 느려져도 요청 처리 스레드가 파일 쓰기를 기다리지 않음
+
+    주요 기능:
+    1. QueueHandler / QueueListener : 로그 I/O를 백그라운드 스레드로 분리
+       - 큐가 가득 차면(디스크가 계속 못 따라가면) 기다리지 않고 버린 뒤 개수를 집계
+    2. 파일 회전 : 크기 기준(LOG_MAX_BYTES) 또는 시간 기준(LOG_ROTATE_WHEN, 예: "midnight")
+    3. 묶음 flush : 레코드마다 flush하지 않고 LOG_FLUSH_RECORDS건 또는
+                   LOG_FLUSH_INTERVAL초마다 한 번 flush(ERROR 이상은 즉시)
+    4. 지연 %-포맷 : logger.info("%s 시작", name) 형태로 호출하면
+                    비활성 레벨에서는 문자열을 만들지 않음(f-string은 항상 만듦)
+
+    환경 변수(.env):
+    LOG_LEVEL(INFO), LOG_FILE(app.log), LOG_CONSOLE(1),
+    LOG_MAX_BYTES(10MB, 0이면 크기 회전 안 함), LOG_ROTATE_WHEN(빈 값이면 시간 회전 안 함),
+    LOG_BACKUP_COUNT(5), LOG_FLUSH_RECORDS(100), LOG_FLUSH_INTERVAL(1.0),
+    LOG_QUEUE_SIZE(10000)
+
+사용     :
+    from log_setup import setup_logging
+    setup_logging()                      # 프로세스 시작 시 한 번
+    log = logging.getLogger(__name__)
+    log.info("user=%s took %.1f ms", user_id, ms)
+==========================================
+"""
+
+import atexit
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import time
+
+LOG_FORMAT = "%(asctime)s [%(levelname)s] %(message)s"
+
+# 로그 레벨 매핑
+LEVELS = {
+    "DEBUG": logging.DEBUG,
+    "INFO": logging.INFO,
+    "WARNING": logging.WARNING,
+    "ERROR": logging.ERROR,
+    "CRITICAL": logging.CRITICAL,
+}
+
+_listeners = {}  # 로거 이름("" = 루트) → QueueListener
+_EXC_FORMATTER = logging.Formatter()
+
+
+class _BatchFlushMixin:
+    """
+    StreamHandler는 emit마다 flush() → 레코드마다 write 시스템 콜.
+    pending 건수/경과 시간 기준으로 모아서 flush하고, ERROR 이상은 바로 flush.
+    """
+    flush_records = 100
+    flush_interval = 1.0
+
+    def emit(self, record):
+        self._force = record.levelno >= logging.ERROR
+        super().emit(record)
+
+    def flush(self):
+        self._pending = getattr(self, "_pending", 0) + 1
+        now = time.monotonic()
+        if (getattr(self, "_force", False) or self._pending >= self.flush_records
+                or now - getattr(self, "_last_flush", 0.0) >= self.flush_interval):
+            self.flush_now()
+
+    def flush_now(self):
+        self._pending = 0
+        self._last_flush = time.monotonic()
+        super().flush()
+
+    def close(self):
+        self.flush_now()
+        super().close()
+
+
+class BatchingRotatingFileHandler(_BatchFlushMixin, logging.handlers.RotatingFileHandler):
+    pass
+
+
+class BatchingTimedRotatingFileHandler(_BatchFlushMixin, logging.handlers.TimedRotatingFileHandler):
+    pass
+
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """큐가 가득 차면 호출 스레드를 막지 않고 레코드를 버림(dropped로 집계)"""
+    def __init__(self, q):
+        super().__init__(q)
+        self.dropped = 0
+
+    def prepare(self, record):
+        # 기본 구현은 레코드 복사 + 전체 포맷(프로세스 간 큐 대비). 같은 프로세스 큐이므로
+        # 메시지 인자 병합과 예외 텍스트만 미리 만들고(인자 객체가 나중에 바뀌어도 안전)
+        # 시간 포맷 등 나머지는 리스너 스레드의 Formatter가 처리
+        if record.args:
+            record.msg = record.getMessage()
+            record.args = None
+        if record.exc_info:
+            record.exc_text = _EXC_FORMATTER.formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class BatchingQueueListener(logging.handlers.QueueListener):
+    """
+    큐가 flush_interval 동안 비어 있으면 묶음 flush 핸들러를 flush
+    → 로그가 뜸할 때도 마지막 레코드가 버퍼에 오래 남지 않음
+    """
+    def __init__(self, q, *handlers, flush_interval=1.0):
+        super().__init__(q, *handlers, respect_handler_level=True)
+        self.flush_interval = flush_interval
+
+    def enqueue_sentinel(self):
+        self.queue.put(self._sentinel)  # 종료 신호는 큐가 가득 차도 버리지 않음
+
+    def dequeue(self, block):
+        if not block:
+            return self.queue.get_nowait()
+        while True:
+            try:
+                return self.queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                for h in self.handlers:
+                    if isinstance(h, _BatchFlushMixin) and getattr(h, "_pending", 0):
+                        h.acquire()
+                        try:
+                            h.flush_now()
+                        finally:
+                            h.release()
+
+
+def _file_handler(path, max_bytes, when, backup_count):
+    if when:
+        return BatchingTimedRotatingFileHandler(path, when=when, backupCount=backup_count, encoding="utf-8")
+    return BatchingRotatingFileHandler(path, maxBytes=max_bytes, backupCount=backup_count, encoding="utf-8")
+
+
+def setup_logging(level=None, log_file=None, console=None, max_bytes=None, rotate_when=None,
+                  backup_count=None, flush_records=None, flush_interval=None, queue_size=None,
+                  fmt=LOG_FORMAT, logger_name=""):
+    """
+    루트 로거(또는 logger_name 로거)를 큐 기반으로 구성하고 QueueListener를 반환.
+    인자를 생략하면 환경 변수(.env) 값을 사용. 다시 호출하면 이전 구성을 정리하고 새로 구성.
+    logger_name을 주면 그 로거만 별도 출력/포맷으로 구성하고 루트로 전파하지 않음
+    (예: 요청 로그를 JSON 한 줄씩 따로 기록).
+    프로세스 종료 시(atexit) 남은 로그를 모두 쓰고 리스너를 멈춤.
+    """
+    level = LEVELS.get((level or os.getenv("LOG_LEVEL", "INFO")).upper(), logging.INFO)
+    log_file = os.getenv("LOG_FILE", "app.log") if log_file is None else log_file
+    console = os.getenv("LOG_CONSOLE", "1") == "1" if console is None else console
+    max_bytes = int(os.getenv("LOG_MAX_BYTES", str(10 * 1024 * 1024))) if max_bytes is None else max_bytes
+    rotate_when = os.getenv("LOG_ROTATE_WHEN", "") if rotate_when is None else rotate_when
+    backup_count = int(os.getenv("LOG_BACKUP_COUNT", "5")) if backup_count is None else backup_count
+    flush_records = int(os.getenv("LOG_FLUSH_RECORDS", "100")) if flush_records is None else flush_records
+    flush_interval = float(os.getenv("LOG_FLUSH_INTERVAL", "1.0")) if flush_interval is None else flush_interval
+    queue_size = int(os.getenv("LOG_QUEUE_SIZE", "10000")) if queue_size is None else queue_size
+
+    shutdown_logging(logger_name)
+
+    formatter = logging.Formatter(fmt)
+    handlers = []
+    if console:
+        handlers.append(logging.StreamHandler())  # 콘솔 출력
+    if log_file:
+        fh = _file_handler(log_file, max_bytes, rotate_when, backup_count)  # 파일 출력(회전 + 묶음 flush)
+        fh.flush_records = flush_records
+        fh.flush_interval = flush_interval
+        handlers.append(fh)
+    for h in handlers:
+        h.setFormatter(formatter)
+        h.setLevel(level)
+
+    q = queue.Queue(maxsize=queue_size)
+    qh = DroppingQueueHandler(q)
+
+    # 기존 핸들러 초기화 후 큐 핸들러 하나만 등록
+    logger = logging.getLogger(logger_name or None)
+    for handler in logger.handlers[:]:
+        logger.removeHandler(handler)
+    logger.addHandler(qh)
+    logger.setLevel(level)
+    if logger_name:
+        logger.propagate = False
+
+    listener = _listeners[logger_name] = BatchingQueueListener(q, *handlers, flush_interval=flush_interval)
+    listener.queue_handler = qh
+    listener.start()
+    return listener
+
+
+def shutdown_logging(logger_name=None):
+    """
+    남은 레코드를 모두 쓰고 리스너/핸들러 정리(여러 번 호출해도 안전).
+    logger_name을 생략하면 구성된 모든 로거를 정리.
+    """
+    names = list(_listeners) if logger_name is None else [logger_name]
+    for name in names:
+        listener = _listeners.pop(name, None)
+        if listener is not None:
+            _stop_listener(name, listener)
+
+
+def _stop_listener(name, listener):
+    listener.stop()  # 큐에 남은 레코드를 모두 처리한 뒤 종료
+    logging.getLogger(name or None).removeHandler(listener.queue_handler)
+    for h in listener.handlers:
+        h.close()
+    if listener.queue_handler.dropped:
+        print(f"[log_setup] log queue full: {listener.queue_handler.dropped} records dropped", file=sys.stderr)
+
+
+def _restart_after_fork():
+    """
+    fork된 자식에는 리스너 스레드가 없음(prefork 서버 워커 등) → 새 큐로 리스너를 다시 시작.
+    부모의 큐는 fork 시점에 다른 스레드가 잠가 두었을 수 있으므로 재사용하지 않음.
+    """
+    for listener in _listeners.values():
+        q = queue.Queue(maxsize=listener.queue.maxsize)
+        listener.queue = listener.queue_handler.queue = q
+        listener._thread = None
+        listener.start()
+
+
+atexit.register(shutdown_logging)
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_restart_after_fork)
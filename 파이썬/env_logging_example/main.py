@@ -15,16 +15,18 @@
     주요 기능:
     1. python-dotenv를 사용한 .env 파일 로드
     2. os.getenv()로 환경 변수 읽기
-    3. logging.basicConfig를 이용한 로그 설정
-       - 로그 파일명: app.log
+    3. log_setup.setup_logging()을 이용한 로그 설정
+       - 로그 파일명: LOG_FILE(기본 app.log), 크기/시간 기준 회전
        - 로그 레벨: .env에서 읽은 값 적용
        - 로그 포맷: 시간 [레벨] 메시지
-       - 로그 출력: 콘솔 + 파일 핸들러 동시 구성
+       - 로그 출력: 콘솔 + 파일 핸들러를 백그라운드 스레드(QueueListener)에서 처리
     4. INFO, DEBUG, ERROR 레벨 로그 메시지 출력
        - ERROR 로그는 ZeroDivisionError 예외 발생 시 기록
+       - 메시지는 %-스타일 인자로 전달(비활성 레벨이면 문자열을 만들지 않음)
 
 변경이력 :
     2025-08-12 : 최초 작성 및 테스트 완료
+    2026-10-19 : 로그 설정을 log_setup.py로 분리(큐 기반 비동기 로깅, 회전, 묶음 flush)
 
 참고     :
     - python-dotenv 모듈 사용법
@@ -37,56 +39,31 @@ import os
 import logging
 from dotenv import load_dotenv
 
+from log_setup import setup_logging
+
 # .env 로드
 # load_dotenv; .env 파일을 로드하는 함수
 load_dotenv(dotenv_path=".env")
 
 # 환경변수 읽기
-# 환경 변수에서 LOG_LEVEL 값을 읽어오고 대문자로 변환, 기본값은 "INFO"
-log_level_str = os.getenv("LOG_LEVEL", "INFO").upper()
+# LOG_LEVEL / LOG_FILE 등 로그 관련 값은 setup_logging()이 직접 읽음
 app_name = os.getenv("APP_NAME", "MyApp")
 
-# 로그 레벨 매핑
-level_dict = {
-"DEBUG": logging.DEBUG,
-"INFO": logging.INFO,
-"WARNING": logging.WARNING,
-"ERROR": logging.ERROR,
-"CRITICAL": logging.CRITICAL,
-}
-log_level = level_dict.get(log_level_str, logging.INFO)
-
 # 로깅 설정
-# 시간 [로그레벨] 메시지 형태
-log_format = "%(asctime)s [%(levelname)s] %(message)s"
-log_file_path = "app.log"
-
-#기존 핸들러 초기화 후 로그 레벨 재설정
-for handler in logging.root.handlers[:]:
-    logging.root.removeHandler(handler)
-
-# logging.basicConfig()로 로깅 설정
-# level: 로그 레벨 설정
-# format: 로그 출력 포맷 지정
-# handlers: 로그를 출력할 핸들러 리스트 (콘솔, 파일 모두 출력)
-logging.basicConfig(
-    level=log_level,
-    format=log_format,
-    handlers=[
-        logging.StreamHandler(),  # 콘솔 출력
-        logging.FileHandler(log_file_path, encoding="utf-8")  # 파일 출력
-    ]
-)
+# 시간 [로그레벨] 메시지 형태, 콘솔 + 파일(app.log)
+# 호출 스레드는 큐에 넣기만 하고 실제 출력은 백그라운드 스레드가 담당
+setup_logging()
+logger = logging.getLogger(app_name)
 
 # 로그 메시지 출력
 # 앱 실행 시작을 INFO 레벨 로그로 출력 (app_name 포함)
-logging.info(f"[INFO] {app_name} 앱 실행 시작")
+logger.info("[INFO] %s 앱 실행 시작", app_name)
 # 환경 변수 로딩 완료를 DEBUG 레벨 로그로 출력
-logging.debug(f"[DEBUG] 환경 변수 로딩 완료")
+logger.debug("[DEBUG] 환경 변수 로딩 완료")
 
 
 try:
     1 / 0   # 의도적으로 0으로 나누어 예외 발생
 except ZeroDivisionError:
     # ZeroDivisionError 예외 발생 시 ERROR 레벨 로그 출력
-    logging.error("[ERROR] 예외 발생: 0으로 나눌 수 없습니다.")
\ No newline at end of file
+    logger.error("[ERROR] 예외 발생: 0으로 나눌 수 없습니다.")